@@ -1,5 +1,4 @@
 import os
-from twilio.rest import Client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,7 +7,7 @@ account_sid = os.getenv('TWILIO_ACCOUNT_SID')
 auth_token = os.getenv('TWILIO_AUTH_TOKEN')
 messaging_service_sid = os.getenv('TWILIO_MESSAGING_SERVICE_SID')
 
+# Sender number, used when no messaging service is configured
+from_number = os.getenv('TWILIO_FROM_NUMBER', '+19788008375')
 
-# Initialize Twilio client
-client = Client(account_sid, auth_token)
-
+# SMS are sent by api/Utils/sms_service.py over the Twilio REST API
@@ -0,0 +1,237 @@
+"""
+Bitmap Availability Engine
+
+Keeps each doctor's open slots in memory as one integer bitmap per date,
+with bit i set when the 30-minute slot starting at i * 30 minutes past
+midnight is open. Availability questions become bit operations:
+
+- free slots on a date:            iterate the set bits of one int
+- next N dates with a free slot:   walk the sorted dates with a nonzero mask
+- first free slot in a department: min over each doctor's first set bit
+- k earliest slots in a department: heap merge of the doctors' slot streams
+
+Slot labels ("09:30 AM") are precomputed once, so responses no longer run
+strptime / strftime per row.
+
+Doctors are loaded lazily from `doctor_slots` (one query for any number of
+doctors) and kept in sync by:
+- mark_booked / mark_free, called by the booking and cancellation paths
+  right after they commit
+- the `slots_changed` notification (trigger from migration 0005) which
+  drops the doctor so the next query reloads it; this also covers writes
+  made by other workers and calendar extension
+"""
+
+import bisect
+import heapq
+import logging
+from datetime import date, datetime, time, timedelta
+from itertools import islice, repeat
+
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+SLOT_TIMES = [
+    time(i * SLOT_MINUTES // 60, i * SLOT_MINUTES % 60) for i in range(SLOTS_PER_DAY)
+]
+SLOT_LABELS_12H = [t.strftime("%I:%M %p") for t in SLOT_TIMES]
+SLOT_LABELS_24H = [t.strftime("%H:%M") for t in SLOT_TIMES]
+
+LOAD_QUERY = """
+    SELECT doctor_id, slot_date, slot_time
+    FROM doctor_slots
+    WHERE doctor_id = ANY(%s)
+      AND slot_date >= %s
+      AND is_available = true;
+"""
+
+
+def slot_index(t: time):
+    """Bit index of the slot starting at `t`, or None if off the slot grid."""
+    minutes = t.hour * 60 + t.minute
+    if t.second or t.microsecond or minutes % SLOT_MINUTES:
+        return None
+    return minutes // SLOT_MINUTES
+
+
+def iter_bits(mask: int):
+    """Indexes of the set bits of `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DoctorCalendar:
+    """Open-slot bitmaps for one doctor, keyed by date."""
+
+    __slots__ = ("days", "_dates", "_dirty")
+
+    def __init__(self):
+        self.days = {}
+        self._dates = []
+        self._dirty = False
+
+    def set(self, day: date, index: int, is_open: bool):
+        mask = self.days.get(day, 0)
+        mask = mask | (1 << index) if is_open else mask & ~(1 << index)
+        if day not in self.days:
+            self._dirty = True
+        self.days[day] = mask
+
+    def sorted_dates(self) -> list:
+        if self._dirty:
+            self._dates = sorted(self.days)
+            self._dirty = False
+        return self._dates
+
+
+class AvailabilityEngine:
+    """Process-wide in-memory view of open slots per doctor and date."""
+
+    def __init__(self):
+        self._doctors = {}
+        self.loads = 0
+        self.invalidations = 0
+
+    # ─── Loading & invalidation ───
+
+    def _missing(self, doctor_ids) -> list:
+        return [d for d in dict.fromkeys(doctor_ids) if d not in self._doctors]
+
+    def _load(self, doctor_ids, rows):
+        calendars = {doctor_id: DoctorCalendar() for doctor_id in doctor_ids}
+        for doctor_id, slot_date, slot_time in rows:
+            index = slot_index(slot_time)
+            if index is not None:
+                calendars[doctor_id].set(slot_date, index, True)
+        self._doctors.update(calendars)
+        self.loads += 1
+
+    async def ensure_loaded(self, cursor, doctor_ids):
+        """Load any of `doctor_ids` not yet cached (async cursor)."""
+        missing = self._missing(doctor_ids)
+        for _ in range(2):
+            if not missing:
+                return
+            # Re-read once if a change notification arrived mid-query
+            epoch = self.invalidations
+            await cursor.execute(LOAD_QUERY, (missing, date.today()))
+            rows = await cursor.fetchall()
+            if epoch == self.invalidations:
+                break
+        self._load(missing, rows)
+
+    def ensure_loaded_sync(self, cursor, doctor_ids):
+        """Load any of `doctor_ids` not yet cached (psycopg2 cursor)."""
+        missing = self._missing(doctor_ids)
+        if missing:
+            cursor.execute(LOAD_QUERY, (missing, date.today()))
+            self._load(missing, cursor.fetchall())
+
+    def invalidate(self, payload=None):
+        """Drop one doctor (payload = doctor id) or everything (payload None)."""
+        self.invalidations += 1
+        if payload is None:
+            self._doctors.clear()
+            return
+        try:
+            self._doctors.pop(int(payload), None)
+        except ValueError:
+            self._doctors.clear()
+
+    # ─── Writes ───
+
+    def mark_booked(self, doctor_id: int, slot_dt: datetime):
+        self._set(doctor_id, slot_dt, False)
+
+    def mark_free(self, doctor_id: int, slot_dt: datetime):
+        self._set(doctor_id, slot_dt, True)
+
+    def _set(self, doctor_id, slot_dt, is_open):
+        calendar = self._doctors.get(doctor_id)
+        index = slot_index(slot_dt.time())
+        if calendar is not None and index is not None:
+            calendar.set(slot_dt.date(), index, is_open)
+
+    # ─── Queries ───
+
+    def free_mask(self, doctor_id: int, day: date) -> int:
+        calendar = self._doctors.get(doctor_id)
+        return calendar.days.get(day, 0) if calendar else 0
+
+    def free_slots(self, doctor_id: int, day: date) -> list:
+        """Open slot indexes on `day`, earliest first."""
+        return list(iter_bits(self.free_mask(doctor_id, day)))
+
+    def free_slot_labels(self, doctor_id: int, day: date, labels=SLOT_LABELS_12H) -> list:
+        return [labels[i] for i in iter_bits(self.free_mask(doctor_id, day))]
+
+    def next_free_dates(self, doctor_id: int, after: date, n: int, exclude=None) -> list:
+        """Up to `n` dates strictly after `after` with an open slot."""
+        calendar = self._doctors.get(doctor_id)
+        if calendar is None:
+            return []
+        dates = calendar.sorted_dates()
+        found = []
+        for day in dates[bisect.bisect_right(dates, after):]:
+            if calendar.days[day] and day != exclude:
+                found.append(day)
+                if len(found) == n:
+                    break
+        return found
+
+    def first_free_slot(self, doctor_id: int, not_before: datetime):
+        """Earliest open slot at or after `not_before`, as a datetime, or None."""
+        for slot_dt in self.iter_free_slots(doctor_id, not_before):
+            return slot_dt
+        return None
+
+    def iter_free_slots(self, doctor_id: int, not_before: datetime):
+        """Yield open slots at or after `not_before` in chronological order."""
+        calendar = self._doctors.get(doctor_id)
+        if calendar is None:
+            return
+        start_day = not_before.date()
+        first_index = -(-(not_before.hour * 60 + not_before.minute) // SLOT_MINUTES)
+        dates = calendar.sorted_dates()
+        for day in dates[bisect.bisect_left(dates, start_day):]:
+            mask = calendar.days[day]
+            if day == start_day:
+                mask &= ~((1 << first_index) - 1)
+            midnight = datetime.combine(day, time())
+            for index in iter_bits(mask):
+                yield midnight + timedelta(minutes=index * SLOT_MINUTES)
+
+    def first_free_across(self, doctor_ids, not_before: datetime):
+        """(slot datetime, doctor_id) of the earliest open slot among doctors."""
+        best = None
+        for doctor_id in doctor_ids:
+            slot_dt = self.first_free_slot(doctor_id, not_before)
+            if slot_dt is not None and (best is None or slot_dt < best[0]):
+                best = (slot_dt, doctor_id)
+        return best
+
+    def earliest_free_across(self, doctor_ids, not_before: datetime, k: int) -> list:
+        """The `k` earliest open slots among doctors as (slot datetime, doctor_id).
+
+        Each doctor's slots are already a sorted stream, so a heap merge only
+        advances as far as needed: O(k log d) after the first slot per doctor.
+        """
+        streams = [
+            zip(self.iter_free_slots(doctor_id, not_before), repeat(doctor_id))
+            for doctor_id in dict.fromkeys(doctor_ids)
+        ]
+        return list(islice(heapq.merge(*streams), k))
+
+    def stats(self) -> dict:
+        return {
+            "doctors_cached": len(self._doctors),
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+
+availability_engine = AvailabilityEngine()
@@ -0,0 +1,64 @@
+"""
+Periodic Background Jobs
+
+Small helper for jobs that run on the event loop every N seconds, started
+from the application startup hook and cancelled on shutdown. A failing run
+is logged and retried on the next tick; it never kills the loop.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Run `func()` (a coroutine function) every `interval` seconds."""
+
+    def __init__(self, name: str, func, interval: float, run_immediately: bool = True):
+        self.name = name
+        self._func = func
+        self.interval = interval
+        self._run_immediately = run_immediately
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self.runs = 0
+        self.failures = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def trigger(self):
+        """Run the job as soon as possible instead of waiting for the next tick."""
+        self._wakeup.set()
+
+    async def _loop(self):
+        if not self._run_immediately:
+            await self._sleep()
+        while True:
+            try:
+                await self._func()
+                self.runs += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Background job '{self.name}' failed: {e}")
+            await self._sleep()
+
+    async def _sleep(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
@@ -0,0 +1,427 @@
+"""
+Bulk Booking and Cancellation
+
+Moving or cancelling a block of appointments (a doctor calls in sick) used
+to mean one /Bland/book-appointment or /Bland/cancel-appointment call per
+patient, each with its own transaction, round trips and outbox jobs.
+
+bulk_book() and bulk_cancel() apply a whole batch inside the caller's
+transaction with a fixed number of set-based statements (the items travel
+as arrays through unnest), however many items there are:
+
+- bulk_book:   lock current appointments -> lock requested slots -> release
+               old slots -> take new slots -> move / insert appointments
+               -> calendar event ids -> link slots -> assign patients
+
+A slot that another item of the same batch vacates counts as free when that
+item's move succeeds, so a batch may swap two appointments' slots or move
+one into a slot another item leaves.
+- bulk_cancel: one statement that deletes the appointments, reopens their
+               slots and unassigns the patients
+
+The SMS and calendar jobs of the batch are written with a single
+outbox.enqueue_many(), using the same idempotency keys as the single-item
+endpoints, so re-running a batch never notifies a patient twice.
+
+Every item gets its own result. An item that cannot be applied (slot taken,
+appointment not found, ...) does not stop the others; callers wanting all
+or nothing roll back when `BulkOutcome.failed` is non-zero.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from api.Utils import outbox
+from api.Utils.doctor_directory import DoctorRecord
+from api.Utils.reservations import BOOKED, NOT_OFFERED, RESCHEDULED, SLOT_TAKEN, UNCHANGED
+from api.Utils.side_effects import booked_sms_body, calendar_event_id_for, cancelled_sms_body
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+
+# Per-item outcomes besides the booking outcomes
+CANCELLED = "cancelled"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+APPLIED = (BOOKED, RESCHEDULED, UNCHANGED, CANCELLED)
+
+# Id order gives every batch the same lock order (no deadlocks between batches)
+LOCK_EXISTING = """
+    SELECT id, patient_id, doctor_id, appointment_time, calendar_event_id
+    FROM appointments
+    WHERE patient_id = ANY(%s)
+    ORDER BY id
+    FOR UPDATE;
+"""
+
+# Requested slots, locked in id order; `open` as in reservations.RESERVE_SLOT
+# (holds are not converted here). Slots the batch itself frees are decided
+# in bulk_book(), since their appointments are still in place.
+LOCK_SLOTS = """
+    SELECT req.idx, s.id,
+           s.appointment_id IS NULL
+           AND (s.is_available OR (s.hold_token IS NOT NULL AND s.held_until <= now()))
+    FROM unnest(%(idx)s::int[], %(doctor_ids)s::int[], %(slots)s::timestamp[])
+         AS req(idx, doctor_id, slot)
+    JOIN doctor_slots s
+      ON s.doctor_id = req.doctor_id
+     AND s.slot_date = req.slot::date
+     AND s.slot_time = req.slot::time
+    ORDER BY s.id
+    FOR UPDATE OF s;
+"""
+
+TAKE_SLOTS = """
+    UPDATE doctor_slots
+       SET is_available = false,
+           hold_token = NULL,
+           held_until = NULL,
+           held_by = NULL
+     WHERE id = ANY(%s::bigint[]);
+"""
+
+RELEASE_SLOTS = """
+    UPDATE doctor_slots s
+       SET is_available = true,
+           appointment_id = NULL,
+           hold_token = NULL,
+           held_until = NULL,
+           held_by = NULL
+      FROM unnest(%s::int[], %s::timestamp[]) AS v(doctor_id, slot)
+     WHERE s.doctor_id = v.doctor_id
+       AND s.slot_date = v.slot::date
+       AND s.slot_time = v.slot::time;
+"""
+
+# Takes appointments moving into a slot another moving appointment leaves
+# out of the unique scheduled-slot index, so a swap or chain of moves does
+# not collide halfway through MOVE_APPOINTMENTS (which sets them back)
+PARK_APPOINTMENTS = """
+    UPDATE appointments SET status = 'rescheduling' WHERE id = ANY(%s::int[]);
+"""
+
+MOVE_APPOINTMENTS = """
+    UPDATE appointments a
+       SET doctor_id = v.doctor_id,
+           appointment_time = v.slot,
+           status = 'scheduled'
+      FROM unnest(%s::int[], %s::int[], %s::timestamp[]) AS v(id, doctor_id, slot)
+     WHERE a.id = v.id;
+"""
+
+INSERT_APPOINTMENTS = """
+    INSERT INTO appointments (patient_id, doctor_id, appointment_time, status, duration)
+    SELECT v.patient_id, v.doctor_id, v.slot, 'scheduled', 30
+    FROM unnest(%s::int[], %s::int[], %s::timestamp[]) AS v(patient_id, doctor_id, slot)
+    RETURNING id, patient_id;
+"""
+
+SET_EVENT_IDS = """
+    UPDATE appointments a
+       SET calendar_event_id = v.event_id
+      FROM unnest(%s::int[], %s::text[]) AS v(id, event_id)
+     WHERE a.id = v.id;
+"""
+
+LINK_SLOTS = """
+    UPDATE doctor_slots s
+       SET appointment_id = v.appointment_id
+      FROM unnest(%s::bigint[], %s::int[]) AS v(slot_id, appointment_id)
+     WHERE s.id = v.slot_id;
+"""
+
+ASSIGN_PATIENTS = """
+    UPDATE patients p
+       SET doctor_id = v.doctor_id
+      FROM unnest(%s::int[], %s::int[]) AS v(patient_id, doctor_id)
+     WHERE p.id = v.patient_id
+    RETURNING p.id, p.full_name, p.phone_number;
+"""
+
+CANCEL_APPOINTMENTS = """
+    WITH cancelled AS (
+        DELETE FROM appointments a
+         WHERE a.id = ANY(%s)
+        RETURNING a.id, a.patient_id, a.doctor_id, a.appointment_time, a.calendar_event_id
+    ),
+    freed AS (
+        UPDATE doctor_slots s
+           SET is_available = true,
+               appointment_id = NULL,
+               hold_token = NULL,
+               held_until = NULL,
+               held_by = NULL
+          FROM cancelled c
+         WHERE s.doctor_id = c.doctor_id
+           AND s.slot_date = c.appointment_time::date
+           AND s.slot_time = c.appointment_time::time
+    ),
+    unassigned AS (
+        UPDATE patients p
+           SET doctor_id = 0
+          FROM cancelled c
+         WHERE p.id = c.patient_id
+        RETURNING p.id, p.phone_number
+    )
+    SELECT c.id, c.doctor_id, c.appointment_time, c.calendar_event_id,
+           d.name, d.department, NULLIF(d.email, ''), u.phone_number
+    FROM cancelled c
+    JOIN doctors d ON d.id = c.doctor_id
+    LEFT JOIN unassigned u ON u.id = c.patient_id;
+"""
+
+DOCTOR_DAY_APPOINTMENTS = """
+    SELECT id FROM appointments
+    WHERE doctor_id = %s
+      AND appointment_time >= %s
+      AND appointment_time < %s
+      AND status = 'scheduled'
+    ORDER BY appointment_time;
+"""
+
+
+@dataclass(frozen=True)
+class BookingItem:
+    index: int              # position in the request, echoed in the result
+    patient_id: int
+    doctor: DoctorRecord
+    slot_dt: datetime
+
+
+@dataclass
+class BulkOutcome:
+    results: dict = field(default_factory=dict)     # item key -> result dict
+    booked: list = field(default_factory=list)      # (doctor_id, datetime) now taken
+    freed: list = field(default_factory=list)       # (doctor_id, datetime) reopened
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results.values() if r["status"] not in APPLIED)
+
+
+def _booking_result(item: BookingItem, status: str, appointment_id=None, event_id=None) -> dict:
+    return {
+        "index": item.index,
+        "status": status,
+        "appointment_id": appointment_id,
+        "patient_id": item.patient_id,
+        "doctor_name": item.doctor.name,
+        "appointment_date": item.slot_dt.strftime("%Y-%m-%d"),
+        "appointment_time": item.slot_dt.strftime("%I:%M %p"),
+        "calendar_event_id": event_id,
+    }
+
+
+async def bulk_book(cursor, items: list, directory) -> BulkOutcome:
+    """Book or move every item (distinct patients and slots) inside the caller's transaction."""
+    outcome = BulkOutcome()
+    if not items:
+        return outcome
+
+    # ━━━ Current appointments (locked) ━━━
+    await cursor.execute(LOCK_EXISTING, ([item.patient_id for item in items],))
+    existing = {}
+    for row in await cursor.fetchall():
+        existing.setdefault(row[1], row)
+
+    pending = []
+    for item in items:
+        current = existing.get(item.patient_id)
+        if current and current[2] == item.doctor.id and current[3] == item.slot_dt:
+            outcome.results[item.index] = _booking_result(item, UNCHANGED, current[0], current[4])
+        else:
+            pending.append(item)
+    if not pending:
+        return outcome
+
+    # ━━━ Lock every requested slot ━━━
+    await cursor.execute(LOCK_SLOTS, {
+        "idx": [item.index for item in pending],
+        "doctor_ids": [item.doctor.id for item in pending],
+        "slots": [item.slot_dt for item in pending],
+    })
+    slots = {idx: (slot_id, is_open) for idx, slot_id, is_open in await cursor.fetchall()}
+
+    # A slot held by an appointment that moves in this batch is free only if
+    # that move itself succeeds; drop such items until the set is stable
+    vacating = {
+        (existing[item.patient_id][2], existing[item.patient_id][3]): item.index
+        for item in pending if item.patient_id in existing
+    }
+    candidates = {item.index for item in pending if item.index in slots}
+    changed = True
+    while changed:
+        changed = False
+        for item in pending:
+            if item.index not in candidates:
+                continue
+            key = (item.doctor.id, item.slot_dt)
+            if not (slots[item.index][1] or vacating.get(key) in candidates):
+                candidates.discard(item.index)
+                changed = True
+
+    winners = []
+    for item in pending:
+        if item.index in candidates:
+            winners.append((item, slots[item.index][0]))
+        else:
+            outcome.results[item.index] = _booking_result(item, SLOT_TAKEN if item.index in slots else NOT_OFFERED)
+    if not winners:
+        return outcome
+
+    # ━━━ Free the old slots, take the new ones ━━━
+    moves = [(item, existing[item.patient_id]) for item, _ in winners if item.patient_id in existing]
+    new = [item for item, _ in winners if item.patient_id not in existing]
+    appointment_ids = {item.index: current[0] for item, current in moves}
+
+    if moves:
+        targets = {(item.doctor.id, item.slot_dt) for item, _ in winners}
+        parked = [current[0] for _, current in moves if (current[2], current[3]) in targets]
+        if parked:
+            await cursor.execute(PARK_APPOINTMENTS, (parked,))
+        await cursor.execute(RELEASE_SLOTS, (
+            [current[2] for _, current in moves],
+            [current[3] for _, current in moves],
+        ))
+    await cursor.execute(TAKE_SLOTS, ([slot_id for _, slot_id in winners],))
+
+    # ━━━ Move or insert the appointments ━━━
+    if moves:
+        await cursor.execute(MOVE_APPOINTMENTS, (
+            [current[0] for _, current in moves],
+            [item.doctor.id for item, _ in moves],
+            [item.slot_dt for item, _ in moves],
+        ))
+    if new:
+        await cursor.execute(INSERT_APPOINTMENTS, (
+            [item.patient_id for item in new],
+            [item.doctor.id for item in new],
+            [item.slot_dt for item in new],
+        ))
+        inserted = {patient_id: appointment_id for appointment_id, patient_id in await cursor.fetchall()}
+        for item in new:
+            appointment_ids[item.index] = inserted[item.patient_id]
+
+    # Deterministic event ids for appointments without an event yet
+    event_ids = {item.index: current[4] for item, current in moves if current[4]}
+    fresh = {
+        item.index: calendar_event_id_for(appointment_ids[item.index])
+        for item, _ in winners if item.index not in event_ids
+    }
+    if fresh:
+        await cursor.execute(SET_EVENT_IDS, (
+            [appointment_ids[idx] for idx in fresh], list(fresh.values()),
+        ))
+    event_ids.update(fresh)
+
+    await cursor.execute(LINK_SLOTS, (
+        [slot_id for _, slot_id in winners],
+        [appointment_ids[item.index] for item, _ in winners],
+    ))
+    await cursor.execute(ASSIGN_PATIENTS, (
+        [item.patient_id for item, _ in winners],
+        [item.doctor.id for item, _ in winners],
+    ))
+    patients = {patient_id: (name, phone) for patient_id, name, phone in await cursor.fetchall()}
+
+    # ━━━ Queue SMS and calendar jobs as one batch ━━━
+    jobs = []
+    for item, _ in winners:
+        appointment_id = appointment_ids[item.index]
+        current = existing.get(item.patient_id)
+        patient_name, phone = patients.get(item.patient_id, (None, None))
+        aggregate_key = f"appointment:{appointment_id}"
+        slot_key = item.slot_dt.isoformat()
+
+        if phone:
+            jobs.append((
+                "sms.send",
+                {"to": phone, "body": booked_sms_body(item.doctor.name, item.doctor.department, item.slot_dt)},
+                f"{aggregate_key}:sms:booked:{item.doctor.id}:{slot_key}",
+                f"{aggregate_key}:sms",
+            ))
+
+        calendar_payload = {
+            "appointment_id": appointment_id,
+            "patient_name": patient_name,
+            "start": slot_key,
+            "duration": 30,
+        }
+        if item.index in fresh:
+            if item.doctor.email:
+                jobs.append((
+                    "calendar.create", {**calendar_payload, "calendar_id": item.doctor.email},
+                    f"{aggregate_key}:calendar.create", aggregate_key,
+                ))
+        else:
+            # Moved event stays on the original doctor's calendar
+            old_doctor = directory.by_id.get(current[2])
+            if old_doctor and old_doctor.email:
+                jobs.append((
+                    "calendar.update",
+                    {**calendar_payload, "calendar_id": old_doctor.email, "event_id": event_ids[item.index]},
+                    f"{aggregate_key}:calendar.update:{item.doctor.id}:{slot_key}",
+                    aggregate_key,
+                ))
+
+        outcome.results[item.index] = _booking_result(
+            item, RESCHEDULED if current else BOOKED, appointment_id, event_ids[item.index],
+        )
+        outcome.booked.append((item.doctor.id, item.slot_dt))
+        if current:
+            outcome.freed.append((current[2], current[3]))
+
+    await outbox.enqueue_many(cursor, jobs)
+    logger.info(f"Bulk booking: {len(winners)} applied, {outcome.failed} failed")
+    return outcome
+
+
+async def appointments_on_day(cursor, doctor_id: int, day) -> list:
+    """Ids of a doctor's scheduled appointments on one day."""
+    start = datetime.combine(day, datetime.min.time())
+    await cursor.execute(DOCTOR_DAY_APPOINTMENTS, (doctor_id, start, start + timedelta(days=1)))
+    return [row[0] for row in await cursor.fetchall()]
+
+
+async def bulk_cancel(cursor, appointment_ids: list) -> BulkOutcome:
+    """Cancel appointments by id inside the caller's transaction; results keyed by id."""
+    outcome = BulkOutcome()
+    if not appointment_ids:
+        return outcome
+
+    await cursor.execute(CANCEL_APPOINTMENTS, (appointment_ids,))
+    rows = await cursor.fetchall()
+
+    jobs = []
+    for appointment_id, doctor_id, appt_time, event_id, doctor_name, department, calendar_id, phone in rows:
+        aggregate_key = f"appointment:{appointment_id}"
+        if event_id and calendar_id:
+            jobs.append((
+                "calendar.delete", {"calendar_id": calendar_id, "event_id": event_id},
+                f"{aggregate_key}:calendar.delete", aggregate_key,
+            ))
+        if phone:
+            jobs.append((
+                "sms.send", {"to": phone, "body": cancelled_sms_body(doctor_name, department, appt_time)},
+                f"{aggregate_key}:sms:cancelled", f"{aggregate_key}:sms",
+            ))
+        outcome.results[appointment_id] = {
+            "appointment_id": appointment_id,
+            "status": CANCELLED,
+            "doctor_name": doctor_name,
+            "department": department,
+            "date": appt_time.strftime("%Y-%m-%d"),
+            "time": appt_time.strftime("%I:%M %p"),
+        }
+        outcome.freed.append((doctor_id, appt_time))
+
+    for appointment_id in appointment_ids:
+        outcome.results.setdefault(appointment_id, {"appointment_id": appointment_id, "status": NOT_FOUND})
+
+    await outbox.enqueue_many(cursor, jobs)
+    logger.info(f"Bulk cancellation: {len(rows)} cancelled, {outcome.failed} not found")
+    return outcome
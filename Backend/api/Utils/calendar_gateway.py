@@ -0,0 +1,161 @@
+"""
+Batched Google Calendar Gateway
+
+Groups calendar inserts, patches and deletes into Google API batch requests
+(one HTTP round trip for up to CALENDAR_BATCH_SIZE operations) and returns
+one CalendarResult per operation, in order.
+
+- patch sends only the changed start / end, without reading the event first
+- insert uses the caller's event id, so 409 means "already created" and is
+  reported as success
+- delete of an event that is already gone (404 / 410) is a success
+- a patch of an event that does not exist comes back as not_found so the
+  caller can fall back to an insert
+
+Configuration (environment variables):
+- CALENDAR_BATCH_SIZE: operations per batch request (default 50, Google's
+  recommended maximum)
+- CALENDAR_TIME_ZONE: time zone of event start / end (default "EST")
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from googleapiclient.errors import HttpError
+
+from Google_calender import calendar_service
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_BATCH_SIZE = int(os.getenv("CALENDAR_BATCH_SIZE", "50"))
+CALENDAR_TIME_ZONE = os.getenv("CALENDAR_TIME_ZONE", "EST")
+
+# Private extended property marking events created by this service
+MANAGED_PROPERTY = "medicalAssistantManaged"
+
+INSERT = "insert"
+PATCH = "patch"
+DELETE = "delete"
+
+
+def event_times(start: datetime, duration_minutes: int = 30) -> dict:
+    """start / end fields of an event (also the whole body of a reschedule patch)."""
+    return {
+        "start": {"dateTime": start.isoformat(), "timeZone": CALENDAR_TIME_ZONE},
+        "end": {
+            "dateTime": (start + timedelta(minutes=duration_minutes)).isoformat(),
+            "timeZone": CALENDAR_TIME_ZONE,
+        },
+    }
+
+
+def event_body(patient_name: str, start: datetime, duration_minutes: int = 30, event_id: str | None = None) -> dict:
+    """Full body of a new appointment event."""
+    body = {
+        "summary": f"Appointment with {patient_name}",
+        **event_times(start, duration_minutes),
+        "extendedProperties": {"private": {MANAGED_PROPERTY: "true"}},
+        "reminders": {
+            "useDefault": False,
+            "overrides": [
+                {"method": "email", "minutes": 24 * 60},
+                {"method": "popup", "minutes": 10},
+            ],
+        },
+    }
+    if event_id:
+        body["id"] = event_id
+    return body
+
+
+@dataclass(frozen=True)
+class CalendarOp:
+    kind: str                 # INSERT / PATCH / DELETE
+    calendar_id: str
+    event_id: str
+    body: dict | None = None
+
+
+@dataclass(frozen=True)
+class CalendarResult:
+    ok: bool
+    event_id: str
+    status: int = 200
+    error: str | None = None
+
+    @property
+    def not_found(self) -> bool:
+        return self.status in (404, 410)
+
+
+def _request(service, op: CalendarOp):
+    events = service.events()
+    if op.kind == INSERT:
+        return events.insert(calendarId=op.calendar_id, body=op.body)
+    if op.kind == PATCH:
+        return events.patch(calendarId=op.calendar_id, eventId=op.event_id, body=op.body)
+    if op.kind == DELETE:
+        return events.delete(calendarId=op.calendar_id, eventId=op.event_id)
+    raise ValueError(f"Unknown calendar operation '{op.kind}'")
+
+
+def _result(op: CalendarOp, response, exception) -> CalendarResult:
+    if exception is None:
+        event_id = response.get("id", op.event_id) if isinstance(response, dict) else op.event_id
+        return CalendarResult(True, event_id)
+
+    status = int(exception.resp.status) if isinstance(exception, HttpError) else 0
+    if (op.kind == INSERT and status == 409) or (op.kind == DELETE and status in (404, 410)):
+        return CalendarResult(True, op.event_id, status)
+    return CalendarResult(False, op.event_id, status, f"{type(exception).__name__}: {exception}"[:1000])
+
+
+def service_unavailable(results: list) -> bool:
+    """Every op failed for a service-side reason (network, 429, 5xx): counts as an outage."""
+    return bool(results) and all(
+        not r.ok and (r.status == 0 or r.status == 429 or r.status >= 500) for r in results
+    )
+
+
+class CalendarGateway:
+    """Executes calendar operations in batch requests (blocking; run in a thread)."""
+
+    def __init__(self, service, batch_size: int = CALENDAR_BATCH_SIZE):
+        self._service = service
+        self.batch_size = batch_size
+        self.batches = 0
+        self.operations = 0
+
+    def execute(self, ops: list) -> list:
+        """Run `ops` in as few batch requests as possible; one result per op."""
+        results = [None] * len(ops)
+        for offset in range(0, len(ops), self.batch_size):
+            chunk = ops[offset:offset + self.batch_size]
+
+            def callback(request_id, response, exception, chunk=chunk, offset=offset):
+                index = int(request_id)
+                results[offset + index] = _result(chunk[index], response, exception)
+
+            batch = self._service.new_batch_http_request(callback=callback)
+            for index, op in enumerate(chunk):
+                batch.add(_request(self._service, op), request_id=str(index))
+            try:
+                batch.execute()
+            except Exception as e:
+                # The batch request itself failed: every op without a result failed
+                for index, op in enumerate(chunk):
+                    if results[offset + index] is None:
+                        results[offset + index] = _result(op, None, e)
+            self.batches += 1
+            self.operations += len(chunk)
+
+        logger.info(f"Calendar gateway ran {len(ops)} operation(s)")
+        return results
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "operations": self.operations}
+
+
+calendar_gateway = CalendarGateway(calendar_service)
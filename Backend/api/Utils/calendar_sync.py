@@ -0,0 +1,271 @@
+"""
+Incremental Calendar Reconciliation
+
+Keeps Google Calendar and the appointments table in agreement without
+rescanning every calendar:
+
+1. Sync: for each doctor calendar, events.list with the stored sync token
+   returns only the events changed since the previous run. Changes are
+   applied to the local `calendar_events` mirror and the new token is
+   stored. A calendar without a token, or whose token Google rejects with
+   410 Gone, gets one full listing to re-seed the mirror.
+2. Diff: two set-based queries compare the mirror with future scheduled
+   appointments of the calendars that synced successfully:
+   - missing or drifted: no mirrored event for the appointment, or one at a
+     different start time -> calendar.update (patch, falls back to insert)
+   - orphans: managed events (created by this service: id with
+     CALENDAR_EVENT_ID_PREFIX or the private MANAGED_PROPERTY) in the future
+     that no scheduled appointment of that calendar's doctor references
+     -> calendar.delete
+3. Repair: the fixes are enqueued in the outbox, so they go through the
+   batched gateway with the usual retries. Appointments that still have
+   outbox work pending are skipped; that work is already the repair.
+
+Listings go through the Google Calendar guard (resilience.py): while its
+breaker is open a run fails fast instead of waiting on timeouts.
+
+Configuration (environment variables):
+- CALENDAR_SYNC_INTERVAL: seconds between reconciliation runs (default 900)
+"""
+
+import logging
+import os
+from datetime import date, datetime
+
+from googleapiclient.errors import HttpError
+
+from api.Utils import outbox
+from api.Utils.background import PeriodicJob
+from api.Utils.calendar_gateway import CALENDAR_TIME_ZONE, MANAGED_PROPERTY
+from api.Utils.resilience import calendar_guard
+from api.Utils.side_effects import CALENDAR_EVENT_ID_PREFIX, calendar_event_id_for
+from database import async_pool
+from Google_calender import calendar_service
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "900"))
+
+CALENDARS_QUERY = """
+    SELECT DISTINCT d.email, s.sync_token
+    FROM doctors d
+    LEFT JOIN calendar_sync_state s ON s.calendar_id = d.email
+    WHERE d.email IS NOT NULL AND d.email <> '';
+"""
+
+UPSERT_EVENT = """
+    INSERT INTO calendar_events (calendar_id, event_id, start_time, managed, updated_at)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (calendar_id, event_id) DO UPDATE
+        SET start_time = EXCLUDED.start_time,
+            managed = EXCLUDED.managed,
+            updated_at = EXCLUDED.updated_at;
+"""
+
+DELETE_EVENT = "DELETE FROM calendar_events WHERE calendar_id = %s AND event_id = %s;"
+
+CLEAR_CALENDAR = "DELETE FROM calendar_events WHERE calendar_id = %s;"
+
+SAVE_SYNC_STATE = """
+    INSERT INTO calendar_sync_state (calendar_id, sync_token, last_synced_at, last_full_sync_at)
+    VALUES (%(calendar_id)s, %(token)s, now(), CASE WHEN %(full)s THEN now() END)
+    ON CONFLICT (calendar_id) DO UPDATE
+        SET sync_token = EXCLUDED.sync_token,
+            last_synced_at = now(),
+            last_full_sync_at = COALESCE(EXCLUDED.last_full_sync_at,
+                                         calendar_sync_state.last_full_sync_at);
+"""
+
+# Future scheduled appointments whose event is missing or at the wrong time
+MISSING_OR_DRIFTED = """
+    SELECT a.id, d.email, a.calendar_event_id, a.appointment_time, a.duration, p.full_name
+    FROM appointments a
+    JOIN doctors d ON d.id = a.doctor_id
+    JOIN patients p ON p.id = a.patient_id
+    LEFT JOIN calendar_events e
+           ON e.calendar_id = d.email
+          AND e.event_id = a.calendar_event_id
+    WHERE a.status = 'scheduled'
+      AND a.appointment_time >= now()
+      AND d.email = ANY(%(calendars)s)
+      AND (e.event_id IS NULL
+           OR e.start_time IS DISTINCT FROM (a.appointment_time AT TIME ZONE %(tz)s))
+      AND NOT EXISTS (
+          SELECT 1 FROM outbox o
+           WHERE o.aggregate_key = 'appointment:' || a.id
+             AND o.status IN ('pending', 'processing')
+      );
+"""
+
+# Future events created by this service that no scheduled appointment uses
+# on that calendar (an event left on the old doctor's calendar after a
+# cross-doctor reschedule is an orphan too)
+ORPHANS = """
+    SELECT e.calendar_id, e.event_id
+    FROM calendar_events e
+    WHERE e.managed
+      AND e.calendar_id = ANY(%(calendars)s)
+      AND e.start_time >= now()
+      AND NOT EXISTS (
+          SELECT 1 FROM appointments a
+          JOIN doctors d ON d.id = a.doctor_id
+           WHERE a.calendar_event_id = e.event_id
+             AND a.status = 'scheduled'
+             AND d.email = e.calendar_id
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM appointments a
+          JOIN outbox o ON o.aggregate_key = 'appointment:' || a.id
+           WHERE a.calendar_event_id = e.event_id
+             AND o.status IN ('pending', 'processing')
+      );
+"""
+
+
+def _list_changes(calendar_id: str, sync_token: str | None):
+    """All changed events since `sync_token` (or every event) plus the next token."""
+    events, page_token = [], None
+    while True:
+        params = {"calendarId": calendar_id, "showDeleted": True, "singleEvents": True, "maxResults": 2500}
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+        response = calendar_service.events().list(**params).execute()
+        events.extend(response.get("items", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return events, response.get("nextSyncToken")
+
+
+def _client_error(err: Exception) -> bool:
+    """4xx answers (e.g. 410 Gone) are not a Calendar outage."""
+    return isinstance(err, HttpError) and 400 <= int(err.resp.status) < 500 and int(err.resp.status) != 429
+
+
+async def _guarded_list(calendar_id: str, sync_token: str | None):
+    return await calendar_guard.call_blocking(_list_changes, calendar_id, sync_token, healthy_error=_client_error)
+
+
+def _mirror_row(calendar_id: str, event: dict):
+    start = event.get("start", {}).get("dateTime")
+    updated = event.get("updated")
+    # Ownership comes from the id or the private property this service sets,
+    # never the title: the doctor may have personal events named the same
+    managed = (
+        event["id"].startswith(CALENDAR_EVENT_ID_PREFIX)
+        or event.get("extendedProperties", {}).get("private", {}).get(MANAGED_PROPERTY) == "true"
+    )
+    return (
+        calendar_id,
+        event["id"],
+        datetime.fromisoformat(start.replace("Z", "+00:00")) if start else None,
+        managed,
+        datetime.fromisoformat(updated.replace("Z", "+00:00")) if updated else None,
+    )
+
+
+async def fetch_changes(calendar_id: str, sync_token: str | None):
+    """(events, next token, full) for one calendar; touches no database state."""
+    full = sync_token is None
+    try:
+        events, next_token = await _guarded_list(calendar_id, sync_token)
+    except HttpError as err:
+        if int(err.resp.status) != 410:
+            raise
+        # Token expired or invalidated by Google: re-seed this calendar
+        logger.info(f"Sync token for {calendar_id} expired, running a full sync")
+        full = True
+        events, next_token = await _guarded_list(calendar_id, None)
+    return events, next_token, full
+
+
+async def apply_changes(cursor, calendar_id: str, events: list, next_token: str | None, full: bool) -> int:
+    """Apply one calendar's listed changes to the mirror; returns events changed."""
+    if full:
+        await cursor.execute(CLEAR_CALENDAR, (calendar_id,))
+
+    live = [_mirror_row(calendar_id, e) for e in events if e.get("status") != "cancelled"]
+    gone = [(calendar_id, e["id"]) for e in events if e.get("status") == "cancelled"]
+    if live:
+        await cursor.executemany(UPSERT_EVENT, live)
+    if gone:
+        await cursor.executemany(DELETE_EVENT, gone)
+    await cursor.execute(SAVE_SYNC_STATE, {"calendar_id": calendar_id, "token": next_token, "full": full})
+    return len(events)
+
+
+async def repair_drift(cursor, calendars: list) -> dict:
+    """Diff the mirror against appointments and enqueue the repairs."""
+    today = date.today().isoformat()
+
+    await cursor.execute(MISSING_OR_DRIFTED, {"calendars": calendars, "tz": CALENDAR_TIME_ZONE})
+    missing = await cursor.fetchall()
+    jobs = []
+    for appointment_id, calendar_id, event_id, start, duration, patient_name in missing:
+        aggregate_key = f"appointment:{appointment_id}"
+        jobs.append((
+            "calendar.update",
+            {
+                "appointment_id": appointment_id,
+                "calendar_id": calendar_id,
+                "event_id": event_id or calendar_event_id_for(appointment_id),
+                "patient_name": patient_name,
+                "start": start.isoformat(),
+                "duration": duration or 30,
+            },
+            f"{aggregate_key}:calendar.repair:{start.isoformat()}:{today}",
+            aggregate_key,
+        ))
+
+    await cursor.execute(ORPHANS, {"calendars": calendars})
+    orphans = await cursor.fetchall()
+    for calendar_id, event_id in orphans:
+        jobs.append((
+            "calendar.delete",
+            {"calendar_id": calendar_id, "event_id": event_id},
+            f"calendar:{calendar_id}:{event_id}:orphan.delete:{today}",
+            f"calendar:{calendar_id}:{event_id}",
+        ))
+
+    await outbox.enqueue_many(cursor, jobs)
+
+    return {"repaired": len(missing), "orphans_deleted": len(orphans)}
+
+
+async def reconcile_calendars() -> dict:
+    """One reconciliation run over every doctor calendar."""
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(CALENDARS_QUERY)
+            calendars = await cursor.fetchall()
+        # End the read transaction: the listings below run with none open, so
+        # the connection is not idle in transaction while Google answers
+        await conn.commit()
+
+        synced, changed = [], 0
+        for calendar_id, sync_token in calendars:
+            try:
+                events, next_token, full = await fetch_changes(calendar_id, sync_token)
+                # One short transaction per calendar for the mirror writes
+                async with conn.transaction():
+                    async with conn.cursor() as cursor:
+                        changed += await apply_changes(cursor, calendar_id, events, next_token, full)
+                synced.append(calendar_id)
+            except Exception as e:
+                # Mirror left as it was; this calendar is not diffed this run
+                logger.error(f"Calendar sync failed for {calendar_id}: {e}")
+
+        summary = {"calendars": len(synced), "events_changed": changed}
+        if synced:
+            async with conn.cursor() as cursor:
+                summary.update(await repair_drift(cursor, synced))
+        await conn.commit()
+
+    if summary.get("repaired") or summary.get("orphans_deleted"):
+        outbox.outbox_worker.trigger()
+        logger.info(f"Calendar reconciliation: {summary}")
+    return summary
+
+
+calendar_sync_job = PeriodicJob("calendar-sync", reconcile_calendars, CALENDAR_SYNC_INTERVAL)
@@ -0,0 +1,131 @@
+"""
+Live Appointment Change Feed
+
+Pushes appointment changes to open dashboards over Server-Sent Events, so
+they refresh when something changes instead of refetching /appointments
+on their own schedule.
+
+- source: the `appointment_events` notification from the appointments
+  trigger (migrations 0017, 0020, 0022), so bookings, reschedules and cancellations made
+  by any Bland endpoint, bulk operation or worker reach every process
+- fan-out: each SSE connection is a Subscription with its own bounded
+  queue, optionally filtered to one doctor; an event for doctor 7 (or moved
+  away from doctor 7) is only queued for subscribers of doctor 7 and the
+  unfiltered ones
+- backpressure: a subscriber whose queue is full (a stalled client) gets
+  its queue replaced by a single `resync` event rather than blocking the
+  fan-out or growing without bound
+- reconnects: when the notification listener reconnects and may have
+  missed events, every subscriber gets `resync`; so does a browser that
+  reconnects, since events are not replayed
+
+Clients treat `resync` as "refetch the list"; every other event carries the
+appointment as a row of /appointments shows it (plus the previous doctor,
+department and time on updates) and is applied to the list in place.
+
+Configuration (environment variables):
+- FEED_QUEUE_SIZE: events buffered per subscriber (default 100)
+- FEED_KEEPALIVE: seconds between keep-alive comments on an idle stream (default 15)
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "100"))
+FEED_KEEPALIVE = float(os.getenv("FEED_KEEPALIVE", "15"))
+
+RESYNC = "resync"
+
+
+class Subscription:
+    """One SSE connection's queue of (event id, event type, data)."""
+
+    def __init__(self, doctor_id: int | None, queue_size: int):
+        self.doctor_id = doctor_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event: dict) -> bool:
+        return self.doctor_id is None or self.doctor_id in (event.get("doctor_id"), event.get("old_doctor_id"))
+
+
+class ChangeFeed:
+    """Fan appointment events out to the subscribed dashboards."""
+
+    def __init__(self, queue_size: int = FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def subscribe(self, doctor_id: int | None = None) -> Subscription:
+        subscription = Subscription(doctor_id, self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+    def _offer(self, subscription: Subscription, item):
+        try:
+            subscription.queue.put_nowait(item)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog, it refetches on resync
+            self.overflows += 1
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait((next(self._ids), RESYNC, "{}"))
+
+    def publish(self, payload=None):
+        """pg_listener handler for `appointment_events` (payload: JSON event)."""
+        if payload is None:
+            for subscription in self._subscribers:
+                self._offer(subscription, (next(self._ids), RESYNC, "{}"))
+            return
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.error(f"Ignoring malformed appointment event: {payload!r}")
+            return
+        self.published += 1
+        item = (next(self._ids), event.get("type", "updated"), payload)
+        for subscription in self._subscribers:
+            if subscription.wants(event):
+                self._offer(subscription, item)
+
+
+change_feed = ChangeFeed()
+
+
+async def sse_events(request, doctor_id: int | None = None):
+    """Server-Sent Events stream of the feed for one client."""
+    subscription = change_feed.subscribe(doctor_id)
+    try:
+        # Browsers reconnect after `retry` ms; a new stream starts with resync
+        yield f"retry: 3000\nevent: {RESYNC}\ndata: {{}}\n\n"
+        while not await request.is_disconnected():
+            try:
+                event_id, event_type, data = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=FEED_KEEPALIVE
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+    finally:
+        change_feed.unsubscribe(subscription)
@@ -0,0 +1,116 @@
+"""
+Dashboard Statistics
+
+/dashboard/stats used to run six queries per load: four COUNT(*) scans, an
+upcoming-appointments count and the recent-appointments join. It now reads
+the trigger-maintained rollups from migration 0014 in one statement:
+
+- totals come from `dashboard_counters`
+- today's and upcoming counts come from `appointment_day_counts`; only the
+  rest of today (scheduled and not yet started) is counted from the
+  appointments table, through the appointment_time index
+- the next five appointments are one indexed LIMIT query
+
+The result is cached in process for DASHBOARD_STATS_TTL seconds, and
+concurrent requests on a stale cache share one query. Every response
+carries `as_of`, the database time the numbers were read.
+
+Configuration (environment variables):
+- DASHBOARD_STATS_TTL: seconds a result is served from memory (default 10)
+"""
+
+import logging
+import os
+import threading
+import time
+
+from database import get_connection
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_STATS_TTL = float(os.getenv("DASHBOARD_STATS_TTL", "10"))
+
+DASHBOARD_STATS_QUERY = """
+    SELECT
+        (SELECT value FROM dashboard_counters WHERE name = 'patients'),
+        (SELECT value FROM dashboard_counters WHERE name = 'doctors'),
+        (SELECT value FROM dashboard_counters WHERE name = 'appointments'),
+        (SELECT COALESCE(sum(count), 0) FROM appointment_day_counts
+          WHERE day = CURRENT_DATE),
+        (SELECT COALESCE(sum(count), 0) FROM appointment_day_counts
+          WHERE day > CURRENT_DATE AND status = 'scheduled')
+        + (SELECT count(*) FROM appointments
+            WHERE appointment_time >= CURRENT_TIMESTAMP
+              AND appointment_time < CURRENT_DATE + 1
+              AND status = 'scheduled'),
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', r.id,
+                    'patient_name', r.patient_name,
+                    'doctor_name', r.doctor_name,
+                    'appointment_time', to_char(r.appointment_time, 'YYYY-MM-DD HH24:MI')
+                ) ORDER BY r.appointment_time), '[]'::json)
+           FROM (
+                SELECT a.id, p.full_name AS patient_name, d.name AS doctor_name, a.appointment_time
+                FROM appointments a
+                JOIN patients p ON a.patient_id = p.id
+                JOIN doctors d ON a.doctor_id = d.id
+                WHERE a.appointment_time >= CURRENT_DATE
+                ORDER BY a.appointment_time ASC
+                LIMIT 5
+           ) r),
+        now();
+"""
+
+
+class DashboardStats:
+    """TTL-cached reader of the dashboard rollups."""
+
+    def __init__(self, ttl: float = DASHBOARD_STATS_TTL):
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def invalidate(self, payload=None):
+        self._loaded_at = 0.0
+
+    def get(self) -> dict:
+        """Current stats; sync, for the threadpool-run dashboard routes."""
+        if self._value is not None and time.monotonic() - self._loaded_at < self.ttl:
+            self.hits += 1
+            return self._value
+        with self._lock:
+            # Another request may have reloaded while this one waited
+            if self._value is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._value
+            self._value = self._load()
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+            return self._value
+
+    def _load(self) -> dict:
+        with get_connection() as (conn, cursor):
+            cursor.execute(DASHBOARD_STATS_QUERY)
+            patients, doctors, appointments, today, upcoming, recent, as_of = cursor.fetchone()
+            conn.rollback()
+        return {
+            'stats': {
+                'total_patients': patients or 0,
+                # Excludes the placeholder doctor row, as before
+                'total_doctors': (doctors or 0) - 1,
+                'total_appointments': appointments or 0,
+                'todays_appointments': today,
+                'recent_appointments': recent,
+                'upcoming_appointments': upcoming,
+            },
+            'as_of': as_of.isoformat(),
+        }
+
+    def stats(self) -> dict:
+        return {"ttl": self.ttl, "hits": self.hits, "loads": self.loads}
+
+
+dashboard_stats = DashboardStats()
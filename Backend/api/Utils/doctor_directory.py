@@ -0,0 +1,233 @@
+"""
+In-Memory Doctor Directory
+
+Process-wide cache of the doctors table with precomputed normalized names,
+department maps and id / email lookups, so resolving the doctor named by a
+caller is a dictionary hit instead of a full table scan per voice turn.
+
+The cache is reloaded lazily on the next lookup after it is invalidated:
+- by the `doctors_changed` notification (trigger from migration 0002)
+- when the notification listener (re)connects and may have missed events
+- after DOCTOR_DIRECTORY_TTL seconds as a safety net (default 300)
+
+Name and department matching runs in one of two modes (DOCTOR_MATCH_MODE):
+- "memory" (default): exact / substring / trigram-fuzzy match against the
+  cached directory (api/Utils/fuzzy.py)
+- "pg_trgm": one indexed query ranked by pg_trgm similarity in Postgres
+  (migration 0003), returning only the best candidate; useful to compare
+  with the in-process matcher on large directories. DOCTOR_TRGM_THRESHOLD
+  sets the minimum similarity (default 0.3), applied as the transaction's
+  pg_trgm.similarity_threshold
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from api.Utils.fuzzy import TrigramIndex
+from api.Utils.helper import normalize_name
+
+logger = logging.getLogger(__name__)
+
+DOCTOR_DIRECTORY_TTL = float(os.getenv("DOCTOR_DIRECTORY_TTL", "300"))
+
+DOCTOR_MATCH_MODE = os.getenv("DOCTOR_MATCH_MODE", "memory").lower()
+DOCTOR_TRGM_THRESHOLD = float(os.getenv("DOCTOR_TRGM_THRESHOLD", "0.3"))
+
+DOCTORS_QUERY = "SELECT id, name, department, email FROM doctors ORDER BY id;"
+
+# `%` compares against the pg_trgm.similarity_threshold setting, not the
+# `similarity() >=` bound; set it for the transaction so the indexed
+# predicate honours DOCTOR_TRGM_THRESHOLD (also below the 0.3 default)
+SET_TRGM_THRESHOLD = "SELECT set_config('pg_trgm.similarity_threshold', %s, true);"
+
+# Ranking mirrors the in-memory matcher: exact, then substring, then similarity
+PG_TRGM_DOCTOR_QUERY = """
+    SELECT id, name, department, email
+    FROM doctors
+    WHERE (normalize_doctor_name(name) %% %(q)s
+           AND similarity(normalize_doctor_name(name), %(q)s) >= %(threshold)s)
+       OR normalize_doctor_name(name) LIKE '%%' || %(q)s || '%%'
+    ORDER BY normalize_doctor_name(name) = %(q)s DESC,
+             normalize_doctor_name(name) LIKE '%%' || %(q)s || '%%' DESC,
+             similarity(normalize_doctor_name(name), %(q)s) DESC,
+             id
+    LIMIT 1;
+"""
+
+PG_TRGM_DEPARTMENT_QUERY = """
+    SELECT LOWER(department)
+    FROM doctors
+    WHERE LOWER(department) %% %(q)s
+      AND similarity(LOWER(department), %(q)s) >= %(threshold)s
+    GROUP BY LOWER(department)
+    ORDER BY LOWER(department) = %(q)s DESC,
+             similarity(LOWER(department), %(q)s) DESC
+    LIMIT 1;
+"""
+
+
+@dataclass(frozen=True)
+class DoctorRecord:
+    id: int
+    name: str
+    department: str
+    email: str
+    norm_name: str          # normalize_name(name)
+    department_key: str     # department.lower()
+
+    @classmethod
+    def from_row(cls, row):
+        doctor_id, name, department, email = row
+        return cls(
+            id=doctor_id,
+            name=name,
+            department=department,
+            email=email,
+            norm_name=normalize_name(name or ""),
+            department_key=(department or "").lower(),
+        )
+
+
+class DirectorySnapshot:
+    """Immutable lookup tables built from one read of the doctors table."""
+
+    def __init__(self, rows):
+        self.doctors = tuple(DoctorRecord.from_row(row) for row in rows)
+
+        self.by_id = {d.id: d for d in self.doctors}
+        self.by_email = {d.email.lower(): d for d in self.doctors if d.email}
+        self.by_norm_name = {d.norm_name: d for d in self.doctors}
+        self.by_lower_name = {}
+        self.by_department = {}
+        for d in self.doctors:
+            self.by_lower_name.setdefault((d.name or "").lower(), []).append(d)
+            self.by_department.setdefault(d.department_key, []).append(d)
+        self.departments = list(self.by_department)
+
+        # Fuzzy indexes over the normalized names and department keys
+        self.name_index = TrigramIndex(self.by_norm_name)
+        self.department_index = TrigramIndex(self.departments)
+
+    def match(self, input_name: str):
+        """Resolve a spoken doctor name: exact, then substring, then fuzzy."""
+        norm_input = normalize_name(input_name)
+
+        # 1) Exact normalized match
+        if norm_input in self.by_norm_name:
+            return self.by_norm_name[norm_input]
+
+        # 2) Substring match
+        key = self.name_index.containing(norm_input)
+        if key is not None:
+            return self.by_norm_name[key]
+
+        # 3) Fuzzy match fallback
+        key = self.name_index.best(norm_input, cutoff=0.5)
+        if key is not None:
+            return self.by_norm_name[key]
+
+        return None
+
+    def match_department(self, raw_department: str):
+        """Closest known department key for a spoken department, or None."""
+        department_key = raw_department.lower()
+        if department_key in self.by_department:
+            return department_key
+        return self.department_index.best(department_key, cutoff=0.5)
+
+    def find_in_department(self, name: str, department: str):
+        """Doctor with exactly this name (case-insensitive) in a department."""
+        department_key = department.lower()
+        for record in self.by_lower_name.get(name.lower(), []):
+            if record.department_key == department_key:
+                return record
+        return None
+
+
+class DoctorDirectory:
+    """Lazily (re)loaded holder of the current DirectorySnapshot."""
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    def invalidate(self, payload=None):
+        """Mark the directory stale; used as a pg_listener handler."""
+        self._stale = True
+
+    @property
+    def is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._loaded_at < self._ttl
+        )
+
+    async def get(self, cursor) -> DirectorySnapshot:
+        """Current snapshot, reloading through `cursor` if it is stale."""
+        if self.is_fresh:
+            return self._snapshot
+
+        async with self._lock:
+            if not self.is_fresh:
+                # Clear the flag first so a change notified mid-reload
+                # triggers another reload on the next lookup.
+                self._stale = False
+                try:
+                    await cursor.execute(DOCTORS_QUERY)
+                    self._snapshot = DirectorySnapshot(await cursor.fetchall())
+                except Exception:
+                    self._stale = True
+                    raise
+                self._loaded_at = time.monotonic()
+                self.reloads += 1
+                logger.info(f"Doctor directory loaded ({len(self._snapshot.doctors)} doctors)")
+        return self._snapshot
+
+
+doctor_directory = DoctorDirectory(DOCTOR_DIRECTORY_TTL)
+
+
+async def find_doctor_by_name(cursor, input_name: str):
+    """Find a doctor by name using flexible matching; returns a DoctorRecord or None."""
+    norm_input = normalize_name(input_name or "")
+    if not norm_input:
+        # Nothing left to match ("Dr.", blank): LIKE '%%' would match everyone
+        return None
+
+    if DOCTOR_MATCH_MODE == "pg_trgm":
+        await cursor.execute(SET_TRGM_THRESHOLD, (str(DOCTOR_TRGM_THRESHOLD),))
+        await cursor.execute(PG_TRGM_DOCTOR_QUERY, {
+            "q": norm_input,
+            "threshold": DOCTOR_TRGM_THRESHOLD,
+        })
+        row = await cursor.fetchone()
+        return DoctorRecord.from_row(row) if row else None
+
+    directory = await doctor_directory.get(cursor)
+    return directory.match(input_name)
+
+
+async def find_department(cursor, raw_department: str):
+    """Closest known department key (lowercase) for a spoken department, or None."""
+    if not (raw_department or "").strip():
+        return None
+
+    if DOCTOR_MATCH_MODE == "pg_trgm":
+        await cursor.execute(SET_TRGM_THRESHOLD, (str(DOCTOR_TRGM_THRESHOLD),))
+        await cursor.execute(PG_TRGM_DEPARTMENT_QUERY, {
+            "q": raw_department.lower(),
+            "threshold": DOCTOR_TRGM_THRESHOLD,
+        })
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+    directory = await doctor_directory.get(cursor)
+    return directory.match_department(raw_department)
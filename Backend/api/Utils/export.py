@@ -0,0 +1,78 @@
+"""
+Streaming Exports
+
+Reporting exports of whole tables (a year of appointments, every patient)
+are streamed instead of built as one JSON document:
+
+- rows are read through a server-side (named) cursor, EXPORT_BATCH_ROWS at
+  a time, so only one batch is ever held in the worker
+- each batch is encoded (CSV or NDJSON) and yielded as one chunk of a
+  StreamingResponse, so the body is never held whole either
+
+The generator checks out its own pooled connection when the response
+starts streaming and returns it when the export finishes or the client
+disconnects, so a long export never holds a request-scoped connection.
+
+Configuration (environment variables):
+- EXPORT_BATCH_ROWS: rows fetched and written per chunk (default 2000)
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, time
+
+from database import get_connection
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(fmt: str, columns: list, rows: list) -> str:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+    )
+
+
+def stream_query(query: str, params, columns: list, fmt: str):
+    """Yield `query`'s rows encoded as `fmt`, one chunk per batch."""
+    if fmt == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(columns)
+        yield header.getvalue()
+
+    exported = 0
+    with get_connection() as (conn, _):
+        try:
+            # Named cursor: rows stay on the server until fetched
+            with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = EXPORT_BATCH_ROWS
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                    if not rows:
+                        break
+                    exported += len(rows)
+                    yield _encode(fmt, columns, rows)
+        finally:
+            conn.rollback()
+            logger.info(f"Export streamed {exported} row(s) as {fmt}")
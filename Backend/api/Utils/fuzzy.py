@@ -0,0 +1,109 @@
+"""
+Character N-gram Fuzzy Matching
+
+`difflib.get_close_matches` compares the query against every candidate with
+SequenceMatcher, which is O(n * m^2) per lookup. TrigramIndex keeps an
+inverted index from padded character trigrams to candidate keys, so a lookup
+only scores candidates that share at least one trigram with the query:
+
+1. count shared trigrams per candidate through the posting lists
+2. keep the best `shortlist` candidates by Dice coefficient
+3. rerank those with SequenceMatcher.ratio(), the same score difflib uses,
+   so cutoffs keep their meaning (0.5 here == cutoff=0.5 in difflib)
+
+Candidates sharing no trigram with the query are never returned, which only
+matters for very short or completely scrambled inputs.
+"""
+
+from collections import Counter
+from difflib import SequenceMatcher
+
+PAD = "$"
+
+
+def ngrams(text: str, n: int = 3, padded: bool = True) -> list[str]:
+    """Character n-grams of `text`, padded at both ends by default."""
+    if padded:
+        text = PAD * (n - 1) + text + PAD * (n - 1)
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class TrigramIndex:
+    """Inverted trigram index over a fixed set of string keys."""
+
+    def __init__(self, keys, n: int = 3, shortlist: int = 32):
+        self.n = n
+        self.shortlist = shortlist
+        self.keys = list(dict.fromkeys(keys))   # de-duplicated, order kept
+        self._gram_counts = []
+        self._postings = {}
+        for key_id, key in enumerate(self.keys):
+            grams = Counter(ngrams(key, n))
+            self._gram_counts.append(sum(grams.values()))
+            for gram, count in grams.items():
+                self._postings.setdefault(gram, []).append((key_id, count))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query: str, k: int = 1, cutoff: float = 0.0) -> list[tuple[str, float]]:
+        """Top-k keys similar to `query` as (key, score) pairs, best first."""
+        if not query or not self.keys:
+            return []
+
+        query_grams = Counter(ngrams(query, self.n))
+        shared = Counter()
+        for gram, q_count in query_grams.items():
+            for key_id, count in self._postings.get(gram, ()):
+                shared[key_id] += min(q_count, count)
+        if not shared:
+            return []
+
+        query_total = sum(query_grams.values())
+        candidates = sorted(
+            shared.items(),
+            key=lambda item: 2.0 * item[1] / (query_total + self._gram_counts[item[0]]),
+            reverse=True,
+        )[:max(self.shortlist, k)]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        scored = []
+        for key_id, _ in candidates:
+            matcher.set_seq1(self.keys[key_id])
+            if (
+                matcher.real_quick_ratio() >= cutoff
+                and matcher.quick_ratio() >= cutoff
+            ):
+                score = matcher.ratio()
+                if score >= cutoff:
+                    scored.append((score, key_id))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.keys[key_id], score) for score, key_id in scored[:k]]
+
+    def best(self, query: str, cutoff: float = 0.5):
+        """Single best key scoring at least `cutoff`, or None."""
+        found = self.search(query, k=1, cutoff=cutoff)
+        return found[0][0] if found else None
+
+    def containing(self, fragment: str):
+        """First key (in insertion order) containing `fragment` as a substring."""
+        if not fragment:
+            return None
+        grams = set(ngrams(fragment, self.n, padded=False))
+        if not grams:
+            # Shorter than one n-gram: nothing to intersect, scan instead
+            return next((key for key in self.keys if fragment in key), None)
+
+        candidate_ids = None
+        for gram in grams:
+            ids = {key_id for key_id, _ in self._postings.get(gram, ())}
+            candidate_ids = ids if candidate_ids is None else candidate_ids & ids
+            if not candidate_ids:
+                return None
+
+        for key_id in sorted(candidate_ids):
+            if fragment in self.keys[key_id]:
+                return self.keys[key_id]
+        return None
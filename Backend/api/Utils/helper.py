@@ -1,9 +1,7 @@
 import re
-import difflib
 import phonenumbers
 from dateutil.parser import parse as parse_datetime
 from datetime import datetime,timedelta,time,date
-from Google_calender import calendar_service
 import calendar
 
 
@@ -91,35 +89,6 @@ def split_time_range(time_range: str) -> list[str]:
     except Exception as e:
         raise ValueError(f"Invalid time format: {e}")
 
-def find_doctor_by_name(cursor, input_name: str):
-    """Find a doctor by name using flexible matching."""
-    norm_input = normalize_name(input_name)
-
-    # Fetch all doctors
-    cursor.execute("SELECT name, department FROM doctors;")
-    doctors = cursor.fetchall()
-
-    # Build normalized map
-    norm_map = {normalize_name(name): (name, None, department) 
-                for name, department in doctors}
-
-    # 1) Exact normalized match
-    if norm_input in norm_map:
-        return norm_map[norm_input]
-
-    # 2) Substring match
-    for key, val in norm_map.items():
-        if norm_input and norm_input in key:
-            return val
-
-    # 3) Fuzzy match fallback
-    choices = list(norm_map.keys())
-    fuzzy = difflib.get_close_matches(norm_input, choices, n=1, cutoff=0.5)
-    if fuzzy:
-        return norm_map[fuzzy[0]]
-
-    return None
-
 def parse_date(dob_str: str) -> date:
     """Parse various date formats into a date object."""
     def parse_month(m_str):
@@ -202,42 +171,3 @@ def parse_date(dob_str: str) -> date:
             continue
     
     return None
-
-def create_calendar_event(doctor_calendar_id, patient_name, appointment_datetime, duration_minutes=30):
-    event = {
-        'summary': f'Appointment with {patient_name}',
-        'start': {
-            'dateTime': appointment_datetime.isoformat(),
-            'timeZone': 'EST',
-        },
-        'end': {
-            'dateTime': (appointment_datetime + timedelta(minutes=duration_minutes)).isoformat(),
-            'timeZone': 'EST',
-        },
-        'reminders': {
-            'useDefault': False,
-            'overrides': [
-                {'method': 'email', 'minutes': 24 * 60},
-                {'method': 'popup', 'minutes': 10},
-            ],
-        },
-    }
-
-    event_result = calendar_service.events().insert(
-        calendarId=doctor_calendar_id,
-        body=event
-    ).execute()
-
-    return event_result.get('id')
-    
-def update_calendar_event(event_id, calendar_id, title, new_datetime, duration_minutes=30):
-    event = calendar_service.events().get(calendarId=calendar_id, eventId=event_id).execute()
-    event['start'] = {'dateTime': new_datetime.isoformat(), 'timeZone': 'EST'}
-    end_dt = new_datetime + timedelta(minutes=duration_minutes)
-    event['end']   = {'dateTime': end_dt.isoformat(),   'timeZone': 'EST'}
-    updated = calendar_service.events().patch(
-        calendarId=calendar_id,
-        eventId=event_id,
-        body=event
-    ).execute()
-    return updated['id']
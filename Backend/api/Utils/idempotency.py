@@ -0,0 +1,239 @@
+"""
+Idempotency Keys for Webhook Endpoints
+
+The voice platform retries webhooks on timeouts. With an idempotency key
+(`Idempotency-Key` header, or "idempotency_key" in the JSON body) a retry
+returns the stored response of the first attempt instead of running the
+booking / cancellation again:
+
+1. replay from the in-process LRU of completed responses (no database)
+2. otherwise claim (endpoint, key) with INSERT .. ON CONFLICT DO NOTHING:
+   - claimed: run the handler and store its response; a 5xx response
+     drops the claim so the next retry runs for real
+   - exists, completed, same request: replay the stored response
+   - exists with a different request body: 422
+   - exists, still running: 409 (the caller retries later); a claim whose
+     lease expired (worker died mid-request) is taken over
+3. stored responses expire after IDEMPOTENCY_TTL; a periodic job prunes them
+
+Replayed responses carry the `Idempotent-Replayed: true` header. Requests
+without a key behave exactly as before.
+
+The claim, completion and release run on the route's own `db` connection
+(get_async_db), each committed on its own, so an idempotent request never
+holds a second pool connection while the first one waits on it.
+
+Configuration (environment variables):
+- IDEMPOTENCY_TTL: seconds a stored response is replayed (default 86400)
+- IDEMPOTENCY_LEASE: seconds before an unfinished claim is taken over (default 60)
+- IDEMPOTENCY_CACHE_SIZE: completed responses kept in memory (default 10000)
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from psycopg.pq import TransactionStatus
+from psycopg.types.json import Jsonb
+
+from api.Utils.background import PeriodicJob
+from database import async_pool
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LEASE = int(os.getenv("IDEMPOTENCY_LEASE", "60"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+CLAIM = """
+    INSERT INTO idempotency_keys (endpoint, key, request_hash, locked_until, expires_at)
+    VALUES (%(endpoint)s, %(key)s, %(hash)s,
+            now() + make_interval(secs => %(lease)s),
+            now() + make_interval(secs => %(ttl)s))
+    ON CONFLICT (endpoint, key) DO UPDATE
+        SET request_hash = EXCLUDED.request_hash,
+            status = 'in_progress',
+            response_status = NULL,
+            response_body = NULL,
+            locked_until = EXCLUDED.locked_until,
+            expires_at = EXCLUDED.expires_at
+        WHERE idempotency_keys.expires_at <= now()
+           OR (idempotency_keys.status = 'in_progress'
+               AND idempotency_keys.locked_until <= now())
+    RETURNING true;
+"""
+
+LOOKUP = """
+    SELECT request_hash, status, response_status, response_body,
+           EXTRACT(EPOCH FROM expires_at - now())
+    FROM idempotency_keys
+    WHERE endpoint = %s AND key = %s;
+"""
+
+COMPLETE = """
+    UPDATE idempotency_keys
+       SET status = 'completed',
+           response_status = %s,
+           response_body = %s,
+           locked_until = NULL
+     WHERE endpoint = %s AND key = %s;
+"""
+
+RELEASE = "DELETE FROM idempotency_keys WHERE endpoint = %s AND key = %s AND status = 'in_progress';"
+
+PRUNE = "DELETE FROM idempotency_keys WHERE expires_at <= now();"
+
+
+class ResponseCache:
+    """LRU of completed responses: (endpoint, key) -> (hash, status, body, expires)."""
+
+    def __init__(self, max_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+
+    def get(self, cache_key):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry[3] <= time.monotonic():
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        self.hits += 1
+        return entry
+
+    def put(self, cache_key, request_hash, status, body, ttl_seconds):
+        self._entries[cache_key] = (request_hash, status, body, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def _replay(request_hash, entry_hash, status, body):
+    if request_hash != entry_hash:
+        return JSONResponse(
+            {"error": "Idempotency key was already used with a different request"},
+            status_code=422,
+        )
+    return JSONResponse(body, status_code=status, headers={REPLAY_HEADER: "true"})
+
+
+def _as_response(result):
+    """(status, JSON body) of whatever the route returned."""
+    if isinstance(result, JSONResponse):
+        return result.status_code, json.loads(result.body)
+    return 200, result
+
+
+async def _idempotency_key(request: Request):
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key:
+        return key
+    try:
+        body = await request.json()
+    except Exception:
+        return None
+    key = body.get("idempotency_key") if isinstance(body, dict) else None
+    return str(key) if key else None
+
+
+def _route_db(args, kwargs):
+    """The (connection, cursor) the route received from get_async_db."""
+    return kwargs["db"] if "db" in kwargs else args[0]
+
+
+def idempotent(endpoint: str):
+    """Make a `(request, db)` route replay its response for a repeated key."""
+    def decorate(route):
+        @functools.wraps(route)
+        async def wrapper(request: Request, *args, **kwargs):
+            key = await _idempotency_key(request)
+            if not key:
+                return await route(request, *args, **kwargs)
+
+            request_hash = hashlib.sha256(await request.body()).hexdigest()
+            cache_key = (endpoint, key)
+            cached = response_cache.get(cache_key)
+            if cached:
+                return _replay(request_hash, *cached[:3])
+
+            conn, cursor = _route_db(args, kwargs)
+            await cursor.execute(CLAIM, {
+                "endpoint": endpoint, "key": key, "hash": request_hash,
+                "lease": IDEMPOTENCY_LEASE, "ttl": IDEMPOTENCY_TTL,
+            })
+            claimed = await cursor.fetchone()
+            if not claimed:
+                await cursor.execute(LOOKUP, (endpoint, key))
+                existing = await cursor.fetchone()
+            # The claim must outlive whatever the route commits or rolls back
+            await conn.commit()
+
+            if not claimed:
+                entry_hash, status, stored_status, stored_body, ttl_left = existing
+                if status != "completed":
+                    return JSONResponse(
+                        {"error": "A request with this idempotency key is still in progress"},
+                        status_code=409,
+                    )
+                response_cache.put(cache_key, entry_hash, stored_status, stored_body, float(ttl_left))
+                return _replay(request_hash, entry_hash, stored_status, stored_body)
+
+            try:
+                result = await route(request, *args, **kwargs)
+            except BaseException:
+                await _release(conn, endpoint, key)
+                raise
+
+            status, body = _as_response(result)
+            if status >= 500:
+                await _release(conn, endpoint, key)
+                return result
+
+            # Settle the route's transaction the way get_async_db would on exit
+            if conn.info.transaction_status == TransactionStatus.INERROR:
+                await conn.rollback()
+            else:
+                await conn.commit()
+            async with conn.cursor() as complete_cursor:
+                await complete_cursor.execute(COMPLETE, (status, Jsonb(body), endpoint, key))
+            await conn.commit()
+            response_cache.put(cache_key, request_hash, status, body, IDEMPOTENCY_TTL)
+            return result
+        return wrapper
+    return decorate
+
+
+async def _release(conn, endpoint: str, key: str):
+    try:
+        await conn.rollback()
+        async with conn.cursor() as cursor:
+            await cursor.execute(RELEASE, (endpoint, key))
+        await conn.commit()
+    except Exception as e:
+        # The lease expires on its own; the next retry takes the key over
+        logger.warning(f"Could not release idempotency key {endpoint}/{key}: {e}")
+
+
+async def prune_idempotency_keys() -> int:
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(PRUNE)
+            pruned = cursor.rowcount
+        await conn.commit()
+    return pruned
+
+
+idempotency_prune_job = PeriodicJob("idempotency-prune", prune_idempotency_keys, 3600)
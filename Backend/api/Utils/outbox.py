@@ -0,0 +1,311 @@
+"""
+Transactional Outbox
+
+Side effects that talk to external services (Twilio SMS, Google Calendar)
+used to run inside the request, after or even before the commit. They are
+now written as `outbox` rows by `enqueue()` in the same transaction as the
+appointment change, and delivered by OutboxWorker after the commit:
+
+- at-least-once: a job is claimed with FOR UPDATE SKIP LOCKED and a lease
+  (`locked_until`); a worker that dies mid-job leaves the lease to expire
+  and the job is claimed again
+- retries: a failed job goes back to 'pending' with exponential backoff
+  plus jitter, and to 'failed' after OUTBOX_MAX_ATTEMPTS or a PermanentError;
+  a DeferredError (e.g. SMS rate limit reached) puts it back for the given
+  delay without counting the attempt
+- idempotency: `idempotency_key` is unique, so enqueueing the same effect
+  twice is a no-op; handlers receive the key to make delivery idempotent
+- ordering: jobs sharing an `aggregate_key` are claimed one at a time in id
+  order (a calendar delete never overtakes the create it undoes); each
+  external service gets its own key per appointment (`appointment:<id>` for
+  calendar jobs, `appointment:<id>:sms` for SMS), so one service's outage
+  never holds back the other's jobs
+
+Handlers are registered per topic and receive every claimed job of that
+topic at once, returning one result per job (None for success or the
+exception), so a handler may deliver a batch in one external call.
+
+Configuration (environment variables):
+- OUTBOX_WORKERS: concurrent worker tasks (default 4)
+- OUTBOX_BATCH_SIZE: jobs claimed per round trip (default 50, one calendar
+  batch request)
+- OUTBOX_MAX_ATTEMPTS: attempts before a job is marked failed (default 8)
+- OUTBOX_POLL_INTERVAL: seconds between polls when idle (default 5)
+- OUTBOX_LEASE_SECONDS: claim lease before a job is retried (default 120)
+"""
+
+import asyncio
+import logging
+import os
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+
+from psycopg.types.json import Jsonb
+
+from database import async_pool
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+OUTBOX_BACKOFF_BASE = 2.0
+OUTBOX_BACKOFF_MAX = 900.0
+
+ENQUEUE = """
+    INSERT INTO outbox (topic, aggregate_key, idempotency_key, payload)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (idempotency_key) DO NOTHING;
+"""
+
+ENQUEUE_MANY = """
+    INSERT INTO outbox (topic, aggregate_key, idempotency_key, payload)
+    SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::jsonb[])
+    ON CONFLICT (idempotency_key) DO NOTHING;
+"""
+
+CLAIM = """
+    WITH next AS (
+        SELECT o.id
+        FROM outbox o
+        WHERE ((o.status = 'pending' AND o.available_at <= now())
+               OR (o.status = 'processing' AND o.locked_until < now()))
+          AND NOT EXISTS (
+              SELECT 1 FROM outbox earlier
+               WHERE earlier.aggregate_key = o.aggregate_key
+                 AND earlier.id < o.id
+                 AND earlier.status IN ('pending', 'processing')
+          )
+        ORDER BY o.id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE outbox o
+       SET status = 'processing',
+           attempts = o.attempts + 1,
+           locked_until = now() + make_interval(secs => %(lease)s)
+      FROM next
+     WHERE o.id = next.id
+    RETURNING o.id, o.topic, o.payload, o.attempts, o.idempotency_key;
+"""
+
+COMPLETE = """
+    UPDATE outbox
+       SET status = 'done',
+           processed_at = now(),
+           locked_until = NULL,
+           last_error = NULL
+     WHERE id = ANY(%s);
+"""
+
+RETRY = """
+    UPDATE outbox
+       SET status = 'pending',
+           available_at = now() + make_interval(secs => %s),
+           locked_until = NULL,
+           last_error = %s
+     WHERE id = %s;
+"""
+
+DEFER = """
+    UPDATE outbox
+       SET status = 'pending',
+           attempts = attempts - 1,
+           available_at = now() + make_interval(secs => %s),
+           locked_until = NULL
+     WHERE id = %s;
+"""
+
+FAIL = """
+    UPDATE outbox
+       SET status = 'failed',
+           processed_at = now(),
+           locked_until = NULL,
+           last_error = %s
+     WHERE id = %s;
+"""
+
+STATUS_COUNTS = "SELECT status, COUNT(*) FROM outbox GROUP BY status;"
+
+
+class PermanentError(Exception):
+    """Raised by a handler for a job that must not be retried."""
+
+
+class DeferredError(Exception):
+    """Returned by a handler for a job to run again later, not counted as an attempt."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class OutboxJob:
+    id: int
+    topic: str
+    payload: dict
+    attempts: int
+    idempotency_key: str
+
+
+_handlers = {}
+
+
+def handler(topic: str):
+    """Register `async func(jobs) -> [None | Exception, ...]` for a topic."""
+    def register(func):
+        _handlers[topic] = func
+        return func
+    return register
+
+
+async def enqueue(cursor, topic: str, payload: dict, idempotency_key: str, aggregate_key: str | None = None):
+    """Add a side effect to the caller's transaction; delivered after commit."""
+    await cursor.execute(ENQUEUE, (topic, aggregate_key, idempotency_key, Jsonb(payload)))
+
+
+async def enqueue_many(cursor, jobs: list):
+    """enqueue() for many `(topic, payload, idempotency_key, aggregate_key)` in one statement."""
+    if not jobs:
+        return
+    topics, payloads, keys, aggregates = zip(*jobs)
+    await cursor.execute(ENQUEUE_MANY, (
+        list(topics), list(aggregates), list(keys), [Jsonb(p) for p in payloads],
+    ))
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at OUTBOX_BACKOFF_MAX."""
+    return random.uniform(0, min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE ** attempts))
+
+
+class OutboxWorker:
+    """Pool of tasks that claim, deliver and settle outbox jobs."""
+
+    def __init__(self, workers: int = OUTBOX_WORKERS, batch_size: int = OUTBOX_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self.delivered = 0
+        self.retried = 0
+        self.deferred = 0
+        self.failed = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._loop(), name=f"outbox-worker-{i}")
+                for i in range(self.workers)
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def trigger(self, payload=None):
+        """Wake idle workers (outbox_ready notification or a local enqueue)."""
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "deferred": self.deferred,
+            "failed": self.failed,
+        }
+
+    async def _loop(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox worker round failed: {e}")
+                claimed = 0
+            if claimed:
+                continue            # keep draining while there is work
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_once(self) -> int:
+        """Claim one batch, deliver it and record the outcomes; returns jobs claimed."""
+        async with async_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(CLAIM, {"limit": self.batch_size, "lease": OUTBOX_LEASE_SECONDS})
+                rows = await cursor.fetchall()
+            await conn.commit()
+        if not rows:
+            return 0
+
+        by_topic = defaultdict(list)
+        for row in rows:
+            by_topic[row[1]].append(OutboxJob(*row))
+
+        outcomes = []
+        for topic, jobs in by_topic.items():
+            outcomes.extend(zip(jobs, await self._deliver(topic, jobs)))
+        await self._settle(outcomes)
+        return len(rows)
+
+    async def _deliver(self, topic: str, jobs: list) -> list:
+        func = _handlers.get(topic)
+        if func is None:
+            return [PermanentError(f"No outbox handler for topic '{topic}'")] * len(jobs)
+        try:
+            results = await func(jobs)
+        except Exception as e:
+            return [e] * len(jobs)
+        if len(results) != len(jobs):
+            return [RuntimeError(f"Handler for '{topic}' returned {len(results)} results for {len(jobs)} jobs")] * len(jobs)
+        return results
+
+    async def _settle(self, outcomes):
+        done = [job.id for job, result in outcomes if not isinstance(result, Exception)]
+        async with async_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                if done:
+                    await cursor.execute(COMPLETE, (done,))
+                for job, result in outcomes:
+                    if not isinstance(result, Exception):
+                        continue
+                    if isinstance(result, DeferredError):
+                        await cursor.execute(DEFER, (result.retry_after, job.id))
+                        self.deferred += 1
+                        continue
+                    error = f"{type(result).__name__}: {result}"[:1000]
+                    if isinstance(result, PermanentError) or job.attempts >= OUTBOX_MAX_ATTEMPTS:
+                        await cursor.execute(FAIL, (error, job.id))
+                        self.failed += 1
+                        logger.error(f"Outbox job {job.id} ({job.topic}) failed permanently: {error}")
+                    else:
+                        await cursor.execute(RETRY, (backoff_seconds(job.attempts), error, job.id))
+                        self.retried += 1
+                        logger.warning(f"Outbox job {job.id} ({job.topic}) attempt {job.attempts} failed: {error}")
+            await conn.commit()
+        self.delivered += len(done)
+
+
+async def outbox_status_counts() -> dict:
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(STATUS_COUNTS)
+            return dict(await cursor.fetchall())
+
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,69 @@
+"""
+Keyset Pagination
+
+Helpers for the paginated Dashboard lists (/patients, /appointments). A
+page is `ORDER BY <key> LIMIT n+1` with the condition `<key> > <last key of
+the previous page>`, so every page is one index range scan of at most n+1
+rows however deep the client pages; there is no OFFSET to skip over.
+
+The position is handed to the client as an opaque `next_cursor`: the sort
+key values of the last row, JSON encoded and base64url'd. Timestamps are
+sent as ISO strings and parsed back with the types the route expects.
+
+Totals are cheap by construction:
+- exact when the filters map onto the rollups from migration 0014
+  (dashboard_counters / appointment_day_counts)
+- otherwise the planner's row estimate for the filtered query (one EXPLAIN,
+  no scan), flagged with `total_is_estimate`
+
+Configuration (environment variables):
+- PAGE_SIZE_DEFAULT: rows per page when the client sends no limit (default 100)
+- PAGE_SIZE_MAX: largest limit accepted (default 500)
+"""
+
+import base64
+import json
+import os
+from datetime import date, datetime
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+
+
+class InvalidCursor(ValueError):
+    """A `cursor` parameter that was not produced by encode_cursor()."""
+
+
+def page_size(limit: int | None) -> int:
+    if limit is None:
+        return PAGE_SIZE_DEFAULT
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types) -> tuple:
+    """Values of a cursor, converted with `types` (int, datetime, ...)."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return tuple(
+            kind.fromisoformat(value) if kind in (date, datetime) else kind(value)
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from e
+
+
+def estimate_count(cursor, query: str, params) -> int:
+    """Planner row estimate for `query` (sync psycopg2 cursor)."""
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
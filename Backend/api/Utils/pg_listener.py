@@ -0,0 +1,88 @@
+"""
+Postgres LISTEN/NOTIFY Dispatcher
+
+A single background task holds one dedicated autocommit connection, LISTENs
+on every subscribed channel and dispatches notifications to in-process
+handlers. It is how process-local caches learn about writes made by other
+workers.
+
+Handlers are plain callables `handler(payload)` run on the event loop, so
+they must be quick and non-blocking (flip a flag, drop a cache entry, put
+into a queue). After every (re)connect each handler is called with
+`payload=None`, meaning "notifications may have been missed, resync".
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+
+import psycopg
+from psycopg import sql
+
+from database import DB_CONNINFO
+
+logger = logging.getLogger(__name__)
+
+
+class PgListener:
+    """Fan out Postgres notifications to in-process handlers."""
+
+    def __init__(self, conninfo: str, reconnect_delay: float = 5.0):
+        self._conninfo = conninfo
+        self._reconnect_delay = reconnect_delay
+        self._handlers = defaultdict(list)
+        self._task = None
+        self.connected = False
+
+    def subscribe(self, channel: str, handler):
+        """Register a handler; must be called before start()."""
+        if self._task is not None:
+            raise RuntimeError("Subscribe to channels before starting the listener")
+        self._handlers[channel].append(handler)
+
+    async def start(self):
+        if self._task is None and self._handlers:
+            self._task = asyncio.create_task(self._run(), name="pg-listener")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _dispatch(self, channel: str, payload):
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"Notification handler for '{channel}' failed: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True)
+                async with conn:
+                    for channel in self._handlers:
+                        await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+                    self.connected = True
+                    logger.info(f"Listening on channels: {sorted(self._handlers)}")
+
+                    for channel in self._handlers:
+                        self._dispatch(channel, None)
+
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.channel, notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification listener disconnected: {e}")
+            finally:
+                self.connected = False
+            await asyncio.sleep(self._reconnect_delay)
+
+
+# Process-wide listener; handlers are registered at application startup
+listener = PgListener(DB_CONNINFO)
@@ -0,0 +1,262 @@
+"""
+Appointment Reminders
+
+Sends reminder SMS at fixed offsets before each scheduled appointment
+(default 24 hours and 2 hours) without polling the appointments table:
+
+- timers: every (appointment, offset) pair is a timer in a hierarchical
+  TimingWheel (api/Utils/timing_wheel.py), loaded once at startup from the
+  future scheduled appointments
+- changes: a row trigger on appointments (migration 0013) notifies
+  `appointment_changes` with the appointment id. Ids are collected and
+  refreshed with one query per batch; the appointment's timers are replaced
+  or, when it was cancelled or deleted, dropped. A listener reconnect
+  (payload None) reloads everything.
+- delivery: fired reminders queue up and are drained in batches of
+  REMINDER_BATCH_SIZE, at most REMINDER_RATE per second. Each batch
+  re-reads its appointments (still scheduled, same time) and enqueues the
+  SMS through the outbox with a key per appointment, offset and time, so
+  several workers or a restart never send the same reminder twice.
+
+A reminder whose time has already passed when it is scheduled (a booking
+made an hour before the appointment gets no 24-hour reminder) is skipped,
+unless it is less than REMINDER_GRACE seconds late, which covers restarts.
+
+Configuration (environment variables):
+- REMINDER_OFFSETS: minutes before the appointment, comma separated
+  (default "1440,120")
+- REMINDER_RATE: reminders enqueued per second at most (default SMS_RATE)
+- REMINDER_BATCH_SIZE: reminders per delivery batch (default 50)
+- REMINDER_GRACE: seconds a reminder may be late and still sent (default 600)
+- REMINDER_TICK: timing wheel resolution in seconds (default 1)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from api.Utils import outbox
+from api.Utils.sms_service import SMS_RATE
+from api.Utils.timing_wheel import TimingWheel
+from database import async_pool
+
+logger = logging.getLogger(__name__)
+
+REMINDER_OFFSETS = tuple(
+    sorted({int(m) for m in os.getenv("REMINDER_OFFSETS", "1440,120").split(",") if m.strip()}, reverse=True)
+)
+REMINDER_RATE = float(os.getenv("REMINDER_RATE", str(SMS_RATE)))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "50"))
+REMINDER_GRACE = float(os.getenv("REMINDER_GRACE", "600"))
+REMINDER_TICK = float(os.getenv("REMINDER_TICK", "1"))
+
+UPCOMING_QUERY = """
+    SELECT id, appointment_time
+    FROM appointments
+    WHERE appointment_time > %s
+      AND status = 'scheduled';
+"""
+
+REFRESH_QUERY = """
+    SELECT id, appointment_time
+    FROM appointments
+    WHERE id = ANY(%s)
+      AND status = 'scheduled';
+"""
+
+# Re-read at send time: only still-scheduled appointments at the expected time
+DELIVERY_QUERY = """
+    SELECT a.id, a.appointment_time, p.phone_number, d.name, d.department
+    FROM appointments a
+    JOIN patients p ON p.id = a.patient_id
+    JOIN doctors d ON d.id = a.doctor_id
+    WHERE a.id = ANY(%s)
+      AND a.status = 'scheduled';
+"""
+
+
+def reminder_sms_body(doctor_name: str, department: str, appointment_time: datetime) -> str:
+    return (
+        f"Reminder: your appointment with {doctor_name} from {department} department "
+        f"is on {appointment_time.strftime('%Y-%m-%d')} at "
+        f"{appointment_time.strftime('%I:%M %p')}. Please arrive 10 minutes early. "
+        f"-Medical Clinic"
+    )
+
+
+class ReminderScheduler:
+    """Timing wheel of reminder timers kept in step with appointment changes."""
+
+    def __init__(self, offsets=REMINDER_OFFSETS, rate: float = REMINDER_RATE,
+                 batch_size: int = REMINDER_BATCH_SIZE, tick: float = REMINDER_TICK):
+        self.offsets = offsets
+        self.rate = rate
+        self.batch_size = batch_size
+        self.tick = tick
+        self._wheel = TimingWheel(tick=tick)
+        self._scheduled = {}         # appointment id -> appointment_time
+        self._changed = set()        # ids notified since the last refresh
+        self._resync = True
+        self._fired = deque()        # (appointment id, offset, appointment_time)
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self.sent = 0
+        self.skipped = 0
+        self.reloads = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._tick_loop(), name="reminder-wheel"),
+                asyncio.create_task(self._delivery_loop(), name="reminder-delivery"),
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def appointment_changed(self, payload=None):
+        """pg_listener handler for `appointment_changes` (payload: appointment id)."""
+        if payload is None:
+            self._resync = True
+        else:
+            try:
+                self._changed.add(int(payload))
+            except ValueError:
+                self._resync = True
+
+    def stats(self) -> dict:
+        return {
+            "appointments": len(self._scheduled),
+            "timers": len(self._wheel),
+            "queued": len(self._fired),
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "reloads": self.reloads,
+        }
+
+    # ━━━ Timers ━━━
+
+    def _unschedule(self, appointment_id: int):
+        self._scheduled.pop(appointment_id, None)
+        for offset in self.offsets:
+            self._wheel.cancel((appointment_id, offset))
+
+    def _schedule(self, appointment_id: int, appointment_time: datetime, now: float):
+        self._unschedule(appointment_id)
+        self._scheduled[appointment_id] = appointment_time
+        for offset in self.offsets:
+            fire_at = (appointment_time - timedelta(minutes=offset)).timestamp()
+            if fire_at >= now - REMINDER_GRACE:
+                self._wheel.schedule((appointment_id, offset), fire_at, appointment_time)
+
+    async def _reload(self):
+        self._resync = False
+        self._changed.clear()
+        async with async_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(UPCOMING_QUERY, (datetime.now(),))
+                rows = await cursor.fetchall()
+        now = time.time()
+        self._wheel = TimingWheel(tick=self.tick, now=now)
+        self._scheduled = {}
+        for appointment_id, appointment_time in rows:
+            self._schedule(appointment_id, appointment_time, now)
+        self.reloads += 1
+        logger.info(f"Reminder timers loaded for {len(rows)} upcoming appointment(s)")
+
+    async def _refresh(self):
+        ids, self._changed = list(self._changed), set()
+        async with async_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(REFRESH_QUERY, (ids,))
+                current = dict(await cursor.fetchall())
+        now = time.time()
+        for appointment_id in ids:
+            appointment_time = current.get(appointment_id)
+            if appointment_time is None or appointment_time <= datetime.now():
+                self._unschedule(appointment_id)
+            elif self._scheduled.get(appointment_id) != appointment_time:
+                self._schedule(appointment_id, appointment_time, now)
+
+    async def _tick_loop(self):
+        while True:
+            try:
+                if self._resync:
+                    await self._reload()
+                elif self._changed:
+                    await self._refresh()
+                fired = self._wheel.advance()
+                for (appointment_id, offset), appointment_time in fired:
+                    self._fired.append((appointment_id, offset, appointment_time))
+                if fired:
+                    self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Timers are rebuilt from the table on the next round
+                logger.error(f"Reminder scheduler round failed: {e}")
+                self._resync = True
+            await asyncio.sleep(self.tick)
+
+    # ━━━ Delivery ━━━
+
+    async def _delivery_loop(self):
+        while True:
+            if not self._fired:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            batch = [self._fired.popleft() for _ in range(min(self.batch_size, len(self._fired)))]
+            try:
+                await self._deliver(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Requeue; the outbox keys make a repeated enqueue harmless
+                logger.error(f"Reminder batch of {len(batch)} failed: {e}")
+                self._fired.extendleft(reversed(batch))
+            # Rate limit: one batch per batch_size / rate seconds
+            await asyncio.sleep(len(batch) / self.rate)
+
+    async def _deliver(self, batch: list):
+        async with async_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(DELIVERY_QUERY, ([appointment_id for appointment_id, _, _ in batch],))
+                rows = {row[0]: row[1:] for row in await cursor.fetchall()}
+
+                jobs = []
+                for appointment_id, offset, expected_time in batch:
+                    row = rows.get(appointment_id)
+                    if not row or row[0] != expected_time or not row[1]:
+                        # Cancelled, moved (its new timer is already set) or no phone
+                        self.skipped += 1
+                        continue
+                    appointment_time, phone, doctor_name, department = row
+                    aggregate_key = f"appointment:{appointment_id}"
+                    # SMS have their own ordering key: a reminder never waits behind calendar jobs
+                    jobs.append((
+                        "sms.send",
+                        {"to": phone, "body": reminder_sms_body(doctor_name, department, appointment_time)},
+                        f"{aggregate_key}:sms:reminder:{offset}:{appointment_time.isoformat()}",
+                        f"{aggregate_key}:sms",
+                    ))
+                await outbox.enqueue_many(cursor, jobs)
+            await conn.commit()
+
+        if jobs:
+            self.sent += len(jobs)
+            outbox.outbox_worker.trigger()
+            logger.info(f"Queued {len(jobs)} appointment reminder(s)")
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,170 @@
+"""
+Atomic Slot Reservation
+
+Booking used to read the slot, write the appointment and then flip
+doctor_slots.is_available without any check, so two concurrent calls could
+both book the same doctor and time.
+
+A reservation is now a single conditional update on the doctor_slots row:
+
+    UPDATE doctor_slots SET is_available = false
+     WHERE doctor_id = .. AND slot_date = .. AND slot_time = .. AND is_available
+
+Postgres locks the row for the update; a concurrent transaction targeting
+the same slot waits for the first one to finish, re-evaluates the WHERE
+clause and finds `is_available` false, so exactly one caller gets the row
+back. No retry loop is needed: the loser gets SLOT_TAKEN immediately after
+the winner commits (or the slot back if the winner rolls back).
+
+A slot under a temporary hold (api/Utils/slot_holds.py) is not available
+either, except to the caller presenting its hold token, or to anyone once
+the hold has expired but not yet been released by the timer.
+
+The partial unique index from migration 0006 (one scheduled appointment per
+doctor and time) is the backstop for writes that do not go through
+doctor_slots; callers should treat its UniqueViolation as SLOT_TAKEN too.
+
+book_appointment_tx() runs a whole booking or reschedule (the reservation
+above, the appointment and patient writes and the outbox jobs) as one call
+to the SQL function of the same name from migration 0012: one round trip
+instead of one per statement.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+from psycopg import errors
+
+logger = logging.getLogger(__name__)
+
+# Reservation outcomes
+RESERVED = "reserved"
+SLOT_TAKEN = "slot_taken"
+NOT_OFFERED = "not_offered"
+
+# One statement: reserve the slot if open, and report whether it exists at
+# all so callers can tell "taken" from "not offered" without a second query
+RESERVE_SLOT = """
+    WITH target AS (
+        SELECT id FROM doctor_slots
+         WHERE doctor_id = %(doctor_id)s
+           AND slot_date = %(slot_date)s
+           AND slot_time = %(slot_time)s
+    ),
+    reserved AS (
+        UPDATE doctor_slots s
+           SET is_available = false,
+               hold_token = NULL,
+               held_until = NULL,
+               held_by = NULL
+          FROM target
+         WHERE s.id = target.id
+           AND s.appointment_id IS NULL
+           AND (s.is_available
+                OR s.hold_token = %(hold_token)s
+                OR (s.hold_token IS NOT NULL AND s.held_until <= now()))
+        RETURNING s.id
+    )
+    SELECT (SELECT id FROM reserved), EXISTS (SELECT 1 FROM target);
+"""
+
+ATTACH_APPOINTMENT = """
+    UPDATE doctor_slots SET appointment_id = %s WHERE id = %s;
+"""
+
+RELEASE_SLOT = """
+    UPDATE doctor_slots
+       SET is_available = true,
+           appointment_id = NULL,
+           hold_token = NULL,
+           held_until = NULL,
+           held_by = NULL
+     WHERE doctor_id = %s AND slot_date = %s AND slot_time = %s;
+"""
+
+BOOK_APPOINTMENT_TX = """
+    SELECT outcome, appointment_id, old_doctor_id, old_time, calendar_event_id
+    FROM book_appointment_tx(
+        %(patient_id)s::integer, %(doctor_id)s::integer, %(slot)s::timestamp,
+        %(phone)s::text, %(hold_token)s::uuid, %(duration)s::integer,
+        %(sms_body)s::text, %(event_prefix)s::text
+    );
+"""
+
+# Booking outcomes besides SLOT_TAKEN / NOT_OFFERED
+BOOKED = "booked"
+RESCHEDULED = "rescheduled"
+UNCHANGED = "unchanged"
+
+# Raised by the unique index on scheduled appointments
+UniqueViolation = errors.UniqueViolation
+
+
+@dataclass(frozen=True)
+class Booking:
+    outcome: str
+    appointment_id: int | None = None
+    old_doctor_id: int | None = None
+    old_time: datetime | None = None
+    calendar_event_id: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in (BOOKED, RESCHEDULED, UNCHANGED)
+
+
+@dataclass(frozen=True)
+class Reservation:
+    status: str
+    slot_id: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == RESERVED
+
+
+async def reserve_slot(cursor, doctor_id: int, slot_dt: datetime, hold_token=None) -> Reservation:
+    """Atomically take an open slot (or the caller's own hold) inside the caller's transaction."""
+    await cursor.execute(RESERVE_SLOT, {
+        "doctor_id": doctor_id,
+        "slot_date": slot_dt.date(),
+        "slot_time": slot_dt.time(),
+        "hold_token": hold_token,
+    })
+    slot_id, exists = await cursor.fetchone()
+    if slot_id is not None:
+        return Reservation(RESERVED, slot_id)
+    status = SLOT_TAKEN if exists else NOT_OFFERED
+    logger.info(f"Reservation for doctor {doctor_id} at {slot_dt} failed: {status}")
+    return Reservation(status)
+
+
+async def attach_appointment(cursor, reservation: Reservation, appointment_id: int):
+    """Link a reserved slot to the appointment that now occupies it."""
+    await cursor.execute(ATTACH_APPOINTMENT, (appointment_id, reservation.slot_id))
+
+
+async def release_slot(cursor, doctor_id: int, slot_dt: datetime):
+    """Reopen a slot (cancellation or the old slot of a reschedule)."""
+    await cursor.execute(RELEASE_SLOT, (doctor_id, slot_dt.date(), slot_dt.time()))
+
+
+async def book_appointment_tx(cursor, patient_id: int, doctor_id: int, slot_dt: datetime, phone: str,
+                           hold_token=None, duration: int = 30, sms_body: str | None = None,
+                           event_prefix: str = "") -> Booking:
+    """Book or reschedule in one round trip inside the caller's transaction."""
+    await cursor.execute(BOOK_APPOINTMENT_TX, {
+        "patient_id": patient_id,
+        "doctor_id": doctor_id,
+        "slot": slot_dt,
+        "phone": phone,
+        "hold_token": hold_token,
+        "duration": duration,
+        "sms_body": sms_body,
+        "event_prefix": event_prefix,
+    })
+    booking = Booking(*await cursor.fetchone())
+    if not booking.ok:
+        logger.info(f"Booking for doctor {doctor_id} at {slot_dt} failed: {booking.outcome}")
+    return booking
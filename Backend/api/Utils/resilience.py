@@ -0,0 +1,233 @@
+"""
+Resilience Guards for External Services
+
+Every call to Google Calendar or Twilio goes through a ServiceGuard:
+
+- bulkhead: a per-service semaphore bounds the calls in flight, so a slow
+  service cannot take every worker thread / connection with it
+- timeout: each call gets a strict deadline; a blocking call that overruns
+  keeps its semaphore slot until its thread really returns, so runaway
+  threads cannot pile up behind the timeout
+- circuit breaker: after BREAKER_FAILURE_THRESHOLD consecutive failures the
+  breaker opens and calls fail immediately with CircuitOpenError for
+  BREAKER_RESET_TIMEOUT seconds; then one trial call is let through
+  (half-open) and its outcome closes or re-opens the breaker
+
+Callers turn CircuitOpenError into deferred work (outbox.DeferredError), so
+during an outage jobs wait in the outbox instead of burning attempts, and
+nothing on the request path waits on the failing service. Breaker state is
+exported at /health/breakers.
+
+Configuration (environment variables):
+- BREAKER_FAILURE_THRESHOLD: consecutive failures that open a breaker (default 5)
+- BREAKER_RESET_TIMEOUT: seconds a breaker stays open (default 30)
+- CALENDAR_MAX_CONCURRENCY: Google Calendar calls in flight (default 4)
+- CALENDAR_TIMEOUT: seconds per Google Calendar call / batch (default 20)
+- SMS_MAX_CONCURRENCY, SMS_TIMEOUT: the same for Twilio (api/Utils/sms_service.py)
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+CALENDAR_MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "4"))
+CALENDAR_TIMEOUT = float(os.getenv("CALENDAR_TIMEOUT", "20"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose breaker is open."""
+
+    def __init__(self, service: str, retry_after: float):
+        super().__init__(f"{service} circuit open, retry in {retry_after:.0f}s")
+        self.service = service
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open trial call."""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._trial_running = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the trial call when half-open)."""
+        if self.state == OPEN and self.retry_after() == 0:
+            self.state = HALF_OPEN
+            logger.info(f"Circuit '{self.name}' half-open, sending a trial call")
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit '{self.name}' closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_running = False
+
+    def abandon(self):
+        """A call given up by its caller (cancelled): no outcome, frees the trial slot."""
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opens += 1
+                logger.warning(f"Circuit '{self.name}' opened after {self.failures} failure(s)")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+
+class ServiceGuard:
+    """Semaphore + timeout + circuit breaker around one external service."""
+
+    def __init__(self, name: str, concurrency: int, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.breaker = CircuitBreaker(name)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.timeouts = 0
+
+    def check(self):
+        """Raise CircuitOpenError if the breaker rejects a call right now."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+
+    def record(self, ok: bool):
+        """Outcome of a call made after check() (for callers that judge results)."""
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    async def call(self, func, *args, failed=None, healthy_error=None):
+        """Await `func(*args)` under the guard.
+
+        `failed(result)` marks a returned result as a service failure;
+        `healthy_error(exc)` marks an exception as not the service's fault
+        (e.g. a rejected phone number), so it does not count toward the breaker.
+        """
+        self.check()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self.in_flight += 1
+        try:
+            result = await asyncio.wait_for(func(*args), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.record(False)
+            raise TimeoutError(f"{self.name} call timed out after {self.timeout}s")
+        except Exception as e:
+            self.record(bool(healthy_error and healthy_error(e)))
+            raise
+        except BaseException:
+            # Cancelled caller: otherwise a half-open trial would never end
+            self.breaker.abandon()
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+        self.record(not (failed and failed(result)))
+        return result
+
+    async def call_blocking(self, func, *args, failed=None, healthy_error=None):
+        """Run blocking `func(*args)` in the threadpool under the guard."""
+        self.check()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self.in_flight += 1
+        task = asyncio.ensure_future(run_in_threadpool(func, *args))
+
+        def release(_):
+            # The slot is only freed once the thread has really finished
+            self.in_flight -= 1
+            self._semaphore.release()
+
+        task.add_done_callback(release)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.record(False)
+            raise TimeoutError(f"{self.name} call timed out after {self.timeout}s")
+        except Exception as e:
+            self.record(bool(healthy_error and healthy_error(e)))
+            raise
+        except BaseException:
+            # Cancelled caller: otherwise a half-open trial would never end
+            self.breaker.abandon()
+            raise
+        self.record(not (failed and failed(result)))
+        return result
+
+    def stats(self) -> dict:
+        return {
+            **self.breaker.stats(),
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "timeouts": self.timeouts,
+        }
+
+
+_guards = {}
+
+
+def guard(name: str, concurrency: int, timeout: float) -> ServiceGuard:
+    """Process-wide guard for a service, created on first use."""
+    if name not in _guards:
+        _guards[name] = ServiceGuard(name, concurrency, timeout)
+    return _guards[name]
+
+
+def breaker_states() -> dict:
+    return {name: g.stats() for name, g in _guards.items()}
+
+
+calendar_guard = guard("google_calendar", CALENDAR_MAX_CONCURRENCY, CALENDAR_TIMEOUT)
@@ -0,0 +1,234 @@
+"""
+Dashboard Response Cache
+
+In-process cache of the serialized JSON bodies of the Dashboard read routes
+(/doctors, /categories, /patients, /appointments, /dashboard/*, ...), which
+the admin dashboard refetches aggressively:
+
+- keys: route name plus its query / path parameters
+- TTL per route (the `ttl` given to @cached, default RESPONSE_CACHE_TTL)
+- LRU eviction once RESPONSE_CACHE_MAX_ENTRIES entries or
+  RESPONSE_CACHE_MAX_BYTES bytes of bodies are held
+- tags: every entry lists the data it was built from ("patients",
+  "appointments:doctor:7", ...). Writes drop exactly the entries carrying
+  an affected tag:
+  - `cache_invalidate` notifications from the appointment, patient and
+    availability triggers (migrations 0015, 0019), payload = space-separated
+    tags; a patient rename also sends "patient_names" for the lists that
+    show patient names
+  - `doctors_changed` (migration 0002) drops the "doctors" tag
+  - a listener reconnect (payload None) clears everything
+
+The notifications come from database triggers, so every writer (Bland
+booking / cancellation / create-user, the bulk endpoints, scripts) is
+covered, in every worker. A response built while one of its tags was
+invalidated is returned but not stored, so a slow read cannot put stale data
+back into the cache.
+
+A hit returns the stored bytes without checking out a database connection;
+hits and misses are counted per route and exported at /health/cache.
+Responses other than plain results (errors returned as JSONResponse) are
+never cached.
+
+Configuration (environment variables):
+- RESPONSE_CACHE_TTL: default seconds an entry lives (default 60)
+- RESPONSE_CACHE_MAX_ENTRIES: entries kept at most (default 1000)
+- RESPONSE_CACHE_MAX_BYTES: body bytes kept at most (default 64 MiB)
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from database import get_connection
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    tags: tuple
+    expires_at: float
+
+
+class TaggedResponseCache:
+    """LRU + TTL cache of response bodies with tag-based invalidation."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()        # key -> CacheEntry, least recent first
+        self._by_tag = defaultdict(set)      # tag -> keys
+        self._versions = defaultdict(int)    # tag -> invalidation count
+        self._generation = 0                 # bumped by clear()
+        self._lock = threading.Lock()        # sync routes run on threadpool threads
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._routes = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def get(self, key, route: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                self._routes[route]["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._routes[route]["hits"] += 1
+            return entry.body
+
+    def versions(self, tags) -> tuple:
+        """Snapshot taken before building a response; see put()."""
+        with self._lock:
+            return self._generation, tuple(self._versions[tag] for tag in tags)
+
+    def put(self, key, body: bytes, tags, ttl: float, versions: tuple):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if (self._generation, tuple(self._versions[tag] for tag in tags)) != versions:
+                # Invalidated while the response was being built
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(body, tuple(tags), time.monotonic() + ttl)
+            self.bytes += len(body)
+            for tag in tags:
+                self._by_tag[tag].add(key)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] += 1
+                for key in list(self._by_tag.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_tag.clear()
+            self.bytes = 0
+
+    def invalidate(self, payload=None):
+        """pg_listener handler for `cache_invalidate` (payload: space-separated tags)."""
+        if payload is None:
+            self.clear()
+        else:
+            self.invalidate_tags(payload.split())
+
+    def tag_handler(self, tag: str):
+        """pg_listener handler dropping one fixed tag on any notification."""
+        def handler(payload=None):
+            if payload is None:
+                self.clear()
+            else:
+                self.invalidate_tags([tag])
+        return handler
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "routes": {route: dict(counts) for route, counts in self._routes.items()},
+            }
+
+
+dashboard_cache = TaggedResponseCache()
+
+
+def _json_body(result) -> bytes:
+    # Same encoding as FastAPI's default JSONResponse
+    return json.dumps(
+        jsonable_encoder(result), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def cached(route: str, tags=(), ttl: float | None = None):
+    """Cache a sync Dashboard route's result under its parameters.
+
+    `tags` is a tuple or a function of the route's parameters returning one.
+    A `db` parameter is dropped from the route signature and filled with a
+    pooled (connection, cursor) only on a miss.
+    """
+    ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        wants_db = "db" in signature.parameters
+        params = [p for p in signature.parameters.values() if p.name != "db"]
+
+        @functools.wraps(func)
+        def wrapper(**kwargs):
+            key = (route, tuple(sorted(kwargs.items())))
+            body = dashboard_cache.get(key, route)
+            if body is not None:
+                return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+            entry_tags = tuple(tags(**kwargs) if callable(tags) else tags)
+            versions = dashboard_cache.versions(entry_tags)
+            if wants_db:
+                with get_connection() as db:
+                    result = func(db=db, **kwargs)
+            else:
+                result = func(**kwargs)
+            if isinstance(result, Response):
+                return result
+
+            body = _json_body(result)
+            dashboard_cache.put(key, body, entry_tags, ttl, versions)
+            return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+        wrapper.__signature__ = signature.replace(parameters=params)
+        return wrapper
+
+    return decorator
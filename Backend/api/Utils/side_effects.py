@@ -0,0 +1,214 @@
+"""
+Outbox Handlers: SMS and Google Calendar
+
+Delivery side of the transactional outbox (api/Utils/outbox.py). Booking and
+cancellation enqueue these topics; the worker calls the handlers after the
+database commit:
+
+- sms.send         {"to", "body"}
+- calendar.create  {"appointment_id", "calendar_id", "patient_name", "start", "duration"}
+- calendar.update  {"appointment_id", "calendar_id", "event_id", "patient_name", "start", "duration"}
+- calendar.delete  {"calendar_id", "event_id"}
+
+Calendar jobs are delivered through the batched gateway
+(api/Utils/calendar_gateway.py): every calendar job claimed in one outbox
+round becomes a single batch HTTP request, and each item's result is
+written back to its appointment (calendar_status / calendar_error).
+
+Calendar events get a deterministic id derived from the appointment id
+(calendar_event_id_for), so the id is known at booking time and a retried
+create answers 409 instead of creating a duplicate event. Deleting an event
+that is already gone counts as success, and updating one that was never
+created falls back to creating it.
+
+SMS go through the async, rate-limited sms_service. A message that would
+wait longer than half the outbox lease for its rate-limit slot is deferred
+(not counted as an attempt) rather than held while the lease runs out.
+Twilio has no idempotency key: a message is sent at most once per outbox
+job unless the worker dies between sending and recording the result.
+
+Both services sit behind circuit breakers (api/Utils/resilience.py). While
+a breaker is open its jobs are deferred until the breaker's retry time
+instead of failing attempt after attempt.
+"""
+
+import asyncio
+import functools
+import logging
+from datetime import datetime
+
+
+from api.Utils import outbox
+from api.Utils.calendar_gateway import (
+    DELETE,
+    INSERT,
+    PATCH,
+    CalendarOp,
+    CalendarResult,
+    calendar_gateway,
+    event_body,
+    event_times,
+    service_unavailable,
+)
+from api.Utils.outbox import OUTBOX_LEASE_SECONDS, DeferredError, PermanentError
+from api.Utils.resilience import CircuitOpenError, calendar_guard
+from api.Utils.sms_service import SmsError, SmsRateLimited, sms_service
+from database import async_pool
+
+logger = logging.getLogger(__name__)
+
+# Longest an SMS job may wait for its rate-limit slot within its claim lease
+SMS_MAX_WAIT = OUTBOX_LEASE_SECONDS / 2
+
+# Google Calendar event ids: base32hex characters (a-v, 0-9), 5-1024 long
+CALENDAR_EVENT_ID_PREFIX = "mdappt"
+
+
+def calendar_event_id_for(appointment_id: int) -> str:
+    return f"{CALENDAR_EVENT_ID_PREFIX}{appointment_id:08d}"
+
+
+def booked_sms_body(doctor_name: str, department: str, slot_dt: datetime) -> str:
+    return (
+        f"Your appointment with {doctor_name} from {department} department "
+        f"has been booked on {slot_dt.strftime('%Y-%m-%d')} at "
+        f"{slot_dt.strftime('%I:%M %p')}. Please arrive 10 minutes early. "
+        f"-Medical Clinic"
+    )
+
+
+def cancelled_sms_body(doctor_name: str, department: str, slot_dt: datetime) -> str:
+    return (
+        f"Your appointment with {doctor_name} from {department} department "
+        f"scheduled on {slot_dt.strftime('%Y-%m-%d')} at "
+        f"{slot_dt.strftime('%I:%M %p')} has been cancelled successfully. "
+        f"If you have questions, please contact the clinic. -Medical Clinic"
+    )
+
+
+RECORD_CALENDAR_RESULT = """
+    UPDATE appointments
+       SET calendar_event_id  = COALESCE(%s, calendar_event_id),
+           calendar_status    = %s,
+           calendar_error     = %s,
+           calendar_synced_at = now()
+     WHERE id = %s;
+"""
+
+
+@outbox.handler("sms.send")
+async def send_sms(jobs):
+    futures = [
+        sms_service.submit(job.payload["to"], job.payload["body"], max_wait=SMS_MAX_WAIT)
+        for job in jobs
+    ]
+    results = []
+    for result in await asyncio.gather(*futures, return_exceptions=True):
+        if isinstance(result, (SmsRateLimited, CircuitOpenError)):
+            results.append(DeferredError(str(result), result.retry_after))
+        elif isinstance(result, SmsError) and result.permanent:
+            results.append(PermanentError(str(result)))
+        elif isinstance(result, Exception):
+            results.append(result)
+        else:
+            results.append(None)
+    return results
+
+
+def _create_op(payload) -> CalendarOp:
+    event_id = calendar_event_id_for(payload["appointment_id"])
+    start = datetime.fromisoformat(payload["start"])
+    return CalendarOp(
+        INSERT, payload["calendar_id"], event_id,
+        event_body(payload["patient_name"], start, payload.get("duration", 30), event_id),
+    )
+
+
+def _patch_op(payload) -> CalendarOp:
+    start = datetime.fromisoformat(payload["start"])
+    # status "confirmed" also restores an event that was deleted in Google
+    return CalendarOp(
+        PATCH, payload["calendar_id"], payload["event_id"],
+        {**event_times(start, payload.get("duration", 30)), "status": "confirmed"},
+    )
+
+
+def _delete_op(payload) -> CalendarOp:
+    return CalendarOp(DELETE, payload["calendar_id"], payload["event_id"])
+
+
+def _outcome(result: CalendarResult):
+    if result.ok:
+        return None
+    rate_limited = "ratelimit" in (result.error or "").lower().replace(" ", "")
+    if result.status in (400, 403) and not rate_limited:
+        return PermanentError(result.error)
+    return RuntimeError(result.error)
+
+
+async def _record(jobs, results):
+    """Write each create / patch result back to its appointment row."""
+    rows = [
+        (
+            result.event_id if result.ok else None,
+            "synced" if result.ok else "error",
+            result.error,
+            job.payload["appointment_id"],
+        )
+        for job, result in zip(jobs, results)
+        if "appointment_id" in job.payload
+    ]
+    if not rows:
+        return
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.executemany(RECORD_CALENDAR_RESULT, rows)
+        await conn.commit()
+
+
+async def _run(ops) -> list:
+    # Bounded, time-limited and behind the Google Calendar circuit breaker
+    return await calendar_guard.call_blocking(calendar_gateway.execute, ops, failed=service_unavailable)
+
+
+def _defer_when_open(handler_func):
+    """Turn an open circuit into deferred jobs instead of failed attempts."""
+    @functools.wraps(handler_func)
+    async def wrapper(jobs):
+        try:
+            return await handler_func(jobs)
+        except CircuitOpenError as e:
+            return [DeferredError(str(e), e.retry_after)] * len(jobs)
+    return wrapper
+
+
+@outbox.handler("calendar.create")
+@_defer_when_open
+async def create_events(jobs):
+    results = await _run([_create_op(job.payload) for job in jobs])
+    await _record(jobs, results)
+    return [_outcome(result) for result in results]
+
+
+@outbox.handler("calendar.update")
+@_defer_when_open
+async def update_events(jobs):
+    results = await _run([_patch_op(job.payload) for job in jobs])
+
+    # Events that were never created (or were deleted by hand): insert instead
+    missing = [i for i, result in enumerate(results) if result.not_found]
+    if missing:
+        logger.info(f"{len(missing)} calendar event(s) missing, creating them instead")
+        created = await _run([_create_op(jobs[i].payload) for i in missing])
+        for i, result in zip(missing, created):
+            results[i] = result
+
+    await _record(jobs, results)
+    return [_outcome(result) for result in results]
+
+
+@outbox.handler("calendar.delete")
+@_defer_when_open
+async def delete_events(jobs):
+    results = await _run([_delete_op(job.payload) for job in jobs])
+    return [_outcome(result) for result in results]
@@ -0,0 +1,132 @@
+"""
+Per-Date Slot Calendar
+
+Generates `doctor_slots` rows (one per doctor, date and slot) from the weekly
+`doctor_availability` template over a rolling horizon, so availability can
+be booked and queried for real dates instead of weekday names.
+
+Generation is incremental: `slot_calendar_state.generated_through` records
+how far each doctor's calendar reaches, and every run only adds the missing
+days up to today + SLOT_HORIZON_DAYS. Editing a doctor's template deletes
+their state row (trigger from migration 0004), so the next run regenerates
+that doctor from today, adding new template slots and removing open slots
+the template no longer contains.
+
+Configuration (environment variables):
+- SLOT_HORIZON_DAYS: days ahead to keep generated (default 56)
+- SLOT_RETENTION_DAYS: days of past slots to keep (default 30)
+- SLOT_CALENDAR_INTERVAL: seconds between background runs (default 3600)
+"""
+
+import logging
+import os
+from datetime import date, timedelta
+
+from api.Utils.background import PeriodicJob
+from database import async_pool
+
+logger = logging.getLogger(__name__)
+
+SLOT_HORIZON_DAYS = int(os.getenv("SLOT_HORIZON_DAYS", "56"))
+SLOT_RETENTION_DAYS = int(os.getenv("SLOT_RETENTION_DAYS", "30"))
+SLOT_CALENDAR_INTERVAL = float(os.getenv("SLOT_CALENDAR_INTERVAL", "3600"))
+
+# Template rows match a date by abbreviated ('Mon') or full ('Monday') day name
+TEMPLATE_DAY_MATCH = "da.day_of_week IN (to_char({d}, 'Dy'), to_char({d}, 'FMDay'))"
+
+RESET_DOCTORS_QUERY = """
+    SELECT d.id
+    FROM doctors d
+    LEFT JOIN slot_calendar_state s ON s.doctor_id = d.id
+    WHERE s.doctor_id IS NULL;
+"""
+
+PRUNE_REMOVED_TEMPLATE_SLOTS = f"""
+    DELETE FROM doctor_slots s
+    WHERE s.doctor_id = ANY(%(doctor_ids)s)
+      AND s.slot_date >= %(today)s
+      AND s.is_available
+      AND NOT EXISTS (
+          SELECT 1 FROM doctor_availability da
+          WHERE da.doctor_id = s.doctor_id
+            AND da.time_slot = s.slot_time
+            AND {TEMPLATE_DAY_MATCH.format(d="s.slot_date")}
+      );
+"""
+
+GENERATE_SLOTS = f"""
+    WITH days AS (
+        SELECT d.id AS doctor_id, g::date AS slot_date
+        FROM doctors d
+        LEFT JOIN slot_calendar_state s ON s.doctor_id = d.id
+        CROSS JOIN LATERAL generate_series(
+            GREATEST(s.generated_through + 1, %(today)s::date),
+            %(through)s::date,
+            interval '1 day'
+        ) AS g
+    )
+    INSERT INTO doctor_slots (doctor_id, slot_date, slot_time)
+    SELECT days.doctor_id, days.slot_date, da.time_slot
+    FROM days
+    JOIN doctor_availability da
+      ON da.doctor_id = days.doctor_id
+     AND {TEMPLATE_DAY_MATCH.format(d="days.slot_date")}
+    ON CONFLICT (doctor_id, slot_date, slot_time) DO NOTHING;
+"""
+
+# Slots generated for dates that already have a scheduled appointment
+MARK_BOOKED_SLOTS = """
+    UPDATE doctor_slots s
+       SET is_available = false,
+           appointment_id = a.id
+      FROM appointments a
+     WHERE a.doctor_id = s.doctor_id
+       AND a.appointment_time = s.slot_date + s.slot_time
+       AND a.status = 'scheduled'
+       AND a.appointment_time >= %(today)s
+       AND s.slot_date >= %(today)s
+       AND s.appointment_id IS NULL;
+"""
+
+SAVE_STATE = """
+    INSERT INTO slot_calendar_state (doctor_id, generated_through)
+    SELECT id, %(through)s FROM doctors
+    ON CONFLICT (doctor_id) DO UPDATE
+        SET generated_through = GREATEST(slot_calendar_state.generated_through,
+                                         EXCLUDED.generated_through);
+"""
+
+PRUNE_PAST_SLOTS = """
+    DELETE FROM doctor_slots WHERE slot_date < %(cutoff)s;
+"""
+
+
+async def extend_slot_calendar(horizon_days: int = SLOT_HORIZON_DAYS) -> int:
+    """Generate missing slots up to today + horizon; returns rows inserted."""
+    today = date.today()
+    params = {
+        "today": today,
+        "through": today + timedelta(days=horizon_days),
+        "cutoff": today - timedelta(days=SLOT_RETENTION_DAYS),
+    }
+
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(RESET_DOCTORS_QUERY)
+            params["doctor_ids"] = [row[0] for row in await cursor.fetchall()]
+            if params["doctor_ids"]:
+                await cursor.execute(PRUNE_REMOVED_TEMPLATE_SLOTS, params)
+
+            await cursor.execute(GENERATE_SLOTS, params)
+            inserted = cursor.rowcount
+            await cursor.execute(MARK_BOOKED_SLOTS, params)
+            await cursor.execute(SAVE_STATE, params)
+            await cursor.execute(PRUNE_PAST_SLOTS, params)
+        await conn.commit()
+
+    if inserted:
+        logger.info(f"Slot calendar extended through {params['through']} ({inserted} new slots)")
+    return inserted
+
+
+slot_calendar_job = PeriodicJob("slot-calendar", extend_slot_calendar, SLOT_CALENDAR_INTERVAL)
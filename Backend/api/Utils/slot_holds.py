@@ -0,0 +1,253 @@
+"""
+Temporary Slot Holds
+
+Between /Bland/time-slot offering a slot and /Bland/book-appointment
+confirming it, the voice agent can place a short hold on the slot so it is
+not offered to other callers in the meantime:
+
+- place_hold:   conditional UPDATE of the doctor_slots row (open, or held
+                with an expired hold) setting is_available = false and a
+                fresh hold token with `held_until = now() + ttl`
+- convert:      book-appointment with "hold_id" reserves the slot through
+                reserve_slot(..., hold_token), which clears the hold
+- release_hold: explicit release by the agent (call ended, caller declined)
+- expiry:       HoldTimers, below
+
+Expiry is driven by a min-heap of (deadline, token) per worker: one task
+sleeps until the earliest deadline, pops every due token and releases them
+with one UPDATE keyed on the hold-token index. Converted or released holds
+are skipped lazily when they reach the top of the heap, so no table scan and
+no per-hold task is ever needed. Holds placed by a worker that has since
+stopped are picked up by a periodic sweep over the held_until partial index.
+
+Configuration (environment variables):
+- SLOT_HOLD_TTL: default hold duration in seconds (default 300)
+- SLOT_HOLD_MAX_TTL: upper bound for a requested duration (default 900)
+- SLOT_HOLD_SWEEP_INTERVAL: seconds between fallback sweeps (default 60)
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from api.Utils.availability import availability_engine
+from api.Utils.background import PeriodicJob
+from api.Utils.reservations import NOT_OFFERED, RESERVED, SLOT_TAKEN
+from database import async_pool
+
+logger = logging.getLogger(__name__)
+
+SLOT_HOLD_TTL = int(os.getenv("SLOT_HOLD_TTL", "300"))
+SLOT_HOLD_MAX_TTL = int(os.getenv("SLOT_HOLD_MAX_TTL", "900"))
+SLOT_HOLD_SWEEP_INTERVAL = float(os.getenv("SLOT_HOLD_SWEEP_INTERVAL", "60"))
+
+PLACE_HOLD = """
+    WITH target AS (
+        SELECT id FROM doctor_slots
+         WHERE doctor_id = %(doctor_id)s
+           AND slot_date = %(slot_date)s
+           AND slot_time = %(slot_time)s
+    ),
+    held AS (
+        UPDATE doctor_slots s
+           SET is_available = false,
+               hold_token = %(token)s,
+               held_until = now() + make_interval(secs => %(ttl)s),
+               held_by = %(held_by)s
+          FROM target
+         WHERE s.id = target.id
+           AND s.appointment_id IS NULL
+           AND (s.is_available
+                OR (s.hold_token IS NOT NULL AND s.held_until <= now()))
+        RETURNING s.held_until
+    )
+    SELECT (SELECT held_until FROM held), EXISTS (SELECT 1 FROM target);
+"""
+
+RELEASE_HOLDS = """
+    UPDATE doctor_slots
+       SET is_available = true,
+           hold_token = NULL,
+           held_until = NULL,
+           held_by = NULL
+     WHERE hold_token = ANY(%s)
+       AND appointment_id IS NULL
+    RETURNING doctor_id, slot_date, slot_time;
+"""
+
+RELEASE_EXPIRED_HOLDS = """
+    UPDATE doctor_slots
+       SET is_available = true,
+           hold_token = NULL,
+           held_until = NULL,
+           held_by = NULL
+     WHERE hold_token IS NOT NULL
+       AND held_until <= now()
+       AND appointment_id IS NULL
+    RETURNING doctor_id, slot_date, slot_time;
+"""
+
+
+def parse_hold_token(raw):
+    """UUID for a client-supplied hold id, or None if it is not one."""
+    try:
+        return uuid.UUID(str(raw))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class Hold:
+    status: str
+    token: uuid.UUID | None = None
+    held_until: datetime | None = None
+    ttl_seconds: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == RESERVED
+
+
+def mark_released(rows):
+    """Reopen released (doctor_id, slot_date, slot_time) rows in the availability engine."""
+    for doctor_id, slot_date, slot_time in rows:
+        availability_engine.mark_free(doctor_id, datetime.combine(slot_date, slot_time))
+
+
+class HoldTimers:
+    """Min-heap of hold deadlines, drained by a single background task."""
+
+    def __init__(self):
+        self._heap = []          # (monotonic deadline, token)
+        self._active = set()     # tokens still waiting to expire
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._active)
+
+    def schedule(self, token: uuid.UUID, ttl_seconds: float):
+        deadline = time.monotonic() + ttl_seconds
+        self._active.add(token)
+        heapq.heappush(self._heap, (deadline, token))
+        if self._heap[0][1] == token:
+            self._wakeup.set()      # new earliest deadline
+
+    def discard(self, token: uuid.UUID):
+        """Forget a converted or released hold (its heap entry is skipped later)."""
+        self._active.discard(token)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="slot-hold-timers")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop_due(self) -> list:
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, token = heapq.heappop(self._heap)
+            if token in self._active:
+                self._active.discard(token)
+                due.append(token)
+        return due
+
+    async def _loop(self):
+        while True:
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            due = self._pop_due()
+            if not due:
+                continue
+            try:
+                released = await _release(due)
+                self.expired += len(released)
+                if released:
+                    logger.info(f"Released {len(released)} expired slot hold(s)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The fallback sweep releases them once held_until has passed
+                logger.error(f"Failed to release expired slot holds: {e}")
+
+
+hold_timers = HoldTimers()
+
+
+async def _release(tokens) -> list:
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(RELEASE_HOLDS, (list(tokens),))
+            rows = await cursor.fetchall()
+        await conn.commit()
+    mark_released(rows)
+    return rows
+
+
+async def place_hold(cursor, doctor_id: int, slot_dt: datetime,
+                     ttl_seconds: int = SLOT_HOLD_TTL, held_by: str | None = None) -> Hold:
+    """Hold an open slot for `ttl_seconds`; the caller commits."""
+    ttl_seconds = max(1, min(int(ttl_seconds), SLOT_HOLD_MAX_TTL))
+    token = uuid.uuid4()
+    await cursor.execute(PLACE_HOLD, {
+        "doctor_id": doctor_id,
+        "slot_date": slot_dt.date(),
+        "slot_time": slot_dt.time(),
+        "token": token,
+        "ttl": ttl_seconds,
+        "held_by": held_by,
+    })
+    held_until, exists = await cursor.fetchone()
+    if held_until is None:
+        return Hold(SLOT_TAKEN if exists else NOT_OFFERED)
+    return Hold(RESERVED, token, held_until, ttl_seconds)
+
+
+def hold_placed(doctor_id: int, slot_dt: datetime, hold: Hold):
+    """Call after the hold's transaction committed: arm the timer, update the engine."""
+    hold_timers.schedule(hold.token, hold.ttl_seconds)
+    availability_engine.mark_booked(doctor_id, slot_dt)
+
+
+async def release_hold(cursor, token: uuid.UUID) -> list:
+    """Release a hold early; returns the released slot rows (empty if the hold
+    was unknown, expired or converted). Pass them to mark_released after commit."""
+    await cursor.execute(RELEASE_HOLDS, ([token],))
+    rows = await cursor.fetchall()
+    hold_timers.discard(token)
+    return rows
+
+
+async def release_expired_holds() -> int:
+    """Fallback sweep for holds whose timer is not in this worker's heap."""
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(RELEASE_EXPIRED_HOLDS)
+            rows = await cursor.fetchall()
+        await conn.commit()
+    mark_released(rows)
+    if rows:
+        logger.info(f"Sweep released {len(rows)} expired slot hold(s)")
+    return len(rows)
+
+
+slot_hold_sweep_job = PeriodicJob("slot-hold-sweep", release_expired_holds, SLOT_HOLD_SWEEP_INTERVAL)
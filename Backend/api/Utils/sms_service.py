@@ -0,0 +1,232 @@
+"""
+Async Twilio SMS Service
+
+Replaces the synchronous twilio `Client` (one blocking HTTPS call per SMS on
+a threadpool thread) with Twilio's REST API over one pooled httpx
+AsyncClient:
+
+- keep-alive: connections to api.twilio.com are reused across messages
+- concurrency: SMS_MAX_CONCURRENCY sender tasks, so at most that many
+  requests are in flight
+- rate limit: a token bucket at SMS_RATE messages per second (burst
+  SMS_BURST), matching the sender's Twilio throughput (1 MPS for a long
+  code, 3 for toll-free, more for short codes / messaging services)
+- queue: submit() reserves a send time from the bucket and puts the message
+  on a bounded queue, returning a future, so thousands of messages (a
+  reminder batch) fan out without blocking the caller. A message whose
+  send time would be later than the caller's `max_wait`, or that finds the
+  queue full, fails fast with SmsRateLimited(retry_after) instead.
+
+Errors: SmsError with `permanent=True` for requests Twilio rejects (invalid
+number, unsubscribed recipient, ...) and when no credentials or sender are
+configured, retryable otherwise (429, 5xx,
+network). The sender is TWILIO_MESSAGING_SERVICE_SID when set, otherwise
+TWILIO_FROM_NUMBER (TwilioConnet.py).
+
+Every request goes through the `twilio_sms` ServiceGuard (resilience.py):
+while Twilio keeps failing (network, 401, 429, 5xx) its breaker opens and
+queued messages fail fast with CircuitOpenError, which the outbox handler
+defers. Permanent rejections do not count against the breaker.
+
+Configuration (environment variables):
+- SMS_RATE: messages per second (default 1)
+- SMS_BURST: messages that may go out back to back (default 1)
+- SMS_MAX_CONCURRENCY: requests in flight (default 4)
+- SMS_QUEUE_SIZE: messages waiting to be sent (default 10000)
+- SMS_TIMEOUT: seconds per Twilio request (default 10)
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+
+from api.Utils.resilience import guard
+from TwilioConnet import account_sid, auth_token, from_number, messaging_service_sid
+
+logger = logging.getLogger(__name__)
+
+SMS_RATE = float(os.getenv("SMS_RATE", "1"))
+SMS_BURST = float(os.getenv("SMS_BURST", "1"))
+SMS_MAX_CONCURRENCY = int(os.getenv("SMS_MAX_CONCURRENCY", "4"))
+SMS_QUEUE_SIZE = int(os.getenv("SMS_QUEUE_SIZE", "10000"))
+SMS_TIMEOUT = float(os.getenv("SMS_TIMEOUT", "10"))
+
+TWILIO_API_BASE = "https://api.twilio.com/2010-04-01"
+
+sms_guard = guard("twilio_sms", SMS_MAX_CONCURRENCY, SMS_TIMEOUT)
+
+
+class SmsError(Exception):
+    """A message Twilio did not accept."""
+
+    def __init__(self, message: str, permanent: bool = False, status: int | None = None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.status = status
+
+
+class SmsRateLimited(Exception):
+    """The message cannot be sent within the allowed wait; try again later."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"SMS rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket whose tokens may be reserved ahead of time."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def reserve(self, max_wait: float | None = None) -> float | None:
+        """Take one token; seconds until it may be used, or None if over max_wait."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+        if max_wait is not None and wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+
+class SmsService:
+    """Queue plus sender tasks delivering SMS through the Twilio REST API."""
+
+    def __init__(self, rate: float = SMS_RATE, burst: float = SMS_BURST,
+                 concurrency: int = SMS_MAX_CONCURRENCY, queue_size: int = SMS_QUEUE_SIZE):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._http = None
+        self._tasks = []
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(account_sid and auth_token and (messaging_service_sid or from_number))
+
+    def start(self):
+        if self._tasks:
+            return
+        if not self.configured:
+            logger.warning("Twilio credentials or sender are not configured; SMS will fail permanently")
+        self._http = httpx.AsyncClient(
+            base_url=TWILIO_API_BASE,
+            auth=(account_sid or "", auth_token or ""),
+            timeout=SMS_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self._tasks = [
+            asyncio.create_task(self._sender(), name=f"sms-sender-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+        }
+
+    def submit(self, to: str, body: str, max_wait: float | None = None) -> asyncio.Future:
+        """Queue a message; the future resolves to the Twilio message sid."""
+        future = asyncio.get_running_loop().create_future()
+        if not self.configured:
+            # Retrying cannot help, and must not count against the breaker
+            self.failed += 1
+            future.set_exception(SmsError("Twilio credentials or sender are not configured", permanent=True))
+            return future
+        if self._queue.full():
+            self.rate_limited += 1
+            future.set_exception(SmsRateLimited(self._queue.qsize() / self.bucket.rate))
+            return future
+        wait = self.bucket.reserve(max_wait)
+        if wait is None:
+            self.rate_limited += 1
+            future.set_exception(SmsRateLimited(max_wait or 0))
+            return future
+        self._queue.put_nowait((time.monotonic() + wait, to, body, future))
+        return future
+
+    async def send(self, to: str, body: str) -> str:
+        return await self.submit(to, body)
+
+    async def _sender(self):
+        while True:
+            send_at, to, body, future = await self._queue.get()
+            try:
+                delay = send_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if future.cancelled():
+                    continue
+                sid = await sms_guard.call(
+                    self._post, to, body,
+                    healthy_error=lambda e: isinstance(e, SmsError) and e.permanent,
+                )
+                self.sent += 1
+                future.set_result(sid)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _post(self, to: str, body: str) -> str:
+        if not self.configured:
+            raise SmsError("Twilio credentials or sender are not configured", permanent=True)
+        data = {"To": to, "Body": body}
+        if messaging_service_sid:
+            data["MessagingServiceSid"] = messaging_service_sid
+        else:
+            data["From"] = from_number
+        try:
+            response = await self._http.post(f"/Accounts/{account_sid}/Messages.json", data=data)
+        except httpx.HTTPError as e:
+            raise SmsError(f"Twilio request failed: {e}") from e
+
+        if response.status_code < 300:
+            return response.json().get("sid")
+        try:
+            detail = response.json()
+            message = f"Twilio error {detail.get('code')}: {detail.get('message')}"
+        except ValueError:
+            message = f"Twilio HTTP {response.status_code}"
+        # 401 (credentials being rotated) and 429 (throttled) are worth retrying
+        permanent = 400 <= response.status_code < 500 and response.status_code not in (401, 429)
+        raise SmsError(message, permanent=permanent, status=response.status_code)
+
+
+sms_service = SmsService()
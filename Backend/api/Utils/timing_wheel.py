@@ -0,0 +1,108 @@
+"""
+Hierarchical Timing Wheel
+
+Timer store for many long-lived timers (appointment reminders days ahead)
+with O(1) schedule and cancel, and work per tick proportional only to the
+timers that are due or cascading:
+
+- level 0 has `slots` buckets of one tick each, level 1 `slots` buckets of
+  `slots` ticks, level 2 of `slots**2` ticks, ...
+- a timer goes into the coarsest-needed level; when the wheel turns past a
+  coarse bucket its timers cascade down into finer levels, and level-0
+  buckets fire
+- timers beyond the top level wait in an overflow map that is re-checked
+  whenever the top level turns
+
+Deadlines are absolute wall-clock timestamps (time.time()), since reminder
+times come from the appointments table. Keys are arbitrary hashables;
+scheduling an existing key replaces its timer.
+"""
+
+import math
+import time
+
+
+class TimingWheel:
+    """Hierarchical wheel of timers keyed by hashable `key`."""
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: float | None = None):
+        self.tick = tick
+        self.slots = slots
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._spans = [slots ** level for level in range(levels)]   # ticks per bucket
+        self._overflow = {}      # key -> (deadline tick, item)
+        self._due = {}           # key -> item, deadline already reached
+        self._where = {}         # key -> bucket dict currently holding it
+        self._current = self._to_tick(time.time() if now is None else now)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def _to_tick(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.tick)
+
+    def schedule(self, key, deadline: float, item=None):
+        """Fire `item` under `key` once the wheel reaches `deadline` (epoch seconds)."""
+        self.cancel(key)
+        self._place(key, math.ceil(deadline / self.tick), item)
+
+    def cancel(self, key) -> bool:
+        bucket = self._where.pop(key, None)
+        if bucket is None:
+            return False
+        del bucket[key]
+        return True
+
+    def _place(self, key, deadline_tick: int, item):
+        delta = deadline_tick - self._current
+        if delta <= 0:
+            bucket = self._due
+        else:
+            for level, span in enumerate(self._spans):
+                if delta < span * self.slots:
+                    bucket = self._wheels[level][(deadline_tick // span) % self.slots]
+                    break
+            else:
+                bucket = self._overflow
+        bucket[key] = (deadline_tick, item)
+        self._where[key] = bucket
+
+    def _take(self, bucket: dict) -> list:
+        entries = list(bucket.items())
+        bucket.clear()
+        for key, _ in entries:
+            del self._where[key]
+        return entries
+
+    def advance(self, now: float | None = None) -> list:
+        """Turn the wheel up to `now`; returns [(key, item)] of every timer that fired."""
+        target = self._to_tick(time.time() if now is None else now)
+        fired = [(key, item) for key, (_, item) in self._take(self._due)]
+
+        while self._current < target:
+            if not self._where:
+                # Nothing scheduled: jump instead of turning tick by tick
+                self._current = target
+                break
+            self._current += 1
+
+            # Cascade coarse buckets whose range has just started, top level first
+            top = len(self._spans) - 1
+            if self._current % (self._spans[top] * self.slots) == 0:
+                for key, (deadline_tick, item) in self._take(self._overflow):
+                    self._place(key, deadline_tick, item)
+            for level in range(top, 0, -1):
+                span = self._spans[level]
+                if self._current % span == 0:
+                    bucket = self._wheels[level][(self._current // span) % self.slots]
+                    for key, (deadline_tick, item) in self._take(bucket):
+                        self._place(key, deadline_tick, item)
+
+            bucket = self._wheels[0][self._current % self.slots]
+            fired.extend((key, item) for key, (_, item) in self._take(bucket))
+            fired.extend((key, item) for key, (_, item) in self._take(self._due))
+
+        return fired
@@ -5,26 +5,59 @@ This module handles all appointment-related operations including:
 - Booking new appointments
 - Retrieving patient appointments  
 - Cancelling existing appointments
+- Holding a slot temporarily while the caller decides
+- Bulk booking and cancellation of many appointments at once
 
 Each endpoint integrates with:
 - Database for persistence
-- Google Calendar for scheduling
-- Twilio for SMS notifications
+- Google Calendar for scheduling and Twilio for SMS notifications, both
+  queued in the transactional outbox and delivered after commit
 """
 
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from api.Utils.helper import (
-    create_calendar_event,
-    update_calendar_event,
     format_phone,
     parse_date,
     parse_time_input,
-    find_doctor_by_name
 )
-from Google_calender import calendar_service
-from database import conn, cursor
-from TwilioConnet import client
+from api.Utils.doctor_directory import doctor_directory, find_doctor_by_name
+from api.Utils.availability import availability_engine
+from api.Utils.bulk_appointments import (
+    APPLIED,
+    BULK_MAX_ITEMS,
+    DUPLICATE,
+    INVALID,
+    BookingItem,
+    appointments_on_day,
+    bulk_book,
+    bulk_cancel,
+)
+from api.Utils.reservations import (
+    RESCHEDULED,
+    SLOT_TAKEN,
+    UNCHANGED,
+    UniqueViolation,
+    book_appointment_tx,
+    release_slot,
+)
+from api.Utils.slot_holds import (
+    SLOT_HOLD_TTL,
+    hold_placed,
+    hold_timers,
+    mark_released,
+    parse_hold_token,
+    place_hold,
+    release_hold,
+)
+from api.Utils import outbox
+from api.Utils.idempotency import idempotent
+from api.Utils.side_effects import (
+    CALENDAR_EVENT_ID_PREFIX,
+    booked_sms_body,
+    cancelled_sms_body,
+)
+from database import get_async_db
 import logging
 
 from datetime import datetime, date
@@ -36,8 +69,19 @@ logger = logging.getLogger(__name__)
 Router = APIRouter()
 
 
+def slot_unavailable_response(status: str, doctor_name: str, slot_dt: datetime) -> JSONResponse:
+    """409 response for a slot that is already taken or was never offered."""
+    when = f"{slot_dt.strftime('%Y-%m-%d')} at {slot_dt.strftime('%I:%M %p')}"
+    if status == SLOT_TAKEN:
+        error = f"The slot with {doctor_name} on {when} has just been taken. Please choose another time."
+    else:
+        error = f"{doctor_name} has no slot on {when}. Please choose one of the offered times."
+    return JSONResponse({"error": error, "reason": status}, status_code=409)
+
+
 @Router.post("/Bland/book-appointment")
-async def book_appointment(request: Request):
+@idempotent("book-appointment")
+async def book_appointment(request: Request, db=Depends(get_async_db)):
     """
     Book or reschedule an appointment for a patient.
     
@@ -47,7 +91,8 @@ async def book_appointment(request: Request):
         "date": str,       # Appointment date (optional, defaults to today)
         "sslot": str,      # Time slot (e.g., "08:30", "2:30 PM")
         "pid": int,        # Patient ID
-        "phone": str       # Patient phone number (optional)
+        "phone": str,      # Patient phone number (optional)
+        "hold_id": str     # Hold from /Bland/hold-slot to convert (optional)
     }
     
     Response:
@@ -62,7 +107,14 @@ async def book_appointment(request: Request):
         "duration_minutes": int,           # Duration in minutes
         "calendar_event_id": str|null      # Google Calendar event ID
     }
+    
+    Returns 409 with "reason" = "slot_taken" when another caller booked the
+    slot first, or "not_offered" when the doctor has no such slot.
+    
+    Retries carrying the same `Idempotency-Key` header (or "idempotency_key"
+    in the body) get the original response back without booking again.
     """
+    conn, cursor = db
     try:
         # Parse and validate request body
         body = await request.json()
@@ -74,6 +126,7 @@ async def book_appointment(request: Request):
         raw_slot = body["sslot"]           # Time slot (required)
         patient_id = body["pid"]           # Patient ID (required)
         raw_phone = body.get("phone", "")  # Phone number (optional)
+        raw_hold_id = body.get("hold_id")  # Slot hold to convert (optional)
 
         # ━━━ Data Processing & Validation ━━━
         
@@ -84,196 +137,98 @@ async def book_appointment(request: Request):
         parsed_date = parse_date(raw_date) if raw_date else date.today()
         
         # Parse and validate time slot
-        parsed_time = parse_time_input(raw_slot)
+        try:
+            parsed_time = parse_time_input(raw_slot)
+        except ValueError as ve:
+            return JSONResponse(
+                {"error": f"Invalid time format: {str(ve)}"}, 
+                status_code=422
+            )
         
         # Combine date and time for full datetime
         requested_dt = datetime.combine(parsed_date, parsed_time)
-        new_day = requested_dt.strftime('%a')      # Day of week (e.g., 'Mon')
-        new_time_slot = requested_dt.time()        # Time object for availability check
+
+        # Validate the hold id before touching the database
+        hold_token = parse_hold_token(raw_hold_id) if raw_hold_id else None
+        if raw_hold_id and not hold_token:
+            return JSONResponse({"error": "Invalid hold_id"}, status_code=422)
 
         # ━━━ Doctor Lookup & Validation ━━━
         
         # Find doctor using flexible name matching
-        result = find_doctor_by_name(cursor, raw_dname)
-        if not result:
+        doctor = await find_doctor_by_name(cursor, raw_dname)
+        if not doctor:
             raise HTTPException(404, f"No doctor matching '{raw_dname}'")
-        matched_name, _, _ = result
-
-        # Get complete doctor information
-        cursor.execute("""
-            SELECT id, email, department 
-            FROM doctors 
-            WHERE LOWER(name) = %s
-        """, (matched_name.lower(),))
-        
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(404, f"Doctor {matched_name} not found in database")
-        
-        doctor_id, doctor_email, doctor_department = row
-
-        # ━━━ Check for Existing Appointment ━━━
-        
-        # Look for any existing appointment for this patient
-        cursor.execute(
-            "SELECT id, doctor_id, appointment_time, calendar_event_id FROM appointments WHERE patient_id = %s",
-            (patient_id,)
-        )
-        existing = cursor.fetchone()
-
-        if existing:
-            # ═══ RESCHEDULING EXISTING APPOINTMENT ═══
-            apt_id, old_doctor_id, old_time, old_event_id = existing
-
-            # Free up the old doctor's time slot
-            old_day = old_time.strftime('%a')
-            old_time_slot = old_time.time()
-            cursor.execute(
-                """
-                UPDATE doctor_availability
-                   SET is_available = true
-                 WHERE doctor_id = %s AND day_of_week = %s AND time_slot = %s
-                """,
-                (old_doctor_id, old_day, old_time_slot)
-            )
-
-            # Get old doctor's email for calendar event management
-            cursor.execute("SELECT email FROM doctors WHERE id = %s", (old_doctor_id,))
-            old_doctor_email = cursor.fetchone()[0]
-
-            # Update appointment with new details
-            cursor.execute(
-                """
-                UPDATE appointments
-                   SET doctor_id        = %s,
-                       appointment_time = %s,
-                       status           = %s
-                 WHERE id = %s
-                RETURNING id
-                """,
-                (doctor_id, requested_dt, "scheduled", apt_id)
-            )
-            appointment_id = cursor.fetchone()[0]
-            message = "Appointment rescheduled successfully."
-        else:
-            # ═══ CREATING NEW APPOINTMENT ═══
-            cursor.execute(
-                """
-                INSERT INTO appointments
-                  (patient_id, doctor_id, appointment_time, status, duration, calendar_event_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (patient_id, doctor_id, requested_dt, "scheduled", 30, None)
-            )
-            appointment_id = cursor.fetchone()[0]
-            message = "New appointment booked successfully."
-
-        # ━━━ Update Patient Information ━━━
-        
-        # Update patient's contact info and assign doctor
-        cursor.execute(
-            "UPDATE patients SET phone_number = %s, doctor_id = %s WHERE id = %s",
-            (phone, doctor_id, patient_id)
-        )
 
-        # ━━━ Update Doctor Availability ━━━
-        
-        # Mark the new time slot as unavailable
-        cursor.execute(
-            """
-            UPDATE doctor_availability
-               SET is_available = false
-             WHERE doctor_id = %s AND day_of_week = %s AND time_slot = %s
-            """,
-            (doctor_id, new_day, new_time_slot)
-        )
+        matched_name = doctor.name
+        doctor_id, doctor_department = doctor.id, doctor.department
 
-        # Commit all database changes before external API calls
-        conn.commit()
-        logger.info("Database changes committed successfully")
-
-        # ━━━ Send SMS Confirmation ━━━
-        
-        # Prepare and send confirmation message to patient
-        message_body = (
-            f"Your appointment with {matched_name} from {doctor_department} department "
-            f"has been booked on {requested_dt.strftime('%Y-%m-%d')} at "
-            f"{requested_dt.strftime('%I:%M %p')}. Please arrive 10 minutes early. "
-            f"-Medical Clinic"
-        )
+        # ━━━ Book in One Round Trip ━━━
         
+        # book_appointment_tx() locks the patient's current appointment,
+        # reserves the slot (converting the caller's hold), moves or inserts
+        # the appointment, updates the patient and queues the SMS / calendar
+        # outbox jobs; when the slot is taken nothing has been changed
+        sms_body = booked_sms_body(matched_name, doctor_department, requested_dt) if phone else None
         try:
-            client.messages.create(
-                to=phone,
-                from_="+19788008375",
-                body=message_body,
+            booking = await book_appointment_tx(
+                cursor, patient_id, doctor_id, requested_dt, phone,
+                hold_token=hold_token, duration=30, sms_body=sms_body,
+                event_prefix=CALENDAR_EVENT_ID_PREFIX,
+            )
+        except UniqueViolation:
+            # Another scheduled appointment already holds this doctor and time
+            await conn.rollback()
+            return slot_unavailable_response(SLOT_TAKEN, matched_name, requested_dt)
+
+        if not booking.ok:
+            await conn.rollback()
+            return slot_unavailable_response(booking.outcome, matched_name, requested_dt)
+
+        if booking.outcome == UNCHANGED:
+            # Same doctor and time as the current booking: nothing to change
+            await conn.rollback()
+            message = "Appointment already booked for this slot."
+        else:
+            # Commit the booking together with its queued side effects
+            await conn.commit()
+            logger.info("Database changes committed successfully")
+            outbox.outbox_worker.trigger()
+
+            # Keep the in-memory availability bitmaps in step with doctor_slots
+            if booking.old_doctor_id is not None:
+                availability_engine.mark_free(booking.old_doctor_id, booking.old_time)
+            availability_engine.mark_booked(doctor_id, requested_dt)
+            if hold_token:
+                hold_timers.discard(hold_token)
+            message = (
+                "Appointment rescheduled successfully." if booking.outcome == RESCHEDULED
+                else "New appointment booked successfully."
             )
-            logger.info("SMS confirmation sent successfully")
-        except Exception as sms_err:
-            logger.warning(f"SMS sending failed: {sms_err}")
-
-        # ━━━ Google Calendar Integration ━━━
-        
-        calendar_event_id = None
-        try:
-            if existing:
-                # Update existing calendar event
-                calendar_event_id = update_calendar_event(
-                    event_id=old_event_id,
-                    calendar_id=old_doctor_email,
-                    title=f"Appointment with patient {patient_id}",
-                    new_datetime=requested_dt,
-                    duration_minutes=30
-                )
-                logger.info("Calendar event updated successfully")
-            else:
-                # Create new calendar event
-                cursor.execute("SELECT full_name FROM patients WHERE id = %s", (patient_id,))
-                patient_name = cursor.fetchone()[0]
-
-                calendar_event_id = create_calendar_event(
-                    doctor_email,
-                    patient_name,
-                    requested_dt,
-                    duration_minutes=30
-                )
-
-                # Store the calendar event ID in database
-                cursor.execute(
-                    "UPDATE appointments SET calendar_event_id = %s WHERE id = %s",
-                    (calendar_event_id, appointment_id)
-                )
-                conn.commit()
-                logger.info("Calendar event created successfully")
-
-        except Exception as cal_err:
-            logger.warning(f"Calendar integration failed (appointment still booked): {cal_err}")
-            calendar_event_id = None
 
         # ━━━ Prepare Success Response ━━━
         
         return {
             "message": message,
-            "appointment_id": appointment_id,
+            "appointment_id": booking.appointment_id,
             "doctor_name": matched_name,
             "patient_id": patient_id,
             "appointment_date": requested_dt.strftime("%Y-%m-%d"),
             "appointment_time": requested_dt.strftime("%I:%M %p"),
             "status": "scheduled",
             "duration_minutes": 30,
-            "calendar_event_id": calendar_event_id
+            "calendar_event_id": booking.calendar_event_id
         }
 
     except HTTPException as he:
         # Handle known HTTP exceptions (e.g., doctor not found)
-        conn.rollback()
+        await conn.rollback()
         logger.error(f"HTTP Exception: {he.detail}")
         return JSONResponse({"detail": he.detail}, status_code=he.status_code)
 
     except Exception as e:
         # Handle unexpected errors with rollback
-        conn.rollback()
+        await conn.rollback()
         logger.error(f"Unexpected error during appointment booking: {e}")
         return JSONResponse(
             {"error": "Failed to book appointment", "details": str(e)},
@@ -282,7 +237,7 @@ async def book_appointment(request: Request):
 
 
 @Router.post("/Bland/get-appointment")
-async def get_appointment(request: Request):
+async def get_appointment(request: Request, db=Depends(get_async_db)):
     """
     Retrieve the latest appointment for a patient.
     
@@ -311,6 +266,7 @@ async def get_appointment(request: Request):
         "Stime": null
     }
     """
+    conn, cursor = db
     try:
         # Parse and validate request body
         body = await request.json()
@@ -327,69 +283,61 @@ async def get_appointment(request: Request):
 
         # ━━━ Database Query for Patient Appointments ━━━
         
-        # Create fresh cursor for this request (thread-safe pattern)
-        cursor = conn.cursor()
-        
-        try:
-            # Join appointments with doctors to get complete information
-            cursor.execute("""
-                SELECT
-                    a.id,
-                    d.name      AS doctor_name,
-                    d.department,
-                    a.appointment_time
-                FROM appointments a
-                JOIN doctors d ON a.doctor_id = d.id
-                WHERE a.patient_id = %s
-                ORDER BY a.appointment_time;
-            """, (patient_id,))
-
-            rows = cursor.fetchall()
-            
-            # ━━━ Handle No Appointments Found ━━━
-            
-            if not rows:
-                logger.info(f"No appointments found for patient {patient_id}")
-                return JSONResponse(
-                    {
-                        "appointment": False,
-                        "appointment_id": None,
-                        "doctor_name": None,
-                        "department": None,
-                        "Sdate": None,
-                        "Stime": None
-                    },
-                    status_code=200
-                )
-
-            # ━━━ Process Latest Appointment ━━━
-            
-            # Get the most recent appointment (last in ordered list)
-            appt_id, doctor_name, department, appt_time = rows[-1]
-
-            # Format date and time for response
-            sdate = appt_time.strftime("%Y-%m-%d")      # ISO date format
-            stime = appt_time.strftime("%I:%M %p")       # 12-hour time format
-
-            logger.info(f"Found appointment: {appt_id} with Dr. {doctor_name} on {sdate} at {stime}")
+        # Join appointments with doctors to get complete information
+        await cursor.execute("""
+            SELECT
+                a.id,
+                d.name      AS doctor_name,
+                d.department,
+                a.appointment_time
+            FROM appointments a
+            JOIN doctors d ON a.doctor_id = d.id
+            WHERE a.patient_id = %s
+            ORDER BY a.appointment_time;
+        """, (patient_id,))
 
-            # ━━━ Prepare Success Response ━━━
-            
+        rows = await cursor.fetchall()
+        
+        # ━━━ Handle No Appointments Found ━━━
+        
+        if not rows:
+            logger.info(f"No appointments found for patient {patient_id}")
             return JSONResponse(
                 {
-                    "appointment": True,
-                    "appointment_id": appt_id,
-                    "doctor_name": doctor_name,
-                    "department": department,
-                    "Sdate": sdate,
-                    "Stime": stime
+                    "appointment": False,
+                    "appointment_id": None,
+                    "doctor_name": None,
+                    "department": None,
+                    "Sdate": None,
+                    "Stime": None
                 },
                 status_code=200
             )
 
-        finally:
-            # Always close cursor to prevent connection leaks
-            cursor.close()
+        # ━━━ Process Latest Appointment ━━━
+        
+        # Get the most recent appointment (last in ordered list)
+        appt_id, doctor_name, department, appt_time = rows[-1]
+
+        # Format date and time for response
+        sdate = appt_time.strftime("%Y-%m-%d")      # ISO date format
+        stime = appt_time.strftime("%I:%M %p")       # 12-hour time format
+
+        logger.info(f"Found appointment: {appt_id} with Dr. {doctor_name} on {sdate} at {stime}")
+
+        # ━━━ Prepare Success Response ━━━
+        
+        return JSONResponse(
+            {
+                "appointment": True,
+                "appointment_id": appt_id,
+                "doctor_name": doctor_name,
+                "department": department,
+                "Sdate": sdate,
+                "Stime": stime
+            },
+            status_code=200
+        )
 
     except Exception as e:
         logger.error(f"Error fetching patient appointments: {e}")
@@ -400,7 +348,8 @@ async def get_appointment(request: Request):
 
 
 @Router.post("/Bland/cancel-appointment")
-async def cancel_appointment(request: Request):
+@idempotent("cancel-appointment")
+async def cancel_appointment(request: Request, db=Depends(get_async_db)):
     """
     Cancel an existing appointment and free up the time slot.
     
@@ -423,7 +372,11 @@ async def cancel_appointment(request: Request):
         "time": str,              # Original time
         "status": str             # New status ("cancelled")
     }
+    
+    Retries carrying the same `Idempotency-Key` header (or "idempotency_key"
+    in the body) get the original response back without cancelling again.
     """
+    conn, cursor = db
     try:
         # Parse and validate request body
         body = await request.json()
@@ -467,41 +420,35 @@ async def cancel_appointment(request: Request):
 
         # Combine date and time for exact appointment matching
         appt_datetime = datetime.combine(parsed_date, parsed_time)
-        day_of_week = appt_datetime.strftime("%a")  # Abbreviated day format for availability
 
         # ━━━ Doctor Lookup and Validation ━━━
         
         # Find doctor using flexible name matching
-        result = find_doctor_by_name(cursor, doctor_name)
-        if not result:
+        matched = await find_doctor_by_name(cursor, doctor_name)
+        if not matched:
             raise HTTPException(404, f"No doctor matching '{doctor_name}'")
-        matched_name, _, _ = result
+        matched_name = matched.name
 
         # Get doctor details with department verification
-        cursor.execute("""
-            SELECT id, email 
-            FROM doctors 
-            WHERE LOWER(name) = LOWER(%s) AND LOWER(department) = LOWER(%s)
-        """, (matched_name, department))
-        
-        doc_row = cursor.fetchone()
-        if not doc_row:
+        directory = await doctor_directory.get(cursor)
+        doctor = directory.find_in_department(matched_name, department)
+        if not doctor:
             return JSONResponse(
                 {"error": f"Doctor '{matched_name}' not found in '{department}' department"}, 
                 status_code=404
             )
-        doctor_id, doctor_calendar_id = doc_row
+        doctor_id, doctor_calendar_id = doctor.id, doctor.email
 
         # ━━━ Find and Validate Appointment ━━━
         
         # Locate the specific appointment to cancel
-        cursor.execute("""
+        await cursor.execute("""
             SELECT id, calendar_event_id 
             FROM appointments 
             WHERE patient_id = %s AND doctor_id = %s AND appointment_time = %s
         """, (patient_id, doctor_id, appt_datetime))
         
-        appt_row = cursor.fetchone()
+        appt_row = await cursor.fetchone()
         if not appt_row:
             return JSONResponse(
                 {
@@ -516,68 +463,50 @@ async def cancel_appointment(request: Request):
 
         # ━━━ Database Updates ━━━
         
-        # Free up the doctor's time slot
-        cursor.execute("""
-            UPDATE doctor_availability 
-            SET is_available = true 
-            WHERE doctor_id = %s 
-            AND day_of_week = %s 
-            AND time_slot = %s
-        """, (doctor_id, day_of_week, parsed_time.strftime("%H:%M:%S")))
+        # Free up the doctor's time slot on that date
+        await release_slot(cursor, doctor_id, appt_datetime)
 
         # Remove the appointment record
-        cursor.execute("DELETE FROM appointments WHERE id = %s", (appointment_id,))
+        await cursor.execute("DELETE FROM appointments WHERE id = %s", (appointment_id,))
 
         # Unassign doctor from patient (set to default/unassigned)
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE patients 
             SET doctor_id = 0 
             WHERE id = %s
         """, (patient_id,))
 
-        logger.info("Database updates completed")
-
-        # ━━━ Google Calendar Integration ━━━
+        # ━━━ Queue Calendar Delete & SMS Notification ━━━
         
-        # Attempt to delete the calendar event
-        try:
-            if calendar_event_id:
-                calendar_service.events().delete(
-                    calendarId=doctor_calendar_id,
-                    eventId=calendar_event_id
-                ).execute()
-                logger.info("Calendar event deleted successfully")
-        except Exception as cal_err:
-            logger.warning(f"Failed to delete calendar event: {cal_err}")
-
-        # Commit all database changes
-        conn.commit()
+        # Written in the same transaction, delivered by the outbox worker
+        aggregate_key = f"appointment:{appointment_id}"
+        if calendar_event_id and doctor_calendar_id:
+            await outbox.enqueue(
+                cursor, "calendar.delete",
+                {"calendar_id": doctor_calendar_id, "event_id": calendar_event_id},
+                idempotency_key=f"{aggregate_key}:calendar.delete",
+                aggregate_key=aggregate_key,
+            )
 
-        # ━━━ SMS Notification ━━━
-        
         # Get patient's phone number for cancellation confirmation
-        cursor.execute("SELECT phone_number FROM patients WHERE id = %s", (patient_id,))
-        patient_phone_row = cursor.fetchone()
+        await cursor.execute("SELECT phone_number FROM patients WHERE id = %s", (patient_id,))
+        patient_phone_row = await cursor.fetchone()
         patient_phone = patient_phone_row[0] if patient_phone_row else None
 
-        # Send cancellation confirmation SMS
         if patient_phone:
-            try:
-                cancel_message_body = (
-                    f"Your appointment with {matched_name} from {department} department "
-                    f"scheduled on {appt_datetime.strftime('%Y-%m-%d')} at "
-                    f"{appt_datetime.strftime('%I:%M %p')} has been cancelled successfully. "
-                    f"If you have questions, please contact the clinic. -Medical Clinic"
-                )
-                
-                client.messages.create(
-                    to=patient_phone,
-                    from_="+19788008375",
-                    body=cancel_message_body,
-                )
-                logger.info("Cancellation SMS sent successfully")
-            except Exception as sms_err:
-                logger.warning(f"Failed to send cancellation SMS: {sms_err}")
+            cancel_message_body = cancelled_sms_body(matched_name, department, appt_datetime)
+            await outbox.enqueue(
+                cursor, "sms.send", {"to": patient_phone, "body": cancel_message_body},
+                idempotency_key=f"{aggregate_key}:sms:cancelled",
+                # Own key: the SMS never waits behind a deferred calendar delete
+                aggregate_key=f"{aggregate_key}:sms",
+            )
+
+        # Commit all database changes
+        await conn.commit()
+        logger.info("Database updates completed")
+        outbox.outbox_worker.trigger()
+        availability_engine.mark_free(doctor_id, appt_datetime)
 
         # ━━━ Prepare Success Response ━━━
         
@@ -594,7 +523,7 @@ async def cancel_appointment(request: Request):
     except HTTPException as he:
         # Handle known HTTP exceptions
         if conn:
-            conn.rollback()
+            await conn.rollback()
         logger.error(f"HTTP Exception during cancellation: {he.detail}")
         return JSONResponse({"detail": he.detail}, status_code=he.status_code)
 
@@ -602,8 +531,435 @@ async def cancel_appointment(request: Request):
         # Handle unexpected errors with rollback
         logger.error(f"Unexpected error during appointment cancellation: {e}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         return JSONResponse(
             {"error": "Failed to cancel appointment", "details": str(e)},
             status_code=500
         )
+
+
+@Router.post("/Bland/hold-slot")
+async def hold_slot(request: Request, db=Depends(get_async_db)):
+    """
+    Place a short-lived hold on a doctor's slot during an active call.
+    
+    The held slot disappears from time-slot / check-avail / earliest-available
+    for everyone else until the hold is converted by book-appointment (pass
+    "hold_id"), released through /Bland/release-hold, or expires.
+    
+    Request Body:
+    {
+        "dname": str,          # Doctor name (flexible matching)
+        "date": str,           # Slot date (optional, defaults to today)
+        "sslot": str,          # Time slot (e.g., "08:30", "2:30 PM")
+        "call_id": str,        # Caller / call reference (optional)
+        "ttl_seconds": int     # Hold duration (optional, default 300)
+    }
+    
+    Response:
+    {
+        "hold_id": str,               # Pass to book-appointment / release-hold
+        "doctor_name": str,           # Matched doctor name
+        "appointment_date": str,      # YYYY-MM-DD
+        "appointment_time": str,      # HH:MM AM/PM
+        "expires_at": str,            # ISO timestamp
+        "expires_in_seconds": int
+    }
+    """
+    conn, cursor = db
+    try:
+        # Parse and validate request body
+        body = await request.json()
+        logger.info(f"Slot hold request received: {body}")
+
+        raw_dname = body["dname"]
+        raw_date = body.get("date")
+        raw_slot = body["sslot"]
+        held_by = body.get("call_id")
+        ttl_seconds = int(body.get("ttl_seconds") or SLOT_HOLD_TTL)
+
+        # ━━━ Data Processing & Validation ━━━
+        
+        parsed_date = parse_date(raw_date) if raw_date else date.today()
+        if not parsed_date:
+            return JSONResponse(
+                {"error": "Invalid date format. Please use a valid date."},
+                status_code=422
+            )
+        try:
+            parsed_time = parse_time_input(raw_slot)
+        except ValueError as ve:
+            return JSONResponse(
+                {"error": f"Invalid time format: {str(ve)}"},
+                status_code=422
+            )
+        requested_dt = datetime.combine(parsed_date, parsed_time)
+
+        doctor = await find_doctor_by_name(cursor, raw_dname)
+        if not doctor:
+            return JSONResponse({"detail": f"No doctor matching '{raw_dname}'"}, status_code=404)
+
+        # ━━━ Place the Hold ━━━
+        
+        hold = await place_hold(cursor, doctor.id, requested_dt, ttl_seconds, held_by)
+        if not hold.ok:
+            await conn.rollback()
+            return slot_unavailable_response(hold.status, doctor.name, requested_dt)
+
+        await conn.commit()
+        hold_placed(doctor.id, requested_dt, hold)
+        logger.info(f"Hold {hold.token} placed on Dr. {doctor.name} at {requested_dt}")
+
+        return {
+            "hold_id": str(hold.token),
+            "doctor_name": doctor.name,
+            "appointment_date": requested_dt.strftime("%Y-%m-%d"),
+            "appointment_time": requested_dt.strftime("%I:%M %p"),
+            "expires_at": hold.held_until.isoformat(),
+            "expires_in_seconds": hold.ttl_seconds
+        }
+
+    except KeyError as ke:
+        logger.error(f"Missing required field: {ke}")
+        return JSONResponse({"error": f"Missing required field: {ke}"}, status_code=422)
+
+    except Exception as e:
+        await conn.rollback()
+        logger.error(f"Unexpected error while holding slot: {e}")
+        return JSONResponse(
+            {"error": "Failed to hold slot", "details": str(e)},
+            status_code=500
+        )
+
+
+@Router.post("/Bland/release-hold")
+async def release_slot_hold(request: Request, db=Depends(get_async_db)):
+    """
+    Release a slot hold early (caller declined or hung up).
+    
+    Request Body:
+    {
+        "hold_id": str    # Hold returned by /Bland/hold-slot
+    }
+    
+    Response:
+    {
+        "message": str,
+        "released": bool  # False if the hold had already expired or been booked
+    }
+    """
+    conn, cursor = db
+    try:
+        body = await request.json()
+        hold_token = parse_hold_token(body.get("hold_id"))
+        if not hold_token:
+            return JSONResponse({"error": "Invalid hold_id"}, status_code=422)
+
+        released = await release_hold(cursor, hold_token)
+        await conn.commit()
+        mark_released(released)
+
+        return {
+            "message": "Hold released." if released else "Hold already expired or converted.",
+            "released": bool(released)
+        }
+
+    except Exception as e:
+        await conn.rollback()
+        logger.error(f"Unexpected error while releasing hold: {e}")
+        return JSONResponse(
+            {"error": "Failed to release hold", "details": str(e)},
+            status_code=500
+        )
+
+
+@Router.post("/Bland/bulk-book")
+@idempotent("bulk-book")
+async def bulk_book_appointments(request: Request, db=Depends(get_async_db)):
+    """
+    Book or reschedule many appointments in one transaction.
+    
+    Request Body:
+    {
+        "items": [                 # Up to BULK_MAX_ITEMS bookings
+            {
+                "pid": int,        # Patient ID
+                "doctor_id": int,  # Doctor, by id
+                "dname": str,      # or by exact name (case-insensitive)
+                "department": str, # within this department
+                "date": str,       # Appointment date (optional, defaults to today)
+                "sslot": str       # Time slot
+            }
+        ],
+        "atomic": bool             # Roll back everything if any item fails (default false)
+    }
+    
+    Response:
+    {
+        "applied": bool,           # False when an atomic batch was rolled back
+        "succeeded": int,
+        "failed": int,
+        "results": [               # One per item, in request order
+            {
+                "index": int,
+                "status": str,     # booked | rescheduled | unchanged | slot_taken
+                                   # | not_offered | invalid | duplicate
+                "appointment_id": int|null,
+                "patient_id": int,
+                "doctor_name": str,
+                "appointment_date": str,
+                "appointment_time": str,
+                "calendar_event_id": str|null
+            }
+        ]
+    }
+    
+    SMS confirmations and calendar changes of the whole batch are queued in
+    the outbox together; a patient or slot may appear only once per batch.
+    Doctors are resolved exactly, never by fuzzy name match, so a batch
+    cannot land on the wrong doctor's calendar.
+    """
+    conn, cursor = db
+    try:
+        body = await request.json()
+        raw_items = body.get("items")
+        atomic = bool(body.get("atomic", False))
+
+        if not isinstance(raw_items, list) or not raw_items:
+            return JSONResponse({"error": "items must be a non-empty list"}, status_code=422)
+        if len(raw_items) > BULK_MAX_ITEMS:
+            return JSONResponse(
+                {"error": f"At most {BULK_MAX_ITEMS} items per request"},
+                status_code=422
+            )
+
+        # ━━━ Validate Items & Resolve Doctors ━━━
+        
+        results = {}
+        items = []
+        directory = await doctor_directory.get(cursor)
+        seen_patients, seen_slots = set(), set()
+        for index, raw in enumerate(raw_items):
+            try:
+                patient_id = int(raw["pid"])
+                raw_doctor_id = raw.get("doctor_id")
+                raw_dname = (raw.get("dname") or "").strip()
+                department = (raw.get("department") or "").strip()
+                if raw_doctor_id is None and not (raw_dname and department):
+                    raise ValueError("doctor_id, or dname and department, is required")
+                parsed_date = parse_date(raw["date"]) if raw.get("date") else date.today()
+                slot_dt = datetime.combine(parsed_date, parse_time_input(raw["sslot"]))
+            except Exception as e:
+                results[index] = {"index": index, "status": INVALID, "error": f"Invalid item: {e}"}
+                continue
+
+            # Exact resolution: a fuzzy match could book on another doctor's calendar
+            if raw_doctor_id is not None:
+                try:
+                    doctor = directory.by_id.get(int(raw_doctor_id))
+                except (TypeError, ValueError):
+                    doctor = None
+                if not doctor:
+                    results[index] = {"index": index, "status": INVALID, "error": f"Doctor {raw_doctor_id} not found"}
+                    continue
+            else:
+                doctor = directory.find_in_department(raw_dname, department)
+                if not doctor:
+                    results[index] = {
+                        "index": index,
+                        "status": INVALID,
+                        "error": f"Doctor '{raw_dname}' not found in '{department}' department"
+                    }
+                    continue
+
+            if patient_id in seen_patients or (doctor.id, slot_dt) in seen_slots:
+                results[index] = {
+                    "index": index,
+                    "status": DUPLICATE,
+                    "error": "Patient or slot already appears earlier in this batch"
+                }
+                continue
+            seen_patients.add(patient_id)
+            seen_slots.add((doctor.id, slot_dt))
+            items.append(BookingItem(index, patient_id, doctor, slot_dt))
+
+        # ━━━ Apply the Batch ━━━
+        
+        try:
+            outcome = await bulk_book(cursor, items, directory)
+        except UniqueViolation:
+            # A slot was booked outside doctor_slots while the batch ran
+            await conn.rollback()
+            return JSONResponse(
+                {"error": "A slot in the batch was booked concurrently. Please retry.", "reason": SLOT_TAKEN},
+                status_code=409
+            )
+
+        results.update(outcome.results)
+        ordered = [results[index] for index in range(len(raw_items))]
+        failed = sum(1 for result in ordered if result["status"] not in APPLIED)
+        applied = not (atomic and failed)
+
+        if applied:
+            await conn.commit()
+            outbox.outbox_worker.trigger()
+            for doctor_id, slot_dt in outcome.freed:
+                availability_engine.mark_free(doctor_id, slot_dt)
+            for doctor_id, slot_dt in outcome.booked:
+                availability_engine.mark_booked(doctor_id, slot_dt)
+        else:
+            await conn.rollback()
+
+        logger.info(f"Bulk booking of {len(ordered)} items: {failed} failed, applied={applied}")
+        return JSONResponse({
+            "applied": applied,
+            "succeeded": len(ordered) - failed,
+            "failed": failed,
+            "results": ordered
+        }, status_code=200 if applied else 409)
+
+    except Exception as e:
+        await conn.rollback()
+        logger.error(f"Unexpected error during bulk booking: {e}")
+        return JSONResponse(
+            {"error": "Failed to apply bulk booking", "details": str(e)},
+            status_code=500
+        )
+
+
+@Router.post("/Bland/bulk-cancel")
+@idempotent("bulk-cancel")
+async def bulk_cancel_appointments(request: Request, db=Depends(get_async_db)):
+    """
+    Cancel many appointments in one transaction.
+    
+    Request Body:
+    {
+        "appointment_ids": [int],  # Appointments to cancel (optional)
+        "doctor_id": int,          # With "date": every scheduled appointment
+        "doctor_name": str,        # of this doctor on that day (optional);
+        "department": str,         # by id, or by exact name within a department
+        "date": str,
+        "atomic": bool             # Roll back everything if any id is unknown (default false)
+    }
+    
+    Response:
+    {
+        "applied": bool,           # False when an atomic batch was rolled back
+        "cancelled": int,
+        "failed": int,
+        "results": [               # One per appointment
+            {
+                "appointment_id": int,
+                "status": str,     # cancelled | not_found
+                "doctor_name": str,
+                "department": str,
+                "date": str,
+                "time": str
+            }
+        ]
+    }
+    
+    Cancellation SMS and calendar deletes of the whole batch are queued in
+    the outbox together. A whole day is cancelled only for an unambiguous
+    doctor (never a fuzzy name match), and only if it fits in one request
+    of BULK_MAX_ITEMS appointments.
+    """
+    conn, cursor = db
+    try:
+        body = await request.json()
+        raw_ids = body.get("appointment_ids") or []
+        raw_doctor_id = body.get("doctor_id")
+        doctor_name = (body.get("doctor_name") or "").strip()
+        department = (body.get("department") or "").strip()
+        raw_date = (body.get("date") or "").strip()
+        atomic = bool(body.get("atomic", False))
+
+        if not isinstance(raw_ids, list):
+            return JSONResponse({"error": "appointment_ids must be a list"}, status_code=422)
+        try:
+            appointment_ids = [int(appointment_id) for appointment_id in raw_ids]
+        except (TypeError, ValueError):
+            return JSONResponse({"error": "appointment_ids must be integers"}, status_code=422)
+
+        # ━━━ Whole Day of One Doctor ━━━
+        
+        if raw_doctor_id is not None or doctor_name or department or raw_date:
+            if not raw_date or (raw_doctor_id is None and not (doctor_name and department)):
+                return JSONResponse(
+                    {"error": "date must be given with doctor_id, or with doctor_name and department"},
+                    status_code=422
+                )
+            parsed_date = parse_date(raw_date)
+            if not parsed_date:
+                return JSONResponse(
+                    {"error": "Invalid date format. Please use a valid date."},
+                    status_code=422
+                )
+
+            # A fuzzy match could cancel another doctor's day: resolve exactly
+            directory = await doctor_directory.get(cursor)
+            if raw_doctor_id is not None:
+                try:
+                    doctor = directory.by_id.get(int(raw_doctor_id))
+                except (TypeError, ValueError):
+                    return JSONResponse({"error": "doctor_id must be an integer"}, status_code=422)
+                if not doctor:
+                    return JSONResponse({"error": f"Doctor {raw_doctor_id} not found"}, status_code=404)
+            else:
+                doctor = directory.find_in_department(doctor_name, department)
+                if not doctor:
+                    return JSONResponse(
+                        {"error": f"Doctor '{doctor_name}' not found in '{department}' department"},
+                        status_code=404
+                    )
+
+            day_ids = await appointments_on_day(cursor, doctor.id, parsed_date)
+            if len(day_ids) > BULK_MAX_ITEMS:
+                return JSONResponse(
+                    {"error": f"Dr. {doctor.name} has {len(day_ids)} scheduled appointments on "
+                              f"{parsed_date.isoformat()}; at most {BULK_MAX_ITEMS} can be cancelled per "
+                              f"request, cancel them by appointment_ids in several requests"},
+                    status_code=422
+                )
+            appointment_ids += day_ids
+
+        appointment_ids = list(dict.fromkeys(appointment_ids))
+        if not appointment_ids:
+            return JSONResponse({"error": "No appointments to cancel"}, status_code=422)
+        if len(appointment_ids) > BULK_MAX_ITEMS:
+            return JSONResponse(
+                {"error": f"At most {BULK_MAX_ITEMS} appointments per request"},
+                status_code=422
+            )
+
+        # ━━━ Apply the Batch ━━━
+        
+        outcome = await bulk_cancel(cursor, appointment_ids)
+        ordered = [outcome.results[appointment_id] for appointment_id in appointment_ids]
+        failed = outcome.failed
+        applied = not (atomic and failed)
+
+        if applied:
+            await conn.commit()
+            outbox.outbox_worker.trigger()
+            for doctor_id, slot_dt in outcome.freed:
+                availability_engine.mark_free(doctor_id, slot_dt)
+        else:
+            await conn.rollback()
+
+        logger.info(f"Bulk cancellation of {len(ordered)} appointments: {failed} failed, applied={applied}")
+        return JSONResponse({
+            "applied": applied,
+            "cancelled": len(ordered) - failed,
+            "failed": failed,
+            "results": ordered
+        }, status_code=200 if applied else 409)
+
+    except Exception as e:
+        await conn.rollback()
+        logger.error(f"Unexpected error during bulk cancellation: {e}")
+        return JSONResponse(
+            {"error": "Failed to apply bulk cancellation", "details": str(e)},
+            status_code=500
+        )
@@ -6,21 +6,22 @@ This module handles all doctor-related operations including:
 - Getting available time slots for doctors
 - Checking doctor availability on specific dates
 - Fetching available booking dates for doctors
+- Finding the earliest open slots across a department
 
 Each endpoint integrates with:
 - Database for doctor and availability data
 - Flexible name matching for better user experience
 """
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
-from api.Utils.helper import parse_time_input, find_doctor_by_name, parse_date
-import difflib
+from api.Utils.helper import parse_time_input, parse_date
+from api.Utils.doctor_directory import doctor_directory, find_doctor_by_name, find_department
+from api.Utils.availability import availability_engine
 import json
 import logging
-from datetime import datetime, timedelta, date
-import re
-from database import conn, cursor
+from datetime import datetime, date
+from database import get_async_db
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
@@ -28,9 +29,17 @@ logger = logging.getLogger(__name__)
 # Initialize router for doctor-related endpoints
 Router = APIRouter()
 
+# Number of dates offered by check-avail (alternatives) and fetch-date
+ALTERNATIVE_DATES_LIMIT = 14
+BOOKING_DATES_LIMIT = 7
+
+# Default and maximum number of slots returned by earliest-available
+EARLIEST_SLOTS_DEFAULT = 3
+EARLIEST_SLOTS_MAX = 20
+
 
 @Router.post("/Bland/get-doctors")
-async def get_doctors(request: Request):
+async def get_doctors(request: Request, db=Depends(get_async_db)):
     """
     Retrieve all doctors in a specified department.
     
@@ -44,6 +53,7 @@ async def get_doctors(request: Request):
         "doctor_name": str   # Comma-separated list of doctor names
     }
     """
+    _, cursor = db
     try:
         # Parse and validate request body
         d = json.loads(await request.body())
@@ -53,14 +63,14 @@ async def get_doctors(request: Request):
 
         # ━━━ Department Matching & Validation ━━━
         
-        # Get all available departments for fuzzy matching
-        cursor.execute("SELECT DISTINCT LOWER(department) FROM doctors;")
-        departments = [row[0] for row in cursor.fetchall()]
+        # Get all available departments for fuzzy matching (cached directory)
+        directory = await doctor_directory.get(cursor)
+        departments = directory.departments
 
         # Use fuzzy matching to find closest department name
-        match = difflib.get_close_matches(raw_department, departments, n=1, cutoff=0.5)
+        match = await find_department(cursor, raw_department)
         if match:
-            corrected_department = match[0]
+            corrected_department = match
             logger.info(f"Department '{raw_department}' matched to '{corrected_department}'")
         else:
             corrected_department = raw_department
@@ -68,12 +78,11 @@ async def get_doctors(request: Request):
 
         # ━━━ Retrieve Doctors in Department ━━━
         
-        # Query doctors in the matched department
-        cursor.execute("SELECT name FROM doctors WHERE LOWER(department) = %s", (corrected_department,))
-        rows = cursor.fetchall()
+        # Look up doctors in the matched department
+        department_doctors = directory.by_department.get(corrected_department, [])
 
         # Handle case where no doctors found
-        if not rows:
+        if not department_doctors:
             logger.warning(f"No doctors found in department '{corrected_department}'")
             return JSONResponse({
                 "error": f"No doctors found in department '{corrected_department}'",
@@ -83,7 +92,7 @@ async def get_doctors(request: Request):
         # ━━━ Format Response ━━━
         
         # Extract doctor names and create response
-        doctor_names = [row[0] for row in rows]
+        doctor_names = [d.name for d in department_doctors]
         logger.info(f"Found {len(doctor_names)} doctors: {doctor_names}")
         
         response_text = ", ".join(doctor_names)
@@ -107,7 +116,7 @@ async def get_doctors(request: Request):
 
 
 @Router.post("/Bland/time-slot")
-async def get_time_slot(request: Request):
+async def get_time_slot(request: Request, db=Depends(get_async_db)):
     """
     Get available time slots for a specific doctor on a given date.
     
@@ -126,6 +135,7 @@ async def get_time_slot(request: Request):
         "availability": str           # "Available" or "Not Available"
     }
     """
+    _, cursor = db
     try:
         # Parse and validate request body
         data = await request.json()
@@ -155,41 +165,30 @@ async def get_time_slot(request: Request):
                 status_code=400
             )
 
-        # Get the day of week for availability lookup
-        day_of_week = parsed_date.strftime("%a")  # Abbreviated day (e.g., "Mon", "Tue")
-        logger.info(f"Looking for slots on {day_of_week} ({parsed_date.strftime('%Y-%m-%d')})")
+        logger.info(f"Looking for slots on {parsed_date.strftime('%a %Y-%m-%d')}")
 
         # ━━━ Doctor Lookup & Validation ━━━
         
         # Find doctor using flexible name matching
-        result = find_doctor_by_name(cursor, raw_input)
-        if not result:
+        doctor = await find_doctor_by_name(cursor, raw_input)
+        if not doctor:
             return JSONResponse(
                 {"error": f"No doctor found matching '{raw_input}'"},
                 status_code=404
             )
-        matched_name, _, _ = result
+        matched_name = doctor.name
         logger.info(f"Found doctor: {matched_name}")
 
         # ━━━ Query Available Time Slots ━━━
         
-        # Get available time slots for the doctor on the selected day
-        cursor.execute("""
-            SELECT da.time_slot
-            FROM doctors d
-            JOIN doctor_availability da ON d.id = da.doctor_id
-            WHERE LOWER(d.name) = %s
-            AND da.day_of_week = %s
-            AND da.is_available = true
-            ORDER BY da.time_slot;
-        """, (matched_name.lower(), day_of_week))
-        
-        time_slots = cursor.fetchall()
+        # Get open time slots for the doctor on the selected date (bitmap engine)
+        await availability_engine.ensure_loaded(cursor, [doctor.id])
+        formatted_slots = availability_engine.free_slot_labels(doctor.id, parsed_date)
         
         # ━━━ Handle No Available Slots ━━━
         
-        if not time_slots:
-            logger.warning(f"No available slots found for Dr. {matched_name} on {day_of_week}")
+        if not formatted_slots:
+            logger.warning(f"No available slots found for Dr. {matched_name} on {parsed_date}")
             return JSONResponse({
                 "doctor_name": matched_name,
                 "date": parsed_date.strftime("%Y-%m-%d"),
@@ -199,13 +198,6 @@ async def get_time_slot(request: Request):
 
         # ━━━ Format Time Slots ━━━
         
-        # Convert time slots to 12-hour format for user-friendly display
-        formatted_slots = []
-        for slot in time_slots:
-            time_obj = datetime.strptime(str(slot[0]), "%H:%M:%S")
-            formatted_time = time_obj.strftime("%I:%M %p")
-            formatted_slots.append(formatted_time)
-        
         response_text = ", ".join(formatted_slots)
         logger.info(f"Found {len(formatted_slots)} available slots: {response_text}")
 
@@ -228,7 +220,7 @@ async def get_time_slot(request: Request):
 
 
 @Router.post("/Bland/check-avail")
-async def check_avail(request: Request):
+async def check_avail(request: Request, db=Depends(get_async_db)):
     """
     Check if a doctor is available on a specific date, or suggest alternative dates.
     
@@ -256,6 +248,7 @@ async def check_avail(request: Request):
         "available_dates": [str]      # Alternative available dates
     }
     """
+    _, cursor = db
     try:
         # Parse and validate request body
         data = await request.json()
@@ -288,44 +281,26 @@ async def check_avail(request: Request):
         # ━━━ Doctor Lookup & Validation ━━━
         
         # Find doctor using flexible name matching
-        result = find_doctor_by_name(cursor, doctor_name)
-        if not result:
+        doctor = await find_doctor_by_name(cursor, doctor_name)
+        if not doctor:
             return JSONResponse(
                 {"error": f"Doctor not found matching '{doctor_name}'"}, 
                 status_code=404
             )
-        matched_name, _, _ = result
+        matched_name = doctor.name
         logger.info(f"Checking availability for Dr. {matched_name}")
 
         # ━━━ Check Availability on Requested Date ━━━
         
-        # Get the day of week for the requested date
-        req_day = parsed_date.strftime("%a")  # Abbreviated day format
-        
-        # Query available time slots for the specific date
-        cursor.execute("""
-            SELECT da.time_slot
-            FROM doctors d
-            JOIN doctor_availability da ON d.id = da.doctor_id
-            WHERE LOWER(d.name) = %s 
-            AND da.day_of_week = %s
-            AND da.is_available = true;
-        """, (matched_name.lower(), req_day))
-
-        time_slots = cursor.fetchall()
+        # Open time slots for the specific date (bitmap engine)
+        await availability_engine.ensure_loaded(cursor, [doctor.id])
+        formatted_slots = availability_engine.free_slot_labels(doctor.id, parsed_date)
         
         # ━━━ Handle Available on Requested Date ━━━
         
-        if time_slots:
+        if formatted_slots:
             # Doctor is available on the requested date
-            logger.info(f"Dr. {matched_name} is available on {req_day}")
-            
-            # Format time slots to 12-hour format
-            formatted_slots = []
-            for slot in time_slots:
-                time_obj = datetime.strptime(str(slot[0]), "%H:%M:%S")
-                formatted_time = time_obj.strftime("%I:%M %p")
-                formatted_slots.append(formatted_time)
+            logger.info(f"Dr. {matched_name} is available on {parsed_date}")
 
             response_text = ", ".join(formatted_slots)
             
@@ -339,21 +314,18 @@ async def check_avail(request: Request):
 
         # ━━━ Find Alternative Available Dates ━━━
         
-        logger.info(f"Dr. {matched_name} not available on {req_day}, finding alternatives...")
+        logger.info(f"Dr. {matched_name} not available on {parsed_date}, finding alternatives...")
         
-        # Get all days when doctor is available
-        cursor.execute("""
-            SELECT DISTINCT da.day_of_week
-            FROM doctors d
-            JOIN doctor_availability da ON d.id = da.doctor_id
-            WHERE LOWER(d.name) = %s
-            AND da.is_available = true;
-        """, (matched_name.lower(),))
-
-        available_days = [row[0] for row in cursor.fetchall()]
+        # Next dates (after today, excluding the requested one) with an open slot
+        available_dates = [
+            d.strftime("%Y-%m-%d")
+            for d in availability_engine.next_free_dates(
+                doctor.id, date.today(), ALTERNATIVE_DATES_LIMIT, exclude=parsed_date
+            )
+        ]
         
         # Handle case where doctor has no availability at all
-        if not available_days:
+        if not available_dates:
             return JSONResponse({
                 "doctor_name": matched_name,
                 "requested_date": parsed_date.strftime("%Y-%m-%d"),
@@ -361,20 +333,6 @@ async def check_avail(request: Request):
                 "message": "No available dates found for this doctor"
             }, status_code=200)
 
-        # ━━━ Generate Alternative Dates ━━━
-        
-        # Generate dates for the next 14 days
-        today = datetime.today()
-        available_dates = []
-        
-        for i in range(1, 15):  # Check next 14 days
-            current_date = today + timedelta(days=i)
-            day_name = current_date.strftime("%a")
-            
-            # Include dates that match available days but exclude the requested date
-            if day_name in available_days and current_date.date() != parsed_date:
-                available_dates.append(current_date.strftime("%Y-%m-%d"))
-
         logger.info(f"Found {len(available_dates)} alternative dates")
 
         # ━━━ Prepare Response with Alternatives ━━━
@@ -396,9 +354,9 @@ async def check_avail(request: Request):
 
 
 @Router.post("/Bland/fetch-date")
-async def get_available_booking_dates(request: Request):
+async def get_available_booking_dates(request: Request, db=Depends(get_async_db)):
     """
-    Get all available booking dates for a doctor in the next 7 days.
+    Get the next available booking dates (up to 7) for a doctor.
     
     Request Body:
     {
@@ -412,6 +370,7 @@ async def get_available_booking_dates(request: Request):
         "dates_string": str           # Comma-separated dates string
     }
     """
+    _, cursor = db
     try:
         # Parse and validate request body
         data = await request.json()
@@ -431,82 +390,31 @@ async def get_available_booking_dates(request: Request):
         # ━━━ Doctor Lookup & Validation ━━━
         
         # Find doctor using flexible name matching
-        result = find_doctor_by_name(cursor, raw_dname)
-        if not result:
+        doctor = await find_doctor_by_name(cursor, raw_dname)
+        if not doctor:
             return JSONResponse(
                 {"error": f"No doctor found matching '{raw_dname}'"},
                 status_code=404
             )
-        matched_name, _, _ = result
+        matched_name = doctor.name
         logger.info(f"Fetching available dates for Dr. {matched_name}")
 
         # ━━━ Query Doctor's Availability ━━━
         
-        # Get doctor's available days and time slots
-        cursor.execute("""
-            SELECT DISTINCT da.day_of_week, da.time_slot
-            FROM doctors d
-            JOIN doctor_availability da ON d.id = da.doctor_id
-            WHERE LOWER(d.name) = %s
-            AND da.is_available = true;
-        """, (matched_name.lower(),))
-        
-        availability = cursor.fetchall()
-        logger.debug(f"Raw availability data: {availability}")
+        # Next dates (after today) with at least one open slot (bitmap engine)
+        await availability_engine.ensure_loaded(cursor, [doctor.id])
+        available_dates = [
+            d.strftime("%Y-%m-%d")
+            for d in availability_engine.next_free_dates(doctor.id, date.today(), BOOKING_DATES_LIMIT)
+        ]
         
         # Handle case where no availability found
-        if not availability:
+        if not available_dates:
             return JSONResponse(
                 {"error": f"No available slots found for Dr. {matched_name}"},
                 status_code=404
             )
 
-        # ━━━ Process Availability Data ━━━
-        
-        # Get unique available days
-        available_days = list(set(day for day, _ in availability))
-        
-        # Format availability information for debugging
-        formatted_availability = []
-        for day, time_slot in availability:
-            # Convert time to 12-hour format for readability
-            time_obj = datetime.strptime(str(time_slot), "%H:%M:%S")
-            formatted_time = time_obj.strftime("%I:%M %p")
-            formatted_availability.append({
-                "day": day,
-                "time": formatted_time
-            })
-
-        logger.debug(f"Available days: {available_days}")
-
-        # ━━━ Generate Available Dates ━━━
-        
-        # Generate dates for the next 7 days
-        today = datetime.today()
-        available_dates = []
-        
-        # Map of abbreviated days to full day names for matching
-        day_map = {
-            'Mon': 'Monday',
-            'Tue': 'Tuesday',
-            'Wed': 'Wednesday',
-            'Thu': 'Thursday',
-            'Fri': 'Friday',
-            'Sat': 'Saturday',
-            'Sun': 'Sunday'
-        }
-        
-        # Check each of the next 7 days
-        for i in range(1, 8):  # Next 7 days (excluding today)
-            current_date = today + timedelta(days=i)
-            day_name = current_date.strftime("%A")  # Full day name
-            logger.debug(f"Checking {day_name} ({current_date.strftime('%Y-%m-%d')})")
-            
-            # Check if any abbreviated day in available_days maps to this full day
-            if any(day_map.get(abbr_day, '') == day_name for abbr_day in available_days):
-                available_dates.append(current_date.strftime("%Y-%m-%d"))
-                logger.debug(f"Date {current_date.strftime('%Y-%m-%d')} is available")
-
         logger.info(f"Final available dates: {available_dates}")
         
         # ━━━ Format Response ━━━
@@ -527,3 +435,111 @@ async def get_available_booking_dates(request: Request):
             status_code=500
         )
 
+
+
+@Router.post("/Bland/earliest-available")
+async def get_earliest_available(request: Request, db=Depends(get_async_db)):
+    """
+    Find the earliest open slots across every doctor in a department.
+    
+    Replaces calling get-doctors and then probing each doctor with
+    check-avail / time-slot: all doctors of the department are loaded into
+    the availability engine in one query and their slot streams are merged
+    with a heap, so only the first `count` slots are ever materialized.
+    
+    Request Body:
+    {
+        "department": str,   # Department name (flexible matching)
+        "count": int,        # Optional, number of slots (default 3, max 20)
+        "date": str          # Optional, earliest date to consider (default now)
+    }
+    
+    Response:
+    {
+        "department": str,            # Matched department
+        "slots": [                    # Earliest slots, soonest first
+            {"doctor_name": str, "date": str, "time": str}
+        ],
+        "slots_string": str           # Human-readable summary
+    }
+    """
+    _, cursor = db
+    try:
+        # Parse and validate request body
+        data = await request.json()
+        logger.info(f"Earliest available request: {data}")
+        
+        raw_department = data["department"].strip().lower()
+        count = max(1, min(int(data.get("count") or EARLIEST_SLOTS_DEFAULT), EARLIEST_SLOTS_MAX))
+
+        # Start from now, or from the start of the requested date if later
+        not_before = datetime.now()
+        if data.get("date"):
+            parsed_date = parse_date(data["date"])
+            if not parsed_date:
+                return JSONResponse(
+                    {
+                        "error": "Invalid date format. Please use a valid date format (e.g., YYYY-MM-DD, DD/MM/YYYY, Month DD YYYY)"
+                    },
+                    status_code=400
+                )
+            not_before = max(not_before, datetime.combine(parsed_date, datetime.min.time()))
+
+        # ━━━ Department Matching ━━━
+        
+        directory = await doctor_directory.get(cursor)
+        corrected_department = await find_department(cursor, raw_department) or raw_department
+        department_doctors = directory.by_department.get(corrected_department, [])
+
+        if not department_doctors:
+            logger.warning(f"No doctors found in department '{corrected_department}'")
+            return JSONResponse({
+                "error": f"No doctors found in department '{corrected_department}'",
+                "available_departments": directory.departments
+            }, status_code=404)
+
+        # ━━━ Earliest Slots Across Doctors ━━━
+        
+        doctor_ids = [doctor.id for doctor in department_doctors]
+        await availability_engine.ensure_loaded(cursor, doctor_ids)
+        earliest = availability_engine.earliest_free_across(doctor_ids, not_before, count)
+
+        if not earliest:
+            return JSONResponse(
+                {"error": f"No available slots found in {corrected_department}"},
+                status_code=404
+            )
+
+        # ━━━ Format Response ━━━
+        
+        slots = [
+            {
+                "doctor_name": directory.by_id[doctor_id].name,
+                "date": slot_dt.strftime("%Y-%m-%d"),
+                "time": slot_dt.strftime("%I:%M %p"),
+            }
+            for slot_dt, doctor_id in earliest
+        ]
+        response_text = ", ".join(
+            f"Dr. {slot['doctor_name']} on {slot['date']} at {slot['time']}" for slot in slots
+        )
+        logger.info(f"Earliest slots in {corrected_department}: {response_text}")
+
+        return JSONResponse({
+            "department": corrected_department,
+            "slots": slots,
+            "slots_string": response_text
+        }, status_code=200)
+
+    except KeyError as ke:
+        logger.error(f"Missing required field: {ke}")
+        return JSONResponse(
+            {"error": f"Missing required field: {ke}"}, 
+            status_code=422
+        )
+    except Exception as e:
+        logger.error(f"Error in earliest-available endpoint: {str(e)}")
+        return JSONResponse(
+            {"error": "Failed to find earliest available slots", "details": str(e)},
+            status_code=500
+        )
@@ -11,12 +11,12 @@ Each endpoint integrates with:
 - Comprehensive error handling
 """
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
 from api.Utils.helper import parse_date
 import json
 import logging
-from database import conn, cursor
+from database import get_async_db
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
@@ -26,7 +26,7 @@ Router = APIRouter()
 
 
 @Router.post("/Bland/validate-users")
-async def validate_users(request: Request):
+async def validate_users(request: Request, db=Depends(get_async_db)):
     """
     Validate if a patient exists in the system using phone number and date of birth.
     
@@ -53,6 +53,7 @@ async def validate_users(request: Request):
         "error": str    # Error description
     }
     """
+    _, cursor = db
     try:
         # Parse and validate request body
         data = json.loads(await request.body())
@@ -88,11 +89,11 @@ async def validate_users(request: Request):
         # ━━━ Database Query for Patient Lookup ━━━
         
         # Check if patient exists with matching phone and date of birth
-        cursor.execute(
+        await cursor.execute(
             "SELECT id, full_name, dob, phone_number FROM patients WHERE phone_number=%s AND dob=%s;",
             (phone, dob)
         )
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
 
         # ━━━ Process Query Results ━━━
         
@@ -102,8 +103,8 @@ async def validate_users(request: Request):
             logger.info(f"Patient found: ID={pid}, Name={name}")
             
             # Check if patient has any existing appointments (for potential future use)
-            cursor.execute("SELECT 1 FROM appointments WHERE patient_id=%s LIMIT 1;", (pid,))
-            has_appt = bool(cursor.fetchone())
+            await cursor.execute("SELECT 1 FROM appointments WHERE patient_id=%s LIMIT 1;", (pid,))
+            has_appt = bool(await cursor.fetchone())
             logger.debug(f"Patient has existing appointments: {has_appt}")
 
             # ━━━ Prepare Success Response ━━━
@@ -136,7 +137,7 @@ async def validate_users(request: Request):
 
 
 @Router.post("/Bland/create-user")
-async def create_user(request: Request):
+async def create_user(request: Request, db=Depends(get_async_db)):
     """
     Create a new patient record in the system.
     
@@ -160,6 +161,7 @@ async def create_user(request: Request):
         "details": str       # Detailed error information
     }
     """
+    conn, cursor = db
     try:
         # Parse and validate request body
         data = json.loads(await request.body())
@@ -209,11 +211,11 @@ async def create_user(request: Request):
         # ━━━ Database Operations ━━━
         
         # Check if patient already exists (optional safety check)
-        cursor.execute(
+        await cursor.execute(
             "SELECT id FROM patients WHERE phone_number=%s AND dob=%s LIMIT 1;",
             (phone, dob)
         )
-        existing_patient = cursor.fetchone()
+        existing_patient = await cursor.fetchone()
         
         if existing_patient:
             logger.info(f"Patient already exists with ID: {existing_patient[0]}")
@@ -226,7 +228,7 @@ async def create_user(request: Request):
             )
 
         # Insert new patient record with default values
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO patients (full_name, dob, phone_number, doctor_id, status) 
             VALUES (%s, %s, %s, %s, %s) 
@@ -236,10 +238,10 @@ async def create_user(request: Request):
         )
         
         # Get the newly created patient ID
-        new_id = cursor.fetchone()[0]
+        new_id = (await cursor.fetchone())[0]
         
         # Commit the transaction to database
-        conn.commit()
+        await conn.commit()
         logger.info(f"New patient created successfully with ID: {new_id}")
 
         # ━━━ Prepare Success Response ━━━
@@ -252,7 +254,7 @@ async def create_user(request: Request):
     except KeyError as ke:
         # Handle missing required fields
         if conn:
-            conn.rollback()
+            await conn.rollback()
         logger.error(f"Missing required field: {ke}")
         return JSONResponse(
             {"error": f"Missing required field: {ke}"}, 
@@ -261,7 +263,7 @@ async def create_user(request: Request):
     except Exception as e:
         # Handle unexpected errors with database rollback
         if conn:
-            conn.rollback()
+            await conn.rollback()
         logger.error(f"Unexpected error during patient creation: {e}")
         return JSONResponse(
             {"error": "Server error", "details": str(e)}, 
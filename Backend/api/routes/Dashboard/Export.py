@@ -0,0 +1,147 @@
+from datetime import date, timedelta
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, StreamingResponse
+from api.Utils.export import EXPORT_FORMATS, stream_query
+
+
+Router = APIRouter()
+
+APPOINTMENT_COLUMNS = [
+    'appointment_id', 'appointment_time', 'status', 'duration',
+    'patient_id', 'patient_name', 'phone_number',
+    'doctor_id', 'doctor_name', 'department', 'calendar_event_id',
+]
+
+PATIENT_COLUMNS = [
+    'id', 'full_name', 'dob', 'phone_number', 'status',
+    'doctor_id', 'doctor_name', 'department',
+]
+
+
+def _export_response(name: str, query: str, params: list, columns: list, format: str,
+                     date_from: date = None, date_to: date = None):
+    span = '-'.join(d.isoformat() for d in (date_from, date_to) if d)
+    filename = f"{name}{'-' + span if span else ''}.{format}"
+    return StreamingResponse(
+        stream_query(query, params, columns, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+def _bad_format(format: str):
+    if format not in EXPORT_FORMATS:
+        return JSONResponse(
+            content={"error": f"Unsupported format '{format}'", "details": f"Use one of {sorted(EXPORT_FORMATS)}"},
+            status_code=400
+        )
+    return None
+
+
+@Router.get('/export/appointments')
+def export_appointments(
+    format: str = 'csv',
+    date_from: date = None,
+    date_to: date = None,
+    doctor_id: int = None,
+    status: str = None,
+):
+    """
+    Stream appointments as CSV or NDJSON, ordered by appointment_time.
+
+    Filters: date_from / date_to (inclusive, on appointment_time), doctor_id,
+    status.
+    """
+    error = _bad_format(format)
+    if error:
+        return error
+
+    conditions, params = [], []
+    if date_from:
+        conditions.append("a.appointment_time >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("a.appointment_time < %s")
+        params.append(date_to + timedelta(days=1))
+    if doctor_id:
+        conditions.append("a.doctor_id = %s")
+        params.append(doctor_id)
+    if status:
+        conditions.append("a.status = %s")
+        params.append(status)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = f"""
+        SELECT
+            a.id,
+            a.appointment_time,
+            a.status,
+            a.duration,
+            a.patient_id,
+            p.full_name,
+            p.phone_number,
+            a.doctor_id,
+            d.name,
+            d.department,
+            a.calendar_event_id
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN doctors d ON a.doctor_id = d.id
+        {where}
+        ORDER BY a.appointment_time, a.id;
+    """
+    return _export_response('appointments', query, params, APPOINTMENT_COLUMNS, format, date_from, date_to)
+
+
+@Router.get('/export/patients')
+def export_patients(
+    format: str = 'csv',
+    date_from: date = None,
+    date_to: date = None,
+    doctor_id: int = None,
+    status: str = None,
+):
+    """
+    Stream patients as CSV or NDJSON, ordered by id.
+
+    date_from / date_to (inclusive) keep the patients with an appointment in
+    that range; doctor_id and status filter on the patient row.
+    """
+    error = _bad_format(format)
+    if error:
+        return error
+
+    conditions, params = [], []
+    if date_from or date_to:
+        range_conditions = ["a.patient_id = p.id"]
+        if date_from:
+            range_conditions.append("a.appointment_time >= %s")
+            params.append(date_from)
+        if date_to:
+            range_conditions.append("a.appointment_time < %s")
+            params.append(date_to + timedelta(days=1))
+        conditions.append(f"EXISTS (SELECT 1 FROM appointments a WHERE {' AND '.join(range_conditions)})")
+    if doctor_id:
+        conditions.append("p.doctor_id = %s")
+        params.append(doctor_id)
+    if status:
+        conditions.append("p.status = %s")
+        params.append(status)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = f"""
+        SELECT
+            p.id,
+            p.full_name,
+            p.dob,
+            p.phone_number,
+            p.status,
+            p.doctor_id,
+            d.name,
+            d.department
+        FROM patients p
+        LEFT JOIN doctors d ON p.doctor_id = d.id
+        {where}
+        ORDER BY p.id;
+    """
+    return _export_response('patients', query, params, PATIENT_COLUMNS, format, date_from, date_to)
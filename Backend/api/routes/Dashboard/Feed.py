@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from api.Utils.change_feed import sse_events
+
+
+Router = APIRouter()
+
+
+@Router.get('/appointments/events')
+async def appointment_events(request: Request, doctor_id: int = None):
+    """
+    Live appointment changes as Server-Sent Events.
+
+    Event types: created, rescheduled, cancelled, updated, deleted, each with
+    the JSON change as data, and resync (refetch /appointments). The data has
+    the fields of an /appointments row, so clients apply it in place. A
+    cancelled appointment is deleted, so its `cancelled` event carries the
+    last row; `deleted` is any other removal. Pass doctor_id to receive only
+    that doctor's appointments.
+    """
+    return StreamingResponse(
+        sse_events(request, doctor_id),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Keep reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no',
+        },
+    )
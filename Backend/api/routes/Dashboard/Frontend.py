@@ -1,19 +1,30 @@
-from datetime import datetime
-from fastapi import APIRouter
+import logging
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
-from database import conn,cursor
+from database import get_db
+from api.Utils.availability import availability_engine, SLOT_LABELS_24H
+from api.Utils.dashboard_stats import dashboard_stats
+from api.Utils.pagination import InvalidCursor, decode_cursor, encode_cursor, estimate_count, page_size
+from api.Utils.response_cache import cached
 
 
+logger = logging.getLogger(__name__)
+
 Router=APIRouter()
 
 @Router.get('/categories')
-def get_categories():
+@cached('categories', tags=('doctors',))
+def get_categories(db=Depends(get_db)):
+    _, cursor = db
     cursor.execute("SELECT DISTINCT department FROM doctors;")
     cats = [row[0] for row in cursor.fetchall()]
     return {'categories': cats}
 
 @Router.get('/doctors')
-async def get_doctors():
+@cached('doctors', tags=('doctors',))
+def get_doctors(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
@@ -39,7 +50,9 @@ async def get_doctors():
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @Router.get('/doctors/{doctor_id}/availability')
-async def get_doctor_availability(doctor_id: int):
+@cached('doctor_availability', tags=lambda doctor_id: (f'availability:doctor:{doctor_id}',))
+def get_doctor_availability(doctor_id: int, db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
@@ -72,53 +85,110 @@ async def get_doctor_availability(doctor_id: int):
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @Router.get('/patients/count')
-async def get_patients_count():
+@cached('patients_count', tags=('patients',))
+def get_patients_count(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("SELECT COUNT(*) FROM patients;")
         count = cursor.fetchone()[0]
-        return JSONResponse(content={"patients_count": count})
+        return {"patients_count": count}
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @Router.get('/appointments')
-async def get_appointments(doctor_id: int = None):
+# `patient_names` rather than `patients`: bookings touch the patient row but only a rename shows here
+@cached('appointments', tags=lambda doctor_id=None, **_: (
+    'doctors', 'patient_names', f'appointments:doctor:{doctor_id}' if doctor_id else 'appointments',
+))
+def get_appointments(
+    doctor_id: int = None,
+    department: str = None,
+    status: str = None,
+    date_from: date = None,
+    date_to: date = None,
+    order: str = None,
+    limit: int = None,
+    after: str = Query(None, alias='cursor'),
+    db=Depends(get_db),
+):
+    """
+    One page of appointments, keyset-paginated on (appointment_time, id).
+
+    Filters: doctor_id, department, status, date_from / date_to (inclusive).
+    Order defaults to ascending for one doctor and descending otherwise, as
+    before. Pass `next_cursor` back as `cursor` for the next page.
+    """
+    _, cursor = db
     try:
+        size = page_size(limit)
+        descending = (order or ('asc' if doctor_id else 'desc')).lower() == 'desc'
+
+        conditions, params = [], []
         if doctor_id:
-            cursor.execute("""
-                SELECT
-                    a.id,
-                    a.appointment_time,
-                    a.patient_id,
-                    p.full_name,
-                    d.name,
-                    d.department,
-                    a.status,
-                    a.duration,
-                    a.calendar_event_id
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.id
+            conditions.append("a.doctor_id = %s")
+            params.append(doctor_id)
+        if department:
+            conditions.append("LOWER(d.department) = LOWER(%s)")
+            params.append(department)
+        if status:
+            conditions.append("a.status = %s")
+            params.append(status)
+        if date_from:
+            conditions.append("a.appointment_time >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("a.appointment_time < %s")
+            params.append(date_to + timedelta(days=1))
+        filters, filter_params = list(conditions), list(params)
+
+        if after:
+            last_time, last_id = decode_cursor(after, datetime, int)
+            conditions.append(f"(a.appointment_time, a.id) {'<' if descending else '>'} (%s, %s)")
+            params.extend([last_time, last_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        cursor.execute(f"""
+            SELECT
+                a.id,
+                a.appointment_time,
+                a.patient_id,
+                p.full_name,
+                d.name,
+                d.department,
+                a.status,
+                a.duration,
+                a.calendar_event_id
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.id
+            JOIN doctors d ON a.doctor_id = d.id
+            {where}
+            ORDER BY a.appointment_time {direction}, a.id {direction}
+            LIMIT %s;
+        """, params + [size + 1])
+        rows = cursor.fetchall()
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        # Exact from the per-day rollup unless the filter needs the doctors join
+        if doctor_id or department:
+            total_is_estimate = True
+            filter_where = f"WHERE {' AND '.join(filters)}" if filters else ""
+            total = estimate_count(cursor, f"""
+                SELECT 1 FROM appointments a
                 JOIN doctors d ON a.doctor_id = d.id
-                WHERE a.doctor_id = %s
-                ORDER BY a.appointment_time;
-            """, (doctor_id,))
+                {filter_where}
+            """, filter_params)
         else:
+            total_is_estimate = False
             cursor.execute("""
-                SELECT
-                    a.id,
-                    a.appointment_time,
-                    a.patient_id,
-                    p.full_name,
-                    d.name,
-                    d.department,
-                    a.status,
-                    a.duration,
-                    a.calendar_event_id
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.id
-                JOIN doctors d ON a.doctor_id = d.id
-                ORDER BY a.appointment_time DESC;
-            """)
-        rows = cursor.fetchall()
+                SELECT COALESCE(sum(count), 0) FROM appointment_day_counts
+                WHERE (%(status)s::text IS NULL OR status = %(status)s)
+                  AND (%(date_from)s::date IS NULL OR day >= %(date_from)s)
+                  AND (%(date_to)s::date IS NULL OR day <= %(date_to)s);
+            """, {'status': status, 'date_from': date_from, 'date_to': date_to})
+            total = cursor.fetchone()[0]
+
         return {
             'appointments': [
                 {
@@ -132,15 +202,56 @@ async def get_appointments(doctor_id: int = None):
                     'duration': r[7],
                     'calendar_event_id': r[8]
                 } for r in rows
-            ]
+            ],
+            'next_cursor': encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None,
+            'limit': size,
+            'total': total,
+            'total_is_estimate': total_is_estimate,
         }
+    except InvalidCursor as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @Router.get('/patients')
-async def get_patients():
+@cached('patients', tags=('patients', 'doctors'))
+def get_patients(
+    doctor_id: int = None,
+    department: str = None,
+    status: str = None,
+    limit: int = None,
+    after: str = Query(None, alias='cursor'),
+    db=Depends(get_db),
+):
+    """
+    One page of patients, keyset-paginated on id.
+
+    Filters: doctor_id, department (of the assigned doctor), status. Pass
+    `next_cursor` back as `cursor` for the next page.
+    """
+    _, cursor = db
     try:
-        cursor.execute("""
+        size = page_size(limit)
+
+        conditions, params = [], []
+        if doctor_id:
+            conditions.append("p.doctor_id = %s")
+            params.append(doctor_id)
+        if department:
+            conditions.append("LOWER(d.department) = LOWER(%s)")
+            params.append(department)
+        if status:
+            conditions.append("p.status = %s")
+            params.append(status)
+        filters, filter_params = list(conditions), list(params)
+
+        if after:
+            (last_id,) = decode_cursor(after, int)
+            conditions.append("p.id > %s")
+            params.append(last_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"""
             SELECT 
                 p.id, 
                 p.full_name, 
@@ -152,9 +263,26 @@ async def get_patients():
                 d.department
             FROM patients p
             LEFT JOIN doctors d ON p.doctor_id = d.id
-            ORDER BY p.id;
-        """)
+            {where}
+            ORDER BY p.id
+            LIMIT %s;
+        """, params + [size + 1])
         rows = cursor.fetchall()
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        if filters:
+            total_is_estimate = True
+            total = estimate_count(cursor, f"""
+                SELECT 1 FROM patients p
+                LEFT JOIN doctors d ON p.doctor_id = d.id
+                WHERE {' AND '.join(filters)}
+            """, filter_params)
+        else:
+            total_is_estimate = False
+            cursor.execute("SELECT value FROM dashboard_counters WHERE name = 'patients';")
+            total = cursor.fetchone()[0]
+
         return {
             'patients': [
                 {
@@ -167,90 +295,40 @@ async def get_patients():
                     'doctor_name': row[6],
                     'department': row[7] if row[7] else 'Not assigned'
                 } for row in rows
-            ]
+            ],
+            'next_cursor': encode_cursor(rows[-1][0]) if has_more else None,
+            'limit': size,
+            'total': total,
+            'total_is_estimate': total_is_estimate,
         }
+    except InvalidCursor as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @Router.get('/dashboard/stats')
-async def get_dashboard_stats():
+def get_dashboard_stats():
+    # One read of the trigger-maintained rollups, cached briefly (api/Utils/dashboard_stats.py);
+    # not in the response cache, which would hold an already cached value for longer
     try:
-        # Get total patients count
-        cursor.execute("SELECT COUNT(*) FROM patients")
-        total_patients = cursor.fetchone()[0]
-        
-        # Get total doctors count
-        cursor.execute("SELECT COUNT(*) FROM doctors")
-        total_doctors = cursor.fetchone()[0]
-        
-        # Get total appointments count
-        cursor.execute("SELECT COUNT(*) FROM appointments")
-        total_appointments = cursor.fetchone()[0]
-        
-        # Get today's appointments count
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments 
-            WHERE DATE(appointment_time) = CURRENT_DATE
-        """)
-        todays_appointments = cursor.fetchone()[0]
-        #Get upcoming appointments code
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments 
-            WHERE appointment_time >= CURRENT_TIMESTAMP AND status = 'scheduled'
-        """)
-        upcoming_appointments = cursor.fetchone()[0]
-
-
-        # Get recent appointments
-        cursor.execute("""
-            SELECT 
-                a.id,
-                p.full_name as patient_name,
-                d.name as doctor_name,
-                a.appointment_time
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.id
-            JOIN doctors d ON a.doctor_id = d.id
-            WHERE a.appointment_time >= CURRENT_DATE
-            ORDER BY a.appointment_time ASC
-            LIMIT 5
-        """)
-        
-# Include in return
-        recent_appointments = [
-            {
-                'id': row[0],
-                'patient_name': row[1],
-                'doctor_name': row[2],
-                'appointment_time': row[3].strftime('%Y-%m-%d %H:%M')
-            }
-            for row in cursor.fetchall()
-        ]
-
-        return {
-            'stats': {
-                'total_patients': total_patients,
-                'total_doctors': total_doctors-1,
-                'total_appointments': total_appointments,
-                'todays_appointments': todays_appointments,
-                'recent_appointments': recent_appointments,
-                'upcoming_appointments': upcoming_appointments
-            }
-        }
+        return dashboard_stats.get()
     except Exception as e:
-        print("Error fetching dashboard stats:", str(e))
+        logger.error(f"Error fetching dashboard stats: {e}")
         return JSONResponse(
             content={"error": f"Failed to fetch dashboard statistics: {str(e)}"},
             status_code=500
         )
 
 @Router.get('/dashboard/appointments-by-department')
-async def get_appointments_by_department():
+@cached('appointments_by_department', tags=('appointments', 'doctors'))
+def get_appointments_by_department(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
                 d.department,
-                COUNT(*) as appointment_count
+                COUNT(*) as appointment_count,
+                COUNT(DISTINCT a.doctor_id) as doctor_count
             FROM appointments a
             JOIN doctors d ON a.doctor_id = d.id
             GROUP BY d.department
@@ -263,7 +341,8 @@ async def get_appointments_by_department():
             'data': [
                 {
                     'department': row[0],
-                    'count': row[1]
+                    'count': row[1],
+                    'doctors': row[2]
                 }
                 for row in results
             ]
@@ -275,7 +354,9 @@ async def get_appointments_by_department():
         )
 
 @Router.get('/dashboard/patient-growth')
-async def get_patient_growth():
+@cached('patient_growth', tags=('patients',))
+def get_patient_growth(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
@@ -305,7 +386,9 @@ async def get_patient_growth():
         )
 
 @Router.get('/dashboard/weekly-distribution')
-async def get_weekly_distribution():
+@cached('weekly_distribution', tags=('appointments',))
+def get_weekly_distribution(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
@@ -336,7 +419,9 @@ async def get_weekly_distribution():
         )
 
 @Router.get('/dashboard/doctor-workload')
-async def get_doctor_workload():
+@cached('doctor_workload', tags=('appointments', 'doctors'))
+def get_doctor_workload(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
@@ -367,7 +452,9 @@ async def get_doctor_workload():
         )
 
 @Router.get('/dashboard/age-distribution')
-async def get_age_distribution():
+@cached('age_distribution', tags=('patients',))
+def get_age_distribution(db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute("""
             SELECT 
@@ -406,20 +493,15 @@ async def get_age_distribution():
         )
 
 @Router.get("/slots")
-async def get_doctor_slots(doctor_id: int, date: str):
+def get_doctor_slots(doctor_id: int, date: str, db=Depends(get_db)):
+    _, cursor = db
     try:
-        # Parse date and get abbreviated weekday (e.g., 'Mon')
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
-        day_of_week = date_obj.strftime('%a')  # Matches 'Mon', 'Tue', etc.
+        # Parse date
+        date_obj = datetime.strptime(date, "%Y-%m-%d").date()
 
-        # Fetch available slots for the doctor on that day
-        cursor.execute("""
-            SELECT time_slot FROM doctor_availability
-            WHERE doctor_id = %s AND day_of_week = %s AND is_available = TRUE
-            ORDER BY time_slot;
-        """, (doctor_id, day_of_week))
-        available = cursor.fetchall()
-        available_slots = [t[0].strftime("%H:%M") for t in available]
+        # Open slots for the doctor on that date (bitmap engine)
+        availability_engine.ensure_loaded_sync(cursor, [doctor_id])
+        available_slots = availability_engine.free_slot_labels(doctor_id, date_obj, SLOT_LABELS_24H)
 
         if not available_slots:
             return JSONResponse({
@@ -1,7 +1,7 @@
-from fastapi import  APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from database import conn,cursor
+from database import get_db
 
 router = APIRouter()
 
@@ -12,7 +12,8 @@ class LoginData(BaseModel):
 
 # Admin login endpoint
 @router.post('/admin/login')
-async def admin_login(login_data: LoginData):
+def admin_login(login_data: LoginData, db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute(
             "SELECT id, name, email FROM admin WHERE email = %s AND password = %s",
@@ -34,7 +35,8 @@ async def admin_login(login_data: LoginData):
 
 # Doctor login endpoint
 @router.post('/doctor/login')
-async def doctor_login(login_data: LoginData):
+def doctor_login(login_data: LoginData, db=Depends(get_db)):
+    _, cursor = db
     try:
         cursor.execute(
             "SELECT id, name, department, email FROM doctors WHERE email = %s AND password = %s",
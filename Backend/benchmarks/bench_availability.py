@@ -0,0 +1,214 @@
+"""
+Benchmark: bitmap availability engine vs row-based slot queries
+
+Builds synthetic open-slot rows (doctor, date, time) like those returned by
+`doctor_slots` and answers the three availability questions both ways:
+
+- slots on a date:      filter rows + strptime/strftime  vs  bitmap labels
+- next 7 open dates:    sorted distinct dates from rows  vs  bitmap walk
+- first free slot for a department of 10 doctors
+- 3 earliest slots for a department of 10 doctors (heap merge)
+
+The row-based path is measured in memory first, so those numbers show the
+per-request Python cost only. With `--sql` the old per-request query is
+also timed against the configured database for its real doctors.
+
+Run from the Backend directory:
+
+    python -m benchmarks.bench_availability [--sql]
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from api.Utils.availability import SLOT_TIMES, AvailabilityEngine
+
+DOCTORS = [10, 100, 1_000]
+DAYS = 56
+QUERIES = 500
+DEPARTMENT_SIZE = 10
+
+
+def make_rows(rng: random.Random, doctors: int) -> list:
+    today = date.today()
+    rows = []
+    for doctor_id in range(1, doctors + 1):
+        hours = rng.sample(SLOT_TIMES[16:36], 12)     # 08:00 - 17:30
+        weekdays = set(rng.sample(range(7), 4))
+        for offset in range(DAYS):
+            day = today + timedelta(days=offset)
+            if day.weekday() in weekdays:
+                for slot_time in hours:
+                    if rng.random() > 0.3:           # ~30% already booked
+                        rows.append((doctor_id, day, slot_time))
+    return rows
+
+
+def rows_slots_on(rows, doctor_id, day):
+    found = sorted(r[2] for r in rows if r[0] == doctor_id and r[1] == day)
+    return [
+        datetime.strptime(str(t), "%H:%M:%S").strftime("%I:%M %p") for t in found
+    ]
+
+
+def rows_next_dates(rows, doctor_id, after, n):
+    return sorted({r[1] for r in rows if r[0] == doctor_id and r[1] > after})[:n]
+
+
+def rows_first_free(rows, doctor_ids, not_before):
+    wanted = set(doctor_ids)
+    candidates = [
+        (datetime.combine(r[1], r[2]), r[0])
+        for r in rows
+        if r[0] in wanted and datetime.combine(r[1], r[2]) >= not_before
+    ]
+    return min(candidates, default=None)
+
+
+def rows_earliest(rows, doctor_ids, not_before, k):
+    wanted = set(doctor_ids)
+    candidates = [
+        (datetime.combine(r[1], r[2]), r[0])
+        for r in rows
+        if r[0] in wanted and datetime.combine(r[1], r[2]) >= not_before
+    ]
+    return sorted(candidates)[:k]
+
+
+def timed(func, calls) -> float:
+    started = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return (time.perf_counter() - started) / len(calls) * 1000
+
+
+def run(doctors: int, rng: random.Random):
+    rows = make_rows(rng, doctors)
+    # The row-based path only ever sees one doctor's rows (that is what the
+    # SQL query returned), so index rows per doctor to keep the comparison fair
+    by_doctor = {}
+    for row in rows:
+        by_doctor.setdefault(row[0], []).append(row)
+
+    engine = AvailabilityEngine()
+    started = time.perf_counter()
+    engine._load(list(range(1, doctors + 1)), rows)
+    build = (time.perf_counter() - started) * 1000
+
+    today = date.today()
+    now = datetime.now()
+    day_calls = [
+        (rng.randint(1, doctors), today + timedelta(days=rng.randrange(DAYS)))
+        for _ in range(QUERIES)
+    ]
+    dept_calls = [
+        (rng.sample(range(1, doctors + 1), min(DEPARTMENT_SIZE, doctors)),)
+        for _ in range(QUERIES)
+    ]
+
+    results = [
+        (
+            "slots on date",
+            timed(lambda d, day: rows_slots_on(by_doctor.get(d, []), d, day), day_calls),
+            timed(lambda d, day: engine.free_slot_labels(d, day), day_calls),
+        ),
+        (
+            "next 7 dates",
+            timed(lambda d, _: rows_next_dates(by_doctor.get(d, []), d, today, 7), day_calls),
+            timed(lambda d, _: engine.next_free_dates(d, today, 7), day_calls),
+        ),
+        (
+            "dept first free",
+            timed(
+                lambda ids: rows_first_free(
+                    [r for d in ids for r in by_doctor.get(d, [])], ids, now
+                ),
+                dept_calls,
+            ),
+            timed(lambda ids: engine.first_free_across(ids, now), dept_calls),
+        ),
+        (
+            "dept earliest 3",
+            timed(
+                lambda ids: rows_earliest(
+                    [r for d in ids for r in by_doctor.get(d, [])], ids, now, 3
+                ),
+                dept_calls,
+            ),
+            timed(lambda ids: engine.earliest_free_across(ids, now, 3), dept_calls),
+        ),
+    ]
+
+    print(f"{doctors:>5} doctors, {len(rows):>7} open slots, bitmap build {build:7.1f} ms")
+    for name, row_ms, bitmap_ms in results:
+        print(
+            f"    {name:<16} rows {row_ms:8.4f} ms | bitmap {bitmap_ms:8.4f} ms | "
+            f"speedup {row_ms / bitmap_ms:6.1f}x"
+        )
+
+
+SQL_SLOTS_ON_DATE = """
+    SELECT ds.slot_time
+    FROM doctor_slots ds
+    WHERE ds.doctor_id = %s
+    AND ds.slot_date = %s
+    AND ds.is_available = true
+    ORDER BY ds.slot_time;
+"""
+
+
+def run_sql(rng: random.Random):
+    """Old query + formatting loop vs the engine, against the live database."""
+    from database import get_connection
+
+    with get_connection() as (_, cursor):
+        cursor.execute("SELECT id FROM doctors;")
+        doctor_ids = [row[0] for row in cursor.fetchall()]
+        if not doctor_ids:
+            print("sql: no doctors in the database, skipped")
+            return
+
+        today = date.today()
+        calls = [
+            (rng.choice(doctor_ids), today + timedelta(days=rng.randrange(DAYS)))
+            for _ in range(QUERIES)
+        ]
+
+        def query(doctor_id, day):
+            cursor.execute(SQL_SLOTS_ON_DATE, (doctor_id, day))
+            return [
+                datetime.strptime(str(row[0]), "%H:%M:%S").strftime("%I:%M %p")
+                for row in cursor.fetchall()
+            ]
+
+        engine = AvailabilityEngine()
+        started = time.perf_counter()
+        engine.ensure_loaded_sync(cursor, doctor_ids)
+        build = (time.perf_counter() - started) * 1000
+
+        sql_ms = timed(query, calls)
+        bitmap_ms = timed(lambda d, day: engine.free_slot_labels(d, day), calls)
+
+    print(f"  sql: {len(doctor_ids)} doctors, engine load {build:7.1f} ms")
+    print(
+        f"    {'slots on date':<16} sql  {sql_ms:8.4f} ms | bitmap {bitmap_ms:8.4f} ms | "
+        f"speedup {sql_ms / bitmap_ms:6.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sql", action="store_true", help="also time the live database query")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for doctors in DOCTORS:
+        run(doctors, rng)
+    if args.sql:
+        run_sql(rng)
+
+
+if __name__ == "__main__":
+    main()
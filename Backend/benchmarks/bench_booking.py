@@ -0,0 +1,178 @@
+"""
+Benchmark: multi-statement booking vs book_appointment_tx()
+
+Books (and then reschedules) one appointment per throwaway patient twice:
+
+- statements: the pre-0012 /Bland/book-appointment transaction, one round
+  trip per statement (lock existing, release, reserve, insert/update,
+  patient update, link slot, patient name, event id, outbox inserts)
+- function:   one call to book_appointment_tx() plus the commit
+
+and prints p50 / p99 latency per booking, commit included. The gap grows
+with the network latency to the database, so run it against a database as
+far away as production's.
+
+Needs a migrated database (DB_* environment variables as for the API).
+All rows created by the run are deleted at the end. Run from the Backend
+directory:
+
+    python -m benchmarks.bench_booking [--bookings 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from psycopg_pool import AsyncConnectionPool
+
+from api.Utils import outbox
+from api.Utils.reservations import (
+    attach_appointment,
+    book_appointment_tx,
+    release_slot,
+    reserve_slot,
+)
+from api.Utils.side_effects import CALENDAR_EVENT_ID_PREFIX, calendar_event_id_for
+from benchmarks.stress_booking import cleanup, setup
+from database import DB_CONNINFO
+
+PHONE = "+10000000000"
+SMS_BODY = "Your appointment has been booked. -Medical Clinic"
+
+
+async def book_statements(conn, doctor_id, doctor_email, patient_id, slot_dt):
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            "SELECT id, doctor_id, appointment_time, calendar_event_id FROM appointments WHERE patient_id = %s FOR UPDATE",
+            (patient_id,),
+        )
+        existing = await cursor.fetchone()
+        if existing:
+            await release_slot(cursor, existing[1], existing[2])
+        reservation = await reserve_slot(cursor, doctor_id, slot_dt)
+        if not reservation.ok:
+            await conn.rollback()
+            return False
+        if existing:
+            await cursor.execute(
+                "UPDATE appointments SET doctor_id = %s, appointment_time = %s, status = %s WHERE id = %s RETURNING id",
+                (doctor_id, slot_dt, "scheduled", existing[0]),
+            )
+        else:
+            await cursor.execute(
+                """
+                INSERT INTO appointments
+                  (patient_id, doctor_id, appointment_time, status, duration, calendar_event_id)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
+                """,
+                (patient_id, doctor_id, slot_dt, "scheduled", 30, None),
+            )
+        appointment_id = (await cursor.fetchone())[0]
+        await cursor.execute(
+            "UPDATE patients SET phone_number = %s, doctor_id = %s WHERE id = %s",
+            (PHONE, doctor_id, patient_id),
+        )
+        await attach_appointment(cursor, reservation, appointment_id)
+        await cursor.execute("SELECT full_name FROM patients WHERE id = %s", (patient_id,))
+        patient_name = (await cursor.fetchone())[0]
+
+        aggregate_key = f"appointment:{appointment_id}"
+        slot_key = slot_dt.isoformat()
+        await outbox.enqueue(
+            cursor, "sms.send", {"to": PHONE, "body": SMS_BODY},
+            idempotency_key=f"{aggregate_key}:sms:booked:{doctor_id}:{slot_key}",
+            aggregate_key=aggregate_key,
+        )
+        payload = {"appointment_id": appointment_id, "patient_name": patient_name,
+                   "start": slot_key, "duration": 30, "calendar_id": doctor_email}
+        if existing and existing[3]:
+            await outbox.enqueue(
+                cursor, "calendar.update", {**payload, "event_id": existing[3]},
+                idempotency_key=f"{aggregate_key}:calendar.update:{doctor_id}:{slot_key}",
+                aggregate_key=aggregate_key,
+            )
+        else:
+            await cursor.execute(
+                "UPDATE appointments SET calendar_event_id = %s WHERE id = %s",
+                (calendar_event_id_for(appointment_id), appointment_id),
+            )
+            await outbox.enqueue(
+                cursor, "calendar.create", payload,
+                idempotency_key=f"{aggregate_key}:calendar.create",
+                aggregate_key=aggregate_key,
+            )
+    await conn.commit()
+    return True
+
+
+async def book_function(conn, doctor_id, doctor_email, patient_id, slot_dt):
+    async with conn.cursor() as cursor:
+        booking = await book_appointment_tx(
+            cursor, patient_id, doctor_id, slot_dt, PHONE,
+            sms_body=SMS_BODY, event_prefix=CALENDAR_EVENT_ID_PREFIX,
+        )
+    if not booking.ok:
+        await conn.rollback()
+        return False
+    await conn.commit()
+    return True
+
+
+async def run(pool, book, doctor_id, doctor_email, patient_ids, first, second) -> list:
+    """Book every patient on `first`, then reschedule onto `second`; latencies in ms."""
+    timings = []
+    async with pool.connection() as conn:
+        for slots in (first, second):
+            for patient_id, slot_dt in zip(patient_ids, slots):
+                started = time.perf_counter()
+                if not await book(conn, doctor_id, doctor_email, patient_id, slot_dt):
+                    raise RuntimeError(f"Booking of {slot_dt} for patient {patient_id} failed")
+                timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def main(bookings: int):
+    pool = AsyncConnectionPool(DB_CONNINFO, min_size=1, max_size=2, open=False)
+    await pool.open(wait=True)
+    doctor_id, slot_times, patient_ids = await setup(pool, 4 * bookings, 2 * bookings)
+    try:
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT email FROM doctors WHERE id = %s", (doctor_id,))
+                doctor_email = (await cursor.fetchone())[0]
+
+        n = bookings
+        results = {
+            "statements": await run(pool, book_statements, doctor_id, doctor_email,
+                                    patient_ids[:n], slot_times[0:n], slot_times[n:2 * n]),
+            "function": await run(pool, book_function, doctor_id, doctor_email,
+                                  patient_ids[n:], slot_times[2 * n:3 * n], slot_times[3 * n:]),
+        }
+
+        print(f"{bookings} bookings + {bookings} reschedules per path")
+        print(f"{'path':<12}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+        for path, timings in results.items():
+            print(
+                f"{path:<12}{percentile(timings, 50):>10.2f}{percentile(timings, 99):>10.2f}"
+                f"{statistics.mean(timings):>10.2f}"
+            )
+        base, fast = results["statements"], results["function"]
+        print(f"p50 speedup: {percentile(base, 50) / percentile(fast, 50):.1f}x, "
+              f"p99 speedup: {percentile(base, 99) / percentile(fast, 99):.1f}x")
+    finally:
+        await cleanup(pool, doctor_id, patient_ids)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Booking transaction latency benchmark")
+    parser.add_argument("--bookings", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.bookings))
@@ -0,0 +1,86 @@
+"""
+Benchmark: TrigramIndex vs difflib.get_close_matches
+
+Builds synthetic normalized doctor names (as produced by normalize_name),
+then resolves misspelled queries with both matchers at 100, 1k and 10k
+names. Reports mean lookup time, speedup and how often both matchers
+agree on the best match.
+
+Run from the Backend directory:
+
+    python -m benchmarks.bench_fuzzy
+"""
+
+import difflib
+import random
+import string
+import time
+
+from api.Utils.fuzzy import TrigramIndex
+
+SIZES = [100, 1_000, 10_000]
+QUERIES = 200
+CUTOFF = 0.5
+SYLLABLES = [
+    "an", "ar", "be", "ch", "da", "el", "fa", "gu", "ha", "in", "ja", "ka",
+    "la", "ma", "na", "or", "pa", "ra", "sa", "sh", "ta", "th", "va", "ya",
+]
+
+
+def make_name(rng: random.Random) -> str:
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return first + last
+
+
+def misspell(rng: random.Random, name: str) -> str:
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        op = rng.choice(["swap", "drop", "replace"])
+        i = rng.randrange(len(chars))
+        if op == "swap" and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        elif op == "drop" and len(chars) > 4:
+            del chars[i]
+        else:
+            chars[i] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+def run(size: int, rng: random.Random):
+    names = list(dict.fromkeys(make_name(rng) for _ in range(size * 2)))[:size]
+    queries = [misspell(rng, rng.choice(names)) for _ in range(QUERIES)]
+
+    started = time.perf_counter()
+    index = TrigramIndex(names)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    baseline = [difflib.get_close_matches(q, names, n=1, cutoff=CUTOFF) for q in queries]
+    difflib_time = (time.perf_counter() - started) / QUERIES
+
+    started = time.perf_counter()
+    indexed = [index.search(q, k=1, cutoff=CUTOFF) for q in queries]
+    index_time = (time.perf_counter() - started) / QUERIES
+
+    agree = sum(
+        (b[0] if b else None) == (i[0][0] if i else None)
+        for b, i in zip(baseline, indexed)
+    )
+    print(
+        f"{size:>6} names | difflib {difflib_time * 1000:9.3f} ms | "
+        f"trigram {index_time * 1000:7.3f} ms | "
+        f"speedup {difflib_time / index_time:7.1f}x | "
+        f"build {build * 1000:7.1f} ms | "
+        f"same best match {agree / QUERIES:6.1%}"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    for size in SIZES:
+        run(size, rng)
+
+
+if __name__ == "__main__":
+    main()
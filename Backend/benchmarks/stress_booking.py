@@ -0,0 +1,168 @@
+"""
+Stress test: concurrent bookings of the same slots
+
+Creates a throwaway doctor with a handful of open slots and one patient per
+booking attempt, then fires all attempts at once from separate connections.
+Every attempt runs the same transaction as /Bland/book-appointment:
+book_appointment_tx() -> COMMIT.
+
+Afterwards it checks that every slot has at most one scheduled appointment
+and that the number of successful bookings equals the number of slots.
+All rows created by the run are deleted at the end.
+
+Needs a migrated database (DB_* environment variables as for the API).
+Run from the Backend directory:
+
+    python -m benchmarks.stress_booking [--attempts 500] [--slots 5] [--concurrency 100]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, time as dtime, timedelta
+
+from psycopg_pool import AsyncConnectionPool
+
+from api.Utils.reservations import (
+    RESERVED,
+    UniqueViolation,
+    book_appointment_tx,
+)
+from api.Utils.side_effects import CALENDAR_EVENT_ID_PREFIX
+from database import DB_CONNINFO
+
+
+async def setup(pool, slots: int, attempts: int):
+    tag = f"stress-{uuid.uuid4().hex[:8]}"
+    slot_date = date.today() + timedelta(days=365)
+    slot_times = [
+        datetime.combine(slot_date, dtime(9, 0)) + timedelta(minutes=30 * i)
+        for i in range(slots)
+    ]
+    async with pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO doctors (name, department, email) VALUES (%s, %s, %s) RETURNING id",
+                (f"Dr. {tag}", tag, f"{tag}@example.invalid"),
+            )
+            doctor_id = (await cursor.fetchone())[0]
+            # A state row keeps the slot calendar job from pruning these
+            # template-less slots while the test runs
+            await cursor.execute(
+                "INSERT INTO slot_calendar_state (doctor_id, generated_through) VALUES (%s, %s)",
+                (doctor_id, slot_date),
+            )
+            await cursor.executemany(
+                "INSERT INTO doctor_slots (doctor_id, slot_date, slot_time) VALUES (%s, %s, %s)",
+                [(doctor_id, dt.date(), dt.time()) for dt in slot_times],
+            )
+            patient_ids = []
+            for i in range(attempts):
+                await cursor.execute(
+                    """
+                    INSERT INTO patients (full_name, dob, phone_number, doctor_id, status)
+                    VALUES (%s, %s, %s, %s, %s) RETURNING id
+                    """,
+                    (f"{tag} patient {i}", date(1990, 1, 1), f"+1000{i:07d}", 0, "active"),
+                )
+                patient_ids.append((await cursor.fetchone())[0])
+    return doctor_id, slot_times, patient_ids
+
+
+async def attempt(pool, start: asyncio.Event, doctor_id, patient_id, slot_dt):
+    await start.wait()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            try:
+                booking = await book_appointment_tx(
+                    cursor, patient_id, doctor_id, slot_dt, "",
+                    event_prefix=CALENDAR_EVENT_ID_PREFIX,
+                )
+            except UniqueViolation:
+                await conn.rollback()
+                return "unique_violation"
+            if not booking.ok:
+                await conn.rollback()
+                return booking.outcome
+        await conn.commit()
+    return RESERVED
+
+
+async def verify(pool, doctor_id) -> list:
+    async with pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                """
+                SELECT appointment_time, COUNT(*)
+                FROM appointments
+                WHERE doctor_id = %s AND status = 'scheduled'
+                GROUP BY appointment_time
+                HAVING COUNT(*) > 1
+                """,
+                (doctor_id,),
+            )
+            return await cursor.fetchall()
+
+
+async def cleanup(pool, doctor_id, patient_ids):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                """
+                DELETE FROM outbox WHERE aggregate_key IN (
+                    SELECT 'appointment:' || id FROM appointments WHERE doctor_id = %s
+                )
+                """,
+                (doctor_id,),
+            )
+            await cursor.execute("DELETE FROM appointments WHERE doctor_id = %s", (doctor_id,))
+            await cursor.execute("DELETE FROM doctor_slots WHERE doctor_id = %s", (doctor_id,))
+            await cursor.execute("DELETE FROM slot_calendar_state WHERE doctor_id = %s", (doctor_id,))
+            await cursor.execute("DELETE FROM patients WHERE id = ANY(%s)", (patient_ids,))
+            await cursor.execute("DELETE FROM doctors WHERE id = %s", (doctor_id,))
+
+
+async def main(attempts: int, slots: int, concurrency: int) -> int:
+    pool = AsyncConnectionPool(DB_CONNINFO, min_size=concurrency, max_size=concurrency, open=False)
+    await pool.open(wait=True)
+    doctor_id, slot_times, patient_ids = await setup(pool, slots, attempts)
+    try:
+        rng = random.Random(7)
+        start = asyncio.Event()
+        chosen = [rng.choice(slot_times) for _ in patient_ids]
+        tasks = [
+            asyncio.create_task(attempt(pool, start, doctor_id, patient_id, slot_dt))
+            for patient_id, slot_dt in zip(patient_ids, chosen)
+        ]
+        started = time.perf_counter()
+        start.set()
+        outcomes = Counter(await asyncio.gather(*tasks))
+        elapsed = time.perf_counter() - started
+
+        duplicates = await verify(pool, doctor_id)
+        booked = outcomes[RESERVED]
+        print(
+            f"{attempts} attempts on {slots} slots, {concurrency} connections, "
+            f"{elapsed:.2f}s: {dict(outcomes)}"
+        )
+        print(f"double-booked slots: {len(duplicates)}")
+
+        ok = not duplicates and booked == len(set(chosen))
+        print("PASS" if ok else "FAIL")
+        return 0 if ok else 1
+    finally:
+        await cleanup(pool, doctor_id, patient_ids)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test")
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--slots", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.attempts, args.slots, args.concurrency)))
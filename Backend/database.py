@@ -1,16 +1,258 @@
+"""
+Database Connection Pool
+
+Every request checks out its own connection from a shared pool instead of
+sharing one module-level connection and cursor. A failed transaction is
+rolled back when its connection is returned, so it can no longer poison
+other in-flight requests.
+
+Two pools are provided:
+- `db_pool` (psycopg2, blocking) for plain `def` routes, which FastAPI runs
+  in its threadpool, and for scripts / background threads
+- `async_pool` (psycopg 3 AsyncConnectionPool) for `async def` routes, so
+  queries are awaited instead of blocking the event loop
+
+Configuration (environment variables):
+- DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME: connection settings
+- DB_POOL_MIN: connections opened eagerly when the pool starts (default 2)
+- DB_POOL_MAX: hard upper bound on open connections (default 20)
+- DB_POOL_TIMEOUT: seconds to wait for a free connection (default 10)
+
+Usage in a sync route:
+
+    @Router.get("/example")
+    def example(db=Depends(get_db)):
+        conn, cursor = db
+        cursor.execute("SELECT 1;")
+
+Usage in an async route:
+
+    @Router.post("/example")
+    async def example(db=Depends(get_async_db)):
+        conn, cursor = db
+        await cursor.execute("SELECT 1;")
+
+Outside a request (startup hooks, background jobs, scripts):
+
+    with get_connection() as (conn, cursor):
+        cursor.execute("SELECT 1;")
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions, pool
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
-conn = psycopg2.connect(
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        database=os.getenv("DB_NAME")
+logger = logging.getLogger(__name__)
+
+DB_CONFIG = {
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+    "database": os.getenv("DB_NAME"),
+}
+
+# libpq connection string for psycopg 3 (which names the database "dbname")
+DB_CONNINFO = make_conninfo(**{
+    "dbname" if key == "database" else key: value
+    for key, value in DB_CONFIG.items()
+    if value is not None
+})
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Blocking, bounded wrapper around psycopg2's ThreadedConnectionPool.
+
+    psycopg2's pool raises immediately when it is exhausted; this wrapper
+    makes callers wait (up to `timeout` seconds) for a connection to be
+    returned, resets connections on return and keeps usage statistics.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._connect_kwargs = connect_kwargs
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+        # Statistics
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def open(self):
+        """Open the underlying pool (idempotent)."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = pool.ThreadedConnectionPool(
+                    self.minconn, self.maxconn, **self._connect_kwargs
+                )
+                logger.info(
+                    f"Database pool opened (min={self.minconn}, max={self.maxconn})"
+                )
+
+    def close(self):
+        """Close every connection held by the pool."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                logger.info("Database pool closed")
+
+    def getconn(self):
+        """Check out a connection, waiting for one to be returned if necessary."""
+        self.open()
+
+        started = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._timeouts += 1
+        if not acquired:
+            raise PoolTimeout(
+                f"No database connection available after {self.timeout:.1f}s "
+                f"(max={self.maxconn})"
+            )
+
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection, rolling back any transaction left open."""
+        discard = bool(conn.closed)
+        if not discard:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning(f"Discarding broken database connection: {e}")
+                discard = True
+
+        try:
+            if self._pool is not None:
+                self._pool.putconn(conn, close=discard)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if discard:
+                    self._discarded += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage for monitoring."""
+        with self._lock:
+            idle = len(self._pool._pool) if self._pool is not None else 0
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "open": self._pool is not None,
+                "in_use": self._in_use,
+                "idle": idle,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "avg_wait_ms": round(
+                    self._total_wait / self._checkouts * 1000, 3
+                ) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+
+db_pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, **DB_CONFIG)
+
+
+@contextmanager
+def get_connection():
+    """Check out a (connection, cursor) pair for use outside a request."""
+    conn = db_pool.getconn()
+    cursor = conn.cursor()
+    try:
+        yield conn, cursor
+    finally:
+        cursor.close()
+        db_pool.putconn(conn)
+
+
+def get_db():
+    """FastAPI dependency yielding a per-request (connection, cursor) pair."""
+    with get_connection() as db:
+        yield db
+
+
+async_pool = AsyncConnectionPool(
+    DB_CONNINFO,
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    open=False,
 )
 
-cursor = conn.cursor()
 
+async def open_async_pool():
+    """Open the async pool; called from the application startup hook."""
+    await async_pool.open()
+    logger.info(
+        f"Async database pool opened (min={DB_POOL_MIN}, max={DB_POOL_MAX})"
+    )
+
+
+async def close_async_pool():
+    """Close the async pool; called from the application shutdown hook."""
+    await async_pool.close()
+    logger.info("Async database pool closed")
+
+
+async def get_async_db():
+    """FastAPI dependency yielding a per-request async (connection, cursor) pair."""
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            yield conn, cursor
+
+
+def pool_stats() -> dict:
+    """Current connection pool statistics for both pools."""
+    return {
+        "sync": db_pool.stats(),
+        "async": async_pool.get_stats(),
+    }
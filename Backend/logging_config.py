@@ -76,7 +76,7 @@ def setup_logging(log_level: str = "INFO", log_to_file: bool = True):
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("google").setLevel(logging.WARNING)
-    logging.getLogger("twilio").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
     
     logging.info("Logging configuration setup complete")
 
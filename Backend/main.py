@@ -1,10 +1,34 @@
+import os
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes.Bland import patients, appointments, doctors
-from api.routes.Dashboard import Frontend,Login
-from database import conn, cursor
+from api.routes.Dashboard import Frontend,Login,Export,Feed
+from database import (
+    db_pool,
+    get_connection,
+    pool_stats,
+    open_async_pool,
+    close_async_pool,
+)
+from migrations import apply_migrations
+from api.Utils.pg_listener import listener
+from api.Utils.doctor_directory import doctor_directory
+from api.Utils.availability import availability_engine
+from api.Utils.slot_calendar import slot_calendar_job
+from api.Utils.slot_holds import hold_timers, slot_hold_sweep_job
+from api.Utils.outbox import outbox_worker, outbox_status_counts
+from api.Utils.calendar_gateway import calendar_gateway
+from api.Utils.calendar_sync import calendar_sync_job
+from api.Utils.idempotency import idempotency_prune_job
+from api.Utils.reminders import reminder_scheduler
+from api.Utils import side_effects  # Registers the outbox SMS / calendar handlers
 from Google_calender import calendar_service
-from TwilioConnet import client
+from api.Utils.sms_service import sms_service
+from api.Utils.resilience import breaker_states
+from api.Utils.response_cache import dashboard_cache
+from api.Utils.dashboard_stats import dashboard_stats
+from api.Utils.change_feed import change_feed
 import logging_config  # Import logging configuration
 import logging
 
@@ -13,6 +37,9 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Apply pending schema migrations when the app starts ("false" to disable)
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+
 origins = [
     "http://localhost:5173",
     "https://medical-assistant-wsw6.onrender.com",
@@ -31,15 +58,91 @@ app.include_router(appointments.Router)
 app.include_router(doctors.Router)
 app.include_router(Frontend.Router)
 app.include_router(Login.router)
+app.include_router(Export.Router)
+app.include_router(Feed.Router)
 
 @app.get("/")
 async def root():
     return {"message": "API is running"}
 
+@app.get("/health/db-pool")
+async def db_pool_health():
+    return {"pool": pool_stats()}
+
+
+@app.get("/health/availability")
+async def availability_health():
+    return {
+        "availability": availability_engine.stats(),
+        "holds": {"pending": len(hold_timers), "expired": hold_timers.expired},
+    }
+
+
+@app.get("/health/outbox")
+async def outbox_health():
+    return {
+        "worker": outbox_worker.stats(),
+        "jobs": await outbox_status_counts(),
+        "calendar": calendar_gateway.stats(),
+        "calendar_sync": {"runs": calendar_sync_job.runs, "failures": calendar_sync_job.failures},
+        "reminders": reminder_scheduler.stats(),
+        "sms": sms_service.stats(),
+    }
+
+
+@app.get("/health/cache")
+async def cache_health():
+    return {"responses": dashboard_cache.stats(), "dashboard_stats": dashboard_stats.stats()}
+
+
+@app.get("/health/feed")
+async def feed_health():
+    return {"feed": change_feed.stats()}
+
+
+@app.get("/health/breakers")
+async def breakers_health():
+    return {"breakers": breaker_states()}
+
 @app.on_event("startup")
 async def startup_event():
-    cursor.execute("SELECT 1;")
+    with get_connection() as (_, cursor):
+        cursor.execute("SELECT 1;")
+    await open_async_pool()
     logger.info("Database connected successfully")
+
+    if DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(apply_migrations)
+
+    # Cross-worker cache invalidation via Postgres LISTEN/NOTIFY
+    listener.subscribe("doctors_changed", doctor_directory.invalidate)
+    listener.subscribe("slots_changed", availability_engine.invalidate)
+    listener.subscribe("outbox_ready", outbox_worker.trigger)
+    listener.subscribe("appointment_changes", reminder_scheduler.appointment_changed)
+    listener.subscribe("cache_invalidate", dashboard_cache.invalidate)
+    listener.subscribe("cache_invalidate", dashboard_stats.invalidate)
+    listener.subscribe("doctors_changed", dashboard_stats.invalidate)
+    listener.subscribe("doctors_changed", dashboard_cache.tag_handler("doctors"))
+    listener.subscribe("appointment_events", change_feed.publish)
+    await listener.start()
+
+    # Keep the per-date slot calendar generated over the rolling horizon
+    slot_calendar_job.start()
+    hold_timers.start()
+    slot_hold_sweep_job.start()
+
+    # Deliver queued SMS / calendar side effects
+    sms_service.start()
+    outbox_worker.start()
+
+    # Incremental Google Calendar reconciliation
+    calendar_sync_job.start()
+
+    # Drop expired idempotency responses
+    idempotency_prune_job.start()
+
+    # Reminder SMS timers, updated through appointment_changes
+    reminder_scheduler.start()
     
     # Test Google Calendar service
     if calendar_service:
@@ -47,10 +150,24 @@ async def startup_event():
     else:
         logger.warning("Google Calendar service not available")
         
-    if client:
-        logger.info("Twilio service connected successfully")
+    if sms_service.configured:
+        logger.info("Twilio SMS service configured")
     else:
-        logger.warning("Twilio service not available")
+        logger.warning("Twilio SMS service not configured")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await reminder_scheduler.stop()
+    await idempotency_prune_job.stop()
+    await calendar_sync_job.stop()
+    await outbox_worker.stop()
+    await sms_service.stop()
+    await slot_hold_sweep_job.stop()
+    await hold_timers.stop()
+    await slot_calendar_job.stop()
+    await listener.stop()
+    await close_async_pool()
+    db_pool.close()
 
         
 
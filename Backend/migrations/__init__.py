@@ -0,0 +1,138 @@
+"""
+Versioned Schema Migrations
+
+Each module in `migrations/versions` named `NNNN_description.py` defines:
+- DESCRIPTION: str      # Human readable summary
+- UP: list[str]         # SQL statements applied in order
+
+Applied versions are recorded in the `schema_migrations` table. Every
+migration runs in its own transaction, and a session-level advisory lock
+makes concurrent workers starting at the same time apply each migration
+exactly once.
+
+Migrations run from the application startup hook (see DB_MIGRATE_ON_STARTUP
+in main.py) or from the command line:
+
+    python -m migrations upgrade    # apply pending migrations
+    python -m migrations status     # list applied / pending versions
+    python -m migrations check      # EXPLAIN hot queries, fail on seq scans
+"""
+
+import importlib
+import logging
+import pkgutil
+from dataclasses import dataclass
+
+from database import get_connection
+from migrations import versions
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant shared by every worker running migrations
+MIGRATION_LOCK_KEY = 72_410_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    description: str
+    statements: list
+
+
+def load_migrations() -> list[Migration]:
+    """Discover every migration module, sorted by version."""
+    found = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        prefix, _, _ = module_info.name.partition("_")
+        if not prefix.isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        found.append(Migration(
+            version=int(prefix),
+            name=module_info.name,
+            description=getattr(module, "DESCRIPTION", module_info.name),
+            statements=list(module.UP),
+        ))
+
+    found.sort(key=lambda m: m.version)
+    seen = set()
+    for migration in found:
+        if migration.version in seen:
+            raise RuntimeError(f"Duplicate migration version {migration.version}")
+        seen.add(migration.version)
+    return found
+
+
+def _ensure_migrations_table(conn, cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL,
+            description TEXT,
+            applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    conn.commit()
+
+
+def _applied_versions(cursor) -> set:
+    cursor.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations() -> list[Migration]:
+    """Apply every pending migration and return the ones applied."""
+    applied_now = []
+    with get_connection() as (conn, cursor):
+        _ensure_migrations_table(conn, cursor)
+        cursor.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+        try:
+            applied = _applied_versions(cursor)
+            conn.commit()
+            for migration in load_migrations():
+                if migration.version in applied:
+                    continue
+                logger.info(f"Applying migration {migration.name}: {migration.description}")
+                try:
+                    for statement in migration.statements:
+                        cursor.execute(statement)
+                    cursor.execute(
+                        """
+                        INSERT INTO schema_migrations (version, name, description)
+                        VALUES (%s, %s, %s)
+                        """,
+                        (migration.version, migration.name, migration.description)
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Migration {migration.name} failed: {e}")
+                    raise
+                applied_now.append(migration)
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+
+    if applied_now:
+        logger.info(f"Applied {len(applied_now)} migration(s)")
+    else:
+        logger.info("Database schema is up to date")
+    return applied_now
+
+
+def migration_status() -> list[dict]:
+    """List every known migration with whether it has been applied."""
+    with get_connection() as (conn, cursor):
+        _ensure_migrations_table(conn, cursor)
+        applied = _applied_versions(cursor)
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "description": m.description,
+            "applied": m.version in applied,
+        }
+        for m in load_migrations()
+    ]
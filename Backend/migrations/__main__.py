@@ -0,0 +1,51 @@
+"""
+Command line entry point for schema migrations.
+
+Run from the Backend directory:
+
+    python -m migrations upgrade
+    python -m migrations status
+    python -m migrations check
+"""
+
+import argparse
+import sys
+
+import logging_config  # noqa: F401  (configures logging)
+from migrations import apply_migrations, migration_status
+from migrations.check import check_index_usage
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m migrations")
+    parser.add_argument(
+        "command",
+        choices=["upgrade", "status", "check"],
+        help="upgrade: apply pending migrations; status: list versions; "
+             "check: fail if a hot query uses a sequential scan",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = apply_migrations()
+        for migration in applied:
+            print(f"applied  {migration.name}")
+        if not applied:
+            print("up to date")
+        return 0
+
+    if args.command == "status":
+        for row in migration_status():
+            state = "applied" if row["applied"] else "pending"
+            print(f"{state:8} {row['name']}  {row['description']}")
+        return 0
+
+    results = check_index_usage()
+    for result in results:
+        state = "ok" if result["ok"] else "SEQ SCAN " + ", ".join(result["seq_scans"])
+        print(f"{state:30} {result['route']}")
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
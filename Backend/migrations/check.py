@@ -0,0 +1,176 @@
+"""
+Index Usage Check
+
+Runs EXPLAIN on the queries behind the hot routes and reports any plan
+that still falls back to a sequential scan on one of the indexed tables.
+
+Sequential scans are disabled for the check (`enable_seqscan = off`), so a
+table small enough that the planner would normally prefer a seq scan does
+not produce a false failure: a Seq Scan node left in the plan means no
+usable index exists for that predicate.
+
+Statements that only run inside SQL functions (book_appointment_tx) cannot
+be explained from here; the hold query covers their slot lookup.
+"""
+
+import json
+import logging
+import uuid
+from datetime import date, datetime, time
+
+from api.Utils.availability import LOAD_QUERY
+from api.Utils.dashboard_stats import DASHBOARD_STATS_QUERY
+from api.Utils.doctor_directory import PG_TRGM_DEPARTMENT_QUERY, PG_TRGM_DOCTOR_QUERY
+from api.Utils.outbox import CLAIM
+from api.Utils.slot_holds import PLACE_HOLD, RELEASE_EXPIRED_HOLDS
+from database import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Tables the hot paths must reach through an index
+INDEXED_TABLES = {"appointments", "doctor_availability", "doctor_slots", "doctors", "outbox", "patients"}
+
+SAMPLE_DATE = date(2000, 1, 3)
+SAMPLE_TIME = time(9, 0)
+SAMPLE_DATETIME = datetime.combine(SAMPLE_DATE, SAMPLE_TIME)
+
+# (route, query, sample parameters). Queries kept as constants next to
+# their callers are imported, so the check explains exactly what runs;
+# the inline ones mirror the route's SQL verbatim.
+HOT_QUERIES = [
+    (
+        "validate-users: patient by phone and dob",
+        "SELECT id, full_name, dob, phone_number FROM patients WHERE phone_number=%s AND dob=%s;",
+        ("+10000000000", SAMPLE_DATE),
+    ),
+    (
+        "hold-slot / book-appointment: slot by doctor, date and time",
+        PLACE_HOLD,
+        {
+            "doctor_id": 0, "slot_date": SAMPLE_DATE, "slot_time": SAMPLE_TIME,
+            "token": str(uuid.UUID(int=0)), "ttl": 300, "held_by": "check",
+        },
+    ),
+    (
+        "cancel-appointment: appointment lookup",
+        """
+            SELECT id, calendar_event_id 
+            FROM appointments 
+            WHERE patient_id = %s AND doctor_id = %s AND appointment_time = %s
+        """,
+        (0, 0, SAMPLE_DATETIME),
+    ),
+    (
+        "find-doctor (pg_trgm mode): ranked name match",
+        PG_TRGM_DOCTOR_QUERY,
+        {"q": "sample", "threshold": 0.3},
+    ),
+    (
+        "get-doctors (pg_trgm mode): ranked department match",
+        PG_TRGM_DEPARTMENT_QUERY,
+        {"q": "sample", "threshold": 0.3},
+    ),
+    (
+        "time-slot / check-avail / fetch-date: availability engine load",
+        LOAD_QUERY,
+        ([0], SAMPLE_DATE),
+    ),
+    (
+        "slot-hold sweep: expired holds",
+        RELEASE_EXPIRED_HOLDS,
+        (),
+    ),
+    (
+        "outbox worker: claim due jobs",
+        CLAIM,
+        {"limit": 20, "lease": 120},
+    ),
+    (
+        "slots: booked appointments for doctor",
+        """
+            SELECT appointment_time FROM appointments
+            WHERE doctor_id = %s AND DATE(appointment_time) = %s AND status = 'scheduled';
+        """,
+        (0, SAMPLE_DATE),
+    ),
+    (
+        "appointments: keyset page for a doctor",
+        """
+            SELECT
+                a.id,
+                a.appointment_time,
+                a.patient_id,
+                p.full_name,
+                d.name,
+                d.department,
+                a.status,
+                a.duration,
+                a.calendar_event_id
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.id
+            JOIN doctors d ON a.doctor_id = d.id
+            WHERE a.doctor_id = %s AND (a.appointment_time, a.id) > (%s, %s)
+            ORDER BY a.appointment_time ASC, a.id ASC
+            LIMIT %s;
+        """,
+        (0, SAMPLE_DATETIME, 0, 101),
+    ),
+    (
+        "patients: keyset page",
+        """
+            SELECT 
+                p.id, 
+                p.full_name, 
+                p.dob, 
+                p.phone_number,
+                p.status,
+                p.doctor_id,
+                d.name,
+                d.department
+            FROM patients p
+            LEFT JOIN doctors d ON p.doctor_id = d.id
+            WHERE p.id > %s
+            ORDER BY p.id
+            LIMIT %s;
+        """,
+        (0, 101),
+    ),
+    (
+        "dashboard/stats: rollups and next appointments",
+        DASHBOARD_STATS_QUERY,
+        (),
+    ),
+]
+
+def _seq_scans(plan: dict) -> list[str]:
+    """Collect relations read with a Seq Scan anywhere in the plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def check_index_usage() -> list[dict]:
+    """EXPLAIN every hot query and report whether it avoids seq scans."""
+    results = []
+    with get_connection() as (conn, cursor):
+        for route, query, params in HOT_QUERIES:
+            cursor.execute("SET LOCAL enable_seqscan = off;")
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            raw_plan = cursor.fetchone()[0]
+            conn.rollback()
+
+            plan = raw_plan if isinstance(raw_plan, list) else json.loads(raw_plan)
+            offending = sorted({
+                rel for rel in _seq_scans(plan[0]["Plan"]) if rel in INDEXED_TABLES
+            })
+            results.append({
+                "route": route,
+                "ok": not offending,
+                "seq_scans": offending,
+            })
+            if offending:
+                logger.error(f"Sequential scan on {offending} for '{route}'")
+    return results
@@ -0,0 +1,48 @@
+"""
+Indexes for the hot lookup paths used by the Bland voice endpoints and the
+dashboard.
+"""
+
+DESCRIPTION = "Composite and expression indexes for hot lookup paths"
+
+UP = [
+    # validate-users / create-user: patient lookup by phone + date of birth
+    """
+    CREATE INDEX IF NOT EXISTS idx_patients_phone_dob
+        ON patients (phone_number, dob);
+    """,
+    # book-appointment / get-appointment / validate-users: appointments per patient
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointments_patient_id
+        ON appointments (patient_id);
+    """,
+    # cancel-appointment, /slots, /appointments?doctor_id=
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointments_doctor_time
+        ON appointments (doctor_id, appointment_time);
+    """,
+    # dashboard ordering and date-range filters
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointments_time
+        ON appointments (appointment_time);
+    """,
+    # time-slot / check-avail / fetch-date / slot updates on booking
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctor_availability_doctor_day_slot
+        ON doctor_availability (doctor_id, day_of_week, time_slot);
+    """,
+    # doctor lookups by matched name and department
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctors_lower_name
+        ON doctors (LOWER(name));
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctors_lower_department
+        ON doctors (LOWER(department));
+    """,
+    # doctor login
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctors_email
+        ON doctors (email);
+    """,
+]
@@ -0,0 +1,25 @@
+"""
+Notify listeners whenever the doctors table changes, so the in-process
+doctor directory cache (api/Utils/doctor_directory.py) can reload.
+"""
+
+DESCRIPTION = "NOTIFY doctors_changed on writes to doctors"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_doctors_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('doctors_changed', TG_OP);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS doctors_changed ON doctors;
+    """,
+    """
+    CREATE TRIGGER doctors_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON doctors
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_doctors_changed();
+    """,
+]
@@ -0,0 +1,31 @@
+"""
+Database-side fuzzy doctor / department search (DOCTOR_MATCH_MODE=pg_trgm).
+
+normalize_doctor_name() mirrors api.Utils.helper.normalize_name so the
+trigram GIN index can be built over exactly the keys the in-process matcher
+uses.
+"""
+
+DESCRIPTION = "pg_trgm extension, normalize_doctor_name() and trigram GIN indexes"
+
+UP = [
+    """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    """,
+    r"""
+    CREATE OR REPLACE FUNCTION normalize_doctor_name(raw TEXT) RETURNS TEXT AS $$
+        SELECT regexp_replace(
+            lower(regexp_replace(raw, '\m(dr|doctor|mr|mrs|ms|miss|prof)\M', '', 'gi')),
+            '[^a-z]', '', 'g'
+        );
+    $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctors_norm_name_trgm
+        ON doctors USING gin (normalize_doctor_name(name) gin_trgm_ops);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctors_lower_department_trgm
+        ON doctors USING gin (LOWER(department) gin_trgm_ops);
+    """,
+]
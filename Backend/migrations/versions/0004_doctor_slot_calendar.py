@@ -0,0 +1,61 @@
+"""
+Per-date slot calendar.
+
+doctor_availability stays the weekly template (day_of_week / time_slot);
+doctor_slots holds one row per doctor, date and 30-minute slot, generated
+from the template over a rolling horizon by api/Utils/slot_calendar.py.
+Bookings and cancellations flip doctor_slots rows for a single date instead
+of the weekday template.
+"""
+
+DESCRIPTION = "doctor_slots per-date calendar and generation state"
+
+UP = [
+    """
+    CREATE TABLE IF NOT EXISTS doctor_slots (
+        id             BIGSERIAL PRIMARY KEY,
+        doctor_id      INTEGER NOT NULL,
+        slot_date      DATE NOT NULL,
+        slot_time      TIME NOT NULL,
+        is_available   BOOLEAN NOT NULL DEFAULT true,
+        appointment_id INTEGER,
+        CONSTRAINT uq_doctor_slots_doctor_date_time UNIQUE (doctor_id, slot_date, slot_time)
+    );
+    """,
+    # Open slots by doctor and date: time-slot / check-avail / fetch-date
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctor_slots_open
+        ON doctor_slots (doctor_id, slot_date, slot_time)
+        WHERE is_available;
+    """,
+    # How far ahead each doctor's calendar has been generated
+    """
+    CREATE TABLE IF NOT EXISTS slot_calendar_state (
+        doctor_id         INTEGER PRIMARY KEY,
+        generated_through DATE NOT NULL
+    );
+    """,
+    # A template change forces that doctor's calendar to be regenerated
+    """
+    CREATE OR REPLACE FUNCTION reset_slot_calendar_state() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM slot_calendar_state WHERE doctor_id = OLD.doctor_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            DELETE FROM slot_calendar_state WHERE doctor_id = NEW.doctor_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS doctor_availability_changed ON doctor_availability;
+    """,
+    """
+    CREATE TRIGGER doctor_availability_changed
+        AFTER INSERT OR DELETE OR UPDATE OF doctor_id, day_of_week, time_slot
+        ON doctor_availability
+        FOR EACH ROW EXECUTE FUNCTION reset_slot_calendar_state();
+    """,
+]
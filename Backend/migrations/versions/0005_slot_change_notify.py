@@ -0,0 +1,31 @@
+"""
+Notify listeners when a doctor's slots change, so the in-process bitmap
+availability engine (api/Utils/availability.py) drops that doctor. The
+payload is the doctor id; identical notifications within one transaction
+are collapsed by Postgres, so bulk calendar generation sends one per doctor.
+"""
+
+DESCRIPTION = "NOTIFY slots_changed with the doctor id on writes to doctor_slots"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_slots_changed() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('slots_changed', OLD.doctor_id::text);
+        ELSE
+            PERFORM pg_notify('slots_changed', NEW.doctor_id::text);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS doctor_slots_changed ON doctor_slots;
+    """,
+    """
+    CREATE TRIGGER doctor_slots_changed
+        AFTER INSERT OR DELETE OR UPDATE OF is_available ON doctor_slots
+        FOR EACH ROW EXECUTE FUNCTION notify_slots_changed();
+    """,
+]
@@ -0,0 +1,31 @@
+"""
+At most one scheduled appointment per doctor and time.
+
+Backs the conditional slot reservation in api/Utils/reservations.py with a
+constraint, so a second booking of the same slot fails in the database even
+if it bypasses doctor_slots (dashboard writes, manual fixes).
+
+Scheduled duplicates that already exist would make the index build fail;
+all but the oldest of each group are moved to status 'double_booked' so
+they stay visible for follow-up instead of blocking startup.
+"""
+
+DESCRIPTION = "Partial unique index on scheduled appointments per doctor and time"
+
+UP = [
+    """
+    UPDATE appointments a
+       SET status = 'double_booked'
+      FROM appointments first
+     WHERE a.status = 'scheduled'
+       AND first.status = 'scheduled'
+       AND first.doctor_id = a.doctor_id
+       AND first.appointment_time = a.appointment_time
+       AND first.id < a.id;
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_appointments_doctor_time_scheduled
+        ON appointments (doctor_id, appointment_time)
+        WHERE status = 'scheduled';
+    """,
+]
@@ -0,0 +1,31 @@
+"""
+Temporary holds on doctor_slots.
+
+A held slot has is_available = false (so it drops out of every availability
+query and the bitmap engine) plus a hold token and expiry. The token is what
+the voice agent passes back to book-appointment to convert the hold; expiry
+is driven by an in-process timer heap (api/Utils/slot_holds.py), with a
+periodic sweep over idx_doctor_slots_hold_expiry as the fallback for holds
+whose worker went away.
+"""
+
+DESCRIPTION = "hold_token / held_until / held_by columns on doctor_slots"
+
+UP = [
+    """
+    ALTER TABLE doctor_slots
+        ADD COLUMN IF NOT EXISTS hold_token UUID,
+        ADD COLUMN IF NOT EXISTS held_until TIMESTAMPTZ,
+        ADD COLUMN IF NOT EXISTS held_by    TEXT;
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_doctor_slots_hold_token
+        ON doctor_slots (hold_token)
+        WHERE hold_token IS NOT NULL;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_doctor_slots_hold_expiry
+        ON doctor_slots (held_until)
+        WHERE hold_token IS NOT NULL;
+    """,
+]
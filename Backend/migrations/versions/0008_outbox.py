@@ -0,0 +1,63 @@
+"""
+Transactional outbox for external side effects.
+
+Booking and cancellation insert their SMS and Google Calendar work into
+`outbox` in the same transaction as the appointment change; the worker in
+api/Utils/outbox.py delivers it after commit with retries and backoff.
+
+- idempotency_key makes re-enqueueing the same effect a no-op
+- aggregate_key (e.g. "appointment:42") keeps effects for one appointment in
+  order: a job is only claimed once every earlier job for its aggregate is
+  finished
+- an INSERT notifies `outbox_ready` so idle workers wake immediately
+"""
+
+DESCRIPTION = "outbox table, claim indexes and outbox_ready notification"
+
+UP = [
+    """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id              BIGSERIAL PRIMARY KEY,
+        topic           TEXT NOT NULL,
+        aggregate_key   TEXT,
+        idempotency_key TEXT NOT NULL,
+        payload         JSONB NOT NULL,
+        status          TEXT NOT NULL DEFAULT 'pending',
+        attempts        INTEGER NOT NULL DEFAULT 0,
+        available_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+        locked_until    TIMESTAMPTZ,
+        last_error      TEXT,
+        created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+        processed_at    TIMESTAMPTZ,
+        CONSTRAINT uq_outbox_idempotency_key UNIQUE (idempotency_key)
+    );
+    """,
+    # Claim scan: due pending jobs and expired leases, oldest first
+    """
+    CREATE INDEX IF NOT EXISTS idx_outbox_claimable
+        ON outbox (id)
+        WHERE status IN ('pending', 'processing');
+    """,
+    # Per-aggregate ordering check
+    """
+    CREATE INDEX IF NOT EXISTS idx_outbox_aggregate_open
+        ON outbox (aggregate_key, id)
+        WHERE status IN ('pending', 'processing');
+    """,
+    """
+    CREATE OR REPLACE FUNCTION notify_outbox_ready() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('outbox_ready', '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS outbox_ready ON outbox;
+    """,
+    """
+    CREATE TRIGGER outbox_ready
+        AFTER INSERT ON outbox
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_ready();
+    """,
+]
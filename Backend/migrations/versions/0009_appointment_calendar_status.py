@@ -0,0 +1,18 @@
+"""
+Per-appointment Google Calendar sync result.
+
+The batched calendar gateway reports each insert / patch back to the
+appointment it belongs to: calendar_status is 'synced' or 'error', with the
+last error text and the time of the last attempt.
+"""
+
+DESCRIPTION = "calendar_status / calendar_error / calendar_synced_at on appointments"
+
+UP = [
+    """
+    ALTER TABLE appointments
+        ADD COLUMN IF NOT EXISTS calendar_status    TEXT,
+        ADD COLUMN IF NOT EXISTS calendar_error     TEXT,
+        ADD COLUMN IF NOT EXISTS calendar_synced_at TIMESTAMPTZ;
+    """,
+]
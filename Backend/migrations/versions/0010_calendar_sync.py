@@ -0,0 +1,42 @@
+"""
+Incremental Google Calendar reconciliation state.
+
+calendar_sync_state keeps the events.list sync token per doctor calendar;
+calendar_events mirrors the events of those calendars as of the last sync,
+so drift against appointments is found with set-based SQL instead of
+per-appointment API calls (api/Utils/calendar_sync.py).
+"""
+
+DESCRIPTION = "calendar_sync_state and calendar_events mirror"
+
+UP = [
+    """
+    CREATE TABLE IF NOT EXISTS calendar_sync_state (
+        calendar_id       TEXT PRIMARY KEY,
+        sync_token        TEXT,
+        last_synced_at    TIMESTAMPTZ,
+        last_full_sync_at TIMESTAMPTZ
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS calendar_events (
+        calendar_id TEXT NOT NULL,
+        event_id    TEXT NOT NULL,
+        start_time  TIMESTAMPTZ,
+        managed     BOOLEAN NOT NULL DEFAULT false,
+        updated_at  TIMESTAMPTZ,
+        PRIMARY KEY (calendar_id, event_id)
+    );
+    """,
+    # Orphan scan: managed future events per calendar
+    """
+    CREATE INDEX IF NOT EXISTS idx_calendar_events_managed_start
+        ON calendar_events (calendar_id, start_time)
+        WHERE managed;
+    """,
+    # Missing / drifted events: scheduled appointments by event id
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointments_calendar_event_id
+        ON appointments (calendar_event_id);
+    """,
+]
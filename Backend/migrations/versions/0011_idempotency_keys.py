@@ -0,0 +1,31 @@
+"""
+Stored responses for idempotent Bland webhooks.
+
+One row per (endpoint, key): claimed as 'in_progress' before the request
+runs and completed with the response afterwards, so a retried webhook gets
+the original response back (api/Utils/idempotency.py). Rows expire after
+IDEMPOTENCY_TTL and are pruned through idx_idempotency_keys_expires.
+"""
+
+DESCRIPTION = "idempotency_keys response store"
+
+UP = [
+    """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        endpoint        TEXT NOT NULL,
+        key             TEXT NOT NULL,
+        request_hash    TEXT NOT NULL,
+        status          TEXT NOT NULL DEFAULT 'in_progress',
+        response_status INTEGER,
+        response_body   JSONB,
+        created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+        locked_until    TIMESTAMPTZ,
+        expires_at      TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (endpoint, key)
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires
+        ON idempotency_keys (expires_at);
+    """,
+]
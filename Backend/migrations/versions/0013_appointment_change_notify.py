@@ -0,0 +1,31 @@
+"""
+Notify listeners when an appointment is booked, moved or cancelled, so the
+reminder scheduler (api/Utils/reminders.py) updates that appointment's
+timers instead of polling the table. The payload is the appointment id;
+duplicates within one transaction are collapsed by Postgres.
+"""
+
+DESCRIPTION = "NOTIFY appointment_changes with the appointment id on writes to appointments"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_appointment_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('appointment_changes', OLD.id::text);
+        ELSE
+            PERFORM pg_notify('appointment_changes', NEW.id::text);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS appointments_changed ON appointments;
+    """,
+    """
+    CREATE TRIGGER appointments_changed
+        AFTER INSERT OR DELETE OR UPDATE OF appointment_time, status, patient_id, doctor_id ON appointments
+        FOR EACH ROW EXECUTE FUNCTION notify_appointment_changes();
+    """,
+]
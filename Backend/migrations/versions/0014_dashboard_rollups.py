@@ -0,0 +1,167 @@
+"""
+Rollups for /dashboard/stats, kept current by triggers instead of COUNT(*)
+scans on every dashboard load:
+
+- dashboard_counters: one row per table (patients, doctors, appointments)
+  holding its row count
+- appointment_day_counts: appointments per (day, status), from which the
+  dashboard reads today's and upcoming totals
+
+The triggers are statement-level with transition tables, so a bulk insert
+or cancellation updates each rollup row once per statement rather than once
+per row, and an UPDATE that moves no appointment between days or statuses
+(calendar_status, calendar_event_id, ...) writes nothing.
+
+Both rollups are seeded from the current tables in the same transaction;
+CREATE TRIGGER blocks writers until it commits, so no change is missed.
+refresh_dashboard_rollups() recomputes them from scratch (e.g. after a
+TRUNCATE, which the triggers do not see).
+"""
+
+DESCRIPTION = "Trigger-maintained row counters and per-day appointment counts for the dashboard"
+
+UP = [
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_counters (
+        name        TEXT PRIMARY KEY,
+        value       BIGINT NOT NULL DEFAULT 0,
+        updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS appointment_day_counts (
+        day         DATE NOT NULL,
+        status      TEXT NOT NULL,
+        count       BIGINT NOT NULL DEFAULT 0,
+        updated_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (day, status)
+    );
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_count_rows() RETURNS trigger AS $$
+    DECLARE
+        delta BIGINT;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT count(*) INTO delta FROM new_rows;
+        ELSE
+            SELECT -count(*) INTO delta FROM old_rows;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE dashboard_counters
+               SET value = value + delta, updated_at = now()
+             WHERE name = TG_TABLE_NAME;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_count_appointment_days() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO appointment_day_counts AS c (day, status, count)
+            SELECT appointment_time::date, COALESCE(status, ''), count(*)
+              FROM new_rows
+             WHERE appointment_time IS NOT NULL
+             GROUP BY 1, 2
+            ON CONFLICT (day, status)
+            DO UPDATE SET count = c.count + EXCLUDED.count, updated_at = now();
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO appointment_day_counts AS c (day, status, count)
+            SELECT appointment_time::date, COALESCE(status, ''), -count(*)
+              FROM old_rows
+             WHERE appointment_time IS NOT NULL
+             GROUP BY 1, 2
+            ON CONFLICT (day, status)
+            DO UPDATE SET count = c.count + EXCLUDED.count, updated_at = now();
+        ELSE
+            -- Net movement between (day, status) buckets; unchanged rows cancel out
+            INSERT INTO appointment_day_counts AS c (day, status, count)
+            SELECT day, status, sum(n)
+              FROM (
+                    SELECT appointment_time::date AS day, COALESCE(status, '') AS status, 1 AS n
+                      FROM new_rows
+                     WHERE appointment_time IS NOT NULL
+                    UNION ALL
+                    SELECT appointment_time::date, COALESCE(status, ''), -1
+                      FROM old_rows
+                     WHERE appointment_time IS NOT NULL
+              ) d
+             GROUP BY day, status
+            HAVING sum(n) <> 0
+            ON CONFLICT (day, status)
+            DO UPDATE SET count = c.count + EXCLUDED.count, updated_at = now();
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    # Transition tables allow one event per trigger; each function only reads
+    # new_rows / old_rows on the TG_OP branch where the trigger defines them
+    """
+    DROP TRIGGER IF EXISTS patients_count_insert ON patients;
+    DROP TRIGGER IF EXISTS patients_count_delete ON patients;
+    DROP TRIGGER IF EXISTS doctors_count_insert ON doctors;
+    DROP TRIGGER IF EXISTS doctors_count_delete ON doctors;
+    DROP TRIGGER IF EXISTS appointments_count_insert ON appointments;
+    DROP TRIGGER IF EXISTS appointments_count_delete ON appointments;
+    DROP TRIGGER IF EXISTS appointments_days_insert ON appointments;
+    DROP TRIGGER IF EXISTS appointments_days_update ON appointments;
+    DROP TRIGGER IF EXISTS appointments_days_delete ON appointments;
+    """,
+    """
+    CREATE TRIGGER patients_count_insert AFTER INSERT ON patients
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows();
+    CREATE TRIGGER patients_count_delete AFTER DELETE ON patients
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows();
+    CREATE TRIGGER doctors_count_insert AFTER INSERT ON doctors
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows();
+    CREATE TRIGGER doctors_count_delete AFTER DELETE ON doctors
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows();
+    CREATE TRIGGER appointments_count_insert AFTER INSERT ON appointments
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows();
+    CREATE TRIGGER appointments_count_delete AFTER DELETE ON appointments
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows();
+    """,
+    """
+    CREATE TRIGGER appointments_days_insert AFTER INSERT ON appointments
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_appointment_days();
+    CREATE TRIGGER appointments_days_update AFTER UPDATE ON appointments
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_appointment_days();
+    CREATE TRIGGER appointments_days_delete AFTER DELETE ON appointments
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_appointment_days();
+    """,
+    """
+    CREATE OR REPLACE FUNCTION refresh_dashboard_rollups() RETURNS void AS $$
+    BEGIN
+        LOCK TABLE patients, doctors, appointments IN SHARE MODE;
+
+        INSERT INTO dashboard_counters (name, value)
+        VALUES ('patients', (SELECT count(*) FROM patients)),
+               ('doctors', (SELECT count(*) FROM doctors)),
+               ('appointments', (SELECT count(*) FROM appointments))
+        ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value, updated_at = now();
+
+        DELETE FROM appointment_day_counts;
+        INSERT INTO appointment_day_counts (day, status, count)
+        SELECT appointment_time::date, COALESCE(status, ''), count(*)
+          FROM appointments
+         WHERE appointment_time IS NOT NULL
+         GROUP BY 1, 2;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    SELECT refresh_dashboard_rollups();
+    """,
+]
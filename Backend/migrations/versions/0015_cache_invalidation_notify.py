@@ -0,0 +1,82 @@
+"""
+Notify the Dashboard response cache (api/Utils/response_cache.py) of writes
+to the tables its routes read. The payload is a space-separated list of the
+tags to drop:
+
+- appointments: `appointments` plus `appointments:doctor:<id>` for the old
+  and new doctor, so a write for one doctor leaves the other doctors'
+  filtered lists cached
+- patients: `patients`, plus `appointments` when a name changes (appointment
+  lists show patient names)
+- doctor_availability: `availability:doctor:<id>`
+
+Doctors already notify `doctors_changed` (migration 0002). Identical
+payloads within one transaction are collapsed by Postgres, so a bulk
+statement sends one notification per distinct tag list.
+"""
+
+DESCRIPTION = "NOTIFY cache_invalidate with response cache tags on appointment, patient and availability writes"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_cache_appointments() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('cache_invalidate', 'appointments appointments:doctor:' || OLD.doctor_id);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('cache_invalidate', 'appointments appointments:doctor:' || NEW.doctor_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION notify_cache_patients() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.full_name IS DISTINCT FROM OLD.full_name THEN
+            PERFORM pg_notify('cache_invalidate', 'patients appointments');
+        ELSE
+            PERFORM pg_notify('cache_invalidate', 'patients');
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION notify_cache_availability() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('cache_invalidate', 'availability:doctor:' || OLD.doctor_id);
+        ELSE
+            PERFORM pg_notify('cache_invalidate', 'availability:doctor:' || NEW.doctor_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS appointments_cache_invalidate ON appointments;
+    DROP TRIGGER IF EXISTS patients_cache_invalidate ON patients;
+    DROP TRIGGER IF EXISTS doctor_availability_cache_invalidate ON doctor_availability;
+    """,
+    # Only the columns the Dashboard routes return or filter on
+    """
+    CREATE TRIGGER appointments_cache_invalidate
+        AFTER INSERT OR DELETE OR UPDATE OF appointment_time, status, patient_id, doctor_id, duration, calendar_event_id
+        ON appointments
+        FOR EACH ROW EXECUTE FUNCTION notify_cache_appointments();
+    """,
+    """
+    CREATE TRIGGER patients_cache_invalidate
+        AFTER INSERT OR DELETE OR UPDATE OF full_name, dob, phone_number, status, doctor_id
+        ON patients
+        FOR EACH ROW EXECUTE FUNCTION notify_cache_patients();
+    """,
+    """
+    CREATE TRIGGER doctor_availability_cache_invalidate
+        AFTER INSERT OR DELETE OR UPDATE
+        ON doctor_availability
+        FOR EACH ROW EXECUTE FUNCTION notify_cache_availability();
+    """,
+]
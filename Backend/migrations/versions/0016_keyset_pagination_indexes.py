@@ -0,0 +1,33 @@
+"""
+Indexes for keyset pagination of the Dashboard /appointments and /patients
+lists (ordered by (appointment_time, id) and by id):
+
+- (appointment_time, id) and (doctor_id, appointment_time, id) replace the
+  0001 indexes without the id tie-breaker, so the page condition
+  `(appointment_time, id) > (%s, %s)` is an index bound instead of a filter;
+  every query that used the old indexes still has them as a prefix
+- patients (doctor_id, id) for the doctor filter on /patients
+"""
+
+DESCRIPTION = "Keyset pagination indexes for /appointments and /patients"
+
+UP = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointments_time_id
+        ON appointments (appointment_time, id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointments_doctor_time_id
+        ON appointments (doctor_id, appointment_time, id);
+    """,
+    """
+    DROP INDEX IF EXISTS idx_appointments_time;
+    """,
+    """
+    DROP INDEX IF EXISTS idx_appointments_doctor_time;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_patients_doctor_id
+        ON patients (doctor_id, id);
+    """,
+]
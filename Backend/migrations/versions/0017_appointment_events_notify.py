@@ -0,0 +1,65 @@
+"""
+Publish appointment bookings, reschedules and cancellations on the
+`appointment_events` channel for the live change feed
+(api/Utils/change_feed.py), whichever worker or endpoint made the write.
+
+The payload is a small JSON object:
+    {"type": "created" | "rescheduled" | "cancelled" | "updated" | "deleted",
+     "appointment_id", "patient_id", "doctor_id", "appointment_time", "status",
+     "old_doctor_id", "old_appointment_time"}
+
+`old_*` are set on updates, so a dashboard filtered on the previous doctor
+also sees an appointment moved away from it. Notifications are delivered on
+commit; rolled back writes publish nothing.
+"""
+
+DESCRIPTION = "NOTIFY appointment_events with a JSON change event on appointment writes"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_appointment_events() RETURNS trigger AS $$
+    DECLARE
+        event_type TEXT;
+        row_data appointments;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            event_type := 'created';
+            row_data := NEW;
+        ELSIF TG_OP = 'DELETE' THEN
+            event_type := 'deleted';
+            row_data := OLD;
+        ELSIF NEW.status = 'cancelled' AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+            event_type := 'cancelled';
+            row_data := NEW;
+        ELSIF NEW.appointment_time IS DISTINCT FROM OLD.appointment_time
+              OR NEW.doctor_id IS DISTINCT FROM OLD.doctor_id THEN
+            event_type := 'rescheduled';
+            row_data := NEW;
+        ELSE
+            event_type := 'updated';
+            row_data := NEW;
+        END IF;
+
+        PERFORM pg_notify('appointment_events', json_build_object(
+            'type', event_type,
+            'appointment_id', row_data.id,
+            'patient_id', row_data.patient_id,
+            'doctor_id', row_data.doctor_id,
+            'appointment_time', row_data.appointment_time,
+            'status', row_data.status,
+            'old_doctor_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.doctor_id END,
+            'old_appointment_time', CASE WHEN TG_OP = 'UPDATE' THEN OLD.appointment_time END
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS appointments_events ON appointments;
+    """,
+    """
+    CREATE TRIGGER appointments_events
+        AFTER INSERT OR DELETE OR UPDATE OF appointment_time, status, doctor_id ON appointments
+        FOR EACH ROW EXECUTE FUNCTION notify_appointment_events();
+    """,
+]
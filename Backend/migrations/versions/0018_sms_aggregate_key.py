@@ -0,0 +1,186 @@
+"""
+Give SMS outbox jobs their own ordering key, `appointment:<id>:sms`.
+
+They used to share `appointment:<id>` with the calendar jobs, and the outbox
+only claims a job once every earlier job with its key is done. A calendar
+job deferred by an open Google Calendar breaker therefore held back the
+booking, cancellation and reminder SMS of that appointment for as long as
+the outage lasted. SMS stay ordered among themselves (booked before
+cancelled), calendar jobs among themselves.
+
+book_appointment_tx() is redefined with the new key for the booked SMS, and
+SMS jobs still waiting in the outbox are moved to it.
+"""
+
+DESCRIPTION = "Separate outbox ordering key for SMS jobs"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION book_appointment_tx(
+        p_patient_id   INTEGER,
+        p_doctor_id    INTEGER,
+        p_slot         TIMESTAMP,
+        p_phone        TEXT,
+        p_hold_token   UUID,
+        p_duration     INTEGER,
+        p_sms_body     TEXT,
+        p_event_prefix TEXT
+    ) RETURNS TABLE (
+        outcome           TEXT,
+        appointment_id    INTEGER,
+        old_doctor_id     INTEGER,
+        old_time          TIMESTAMP,
+        calendar_event_id TEXT
+    ) AS $$
+    #variable_conflict use_column
+    DECLARE
+        v_existing_id     INTEGER;
+        v_old_doctor_id   INTEGER;
+        v_old_time        TIMESTAMP;
+        v_old_event_id    TEXT;
+        v_slot_id         BIGINT;
+        v_appointment_id  INTEGER;
+        v_event_id        TEXT;
+        v_calendar_id     TEXT;
+        v_patient_name    TEXT;
+        v_aggregate_key   TEXT;
+        v_slot_key        TEXT := to_char(p_slot, 'YYYY-MM-DD"T"HH24:MI:SS');
+    BEGIN
+        -- Existing appointment, locked so reschedules of one patient serialize
+        SELECT a.id, a.doctor_id, a.appointment_time, a.calendar_event_id
+          INTO v_existing_id, v_old_doctor_id, v_old_time, v_old_event_id
+          FROM appointments a
+         WHERE a.patient_id = p_patient_id
+           FOR UPDATE;
+
+        IF v_existing_id IS NOT NULL
+           AND v_old_doctor_id = p_doctor_id AND v_old_time = p_slot THEN
+            RETURN QUERY SELECT 'unchanged'::text, v_existing_id, NULL::integer,
+                                NULL::timestamp, v_old_event_id;
+            RETURN;
+        END IF;
+
+        -- Reserve the requested slot (same condition as reservations.RESERVE_SLOT)
+        UPDATE doctor_slots s
+           SET is_available = false,
+               hold_token = NULL,
+               held_until = NULL,
+               held_by = NULL
+         WHERE s.doctor_id = p_doctor_id
+           AND s.slot_date = p_slot::date
+           AND s.slot_time = p_slot::time
+           AND s.appointment_id IS NULL
+           AND (s.is_available
+                OR s.hold_token = p_hold_token
+                OR (s.hold_token IS NOT NULL AND s.held_until <= now()))
+        RETURNING s.id INTO v_slot_id;
+
+        IF v_slot_id IS NULL THEN
+            RETURN QUERY
+                SELECT CASE WHEN EXISTS (
+                           SELECT 1 FROM doctor_slots s
+                            WHERE s.doctor_id = p_doctor_id
+                              AND s.slot_date = p_slot::date
+                              AND s.slot_time = p_slot::time)
+                       THEN 'slot_taken' ELSE 'not_offered' END,
+                       NULL::integer, NULL::integer, NULL::timestamp, NULL::text;
+            RETURN;
+        END IF;
+
+        IF v_existing_id IS NOT NULL THEN
+            -- Free the old slot and move the appointment
+            UPDATE doctor_slots s
+               SET is_available = true,
+                   appointment_id = NULL,
+                   hold_token = NULL,
+                   held_until = NULL,
+                   held_by = NULL
+             WHERE s.doctor_id = v_old_doctor_id
+               AND s.slot_date = v_old_time::date
+               AND s.slot_time = v_old_time::time;
+
+            UPDATE appointments a
+               SET doctor_id = p_doctor_id,
+                   appointment_time = p_slot,
+                   status = 'scheduled'
+             WHERE a.id = v_existing_id;
+            v_appointment_id := v_existing_id;
+        ELSE
+            INSERT INTO appointments (patient_id, doctor_id, appointment_time, status, duration)
+            VALUES (p_patient_id, p_doctor_id, p_slot, 'scheduled', p_duration)
+            RETURNING id INTO v_appointment_id;
+        END IF;
+
+        UPDATE doctor_slots s SET appointment_id = v_appointment_id WHERE s.id = v_slot_id;
+
+        UPDATE patients p
+           SET phone_number = p_phone,
+               doctor_id = p_doctor_id
+         WHERE p.id = p_patient_id
+        RETURNING p.full_name INTO v_patient_name;
+
+        -- Side effects for the outbox worker (topics as in api/Utils/side_effects.py)
+        v_aggregate_key := 'appointment:' || v_appointment_id;
+
+        IF p_phone <> '' AND p_sms_body IS NOT NULL THEN
+            -- SMS are ordered among themselves, never behind calendar jobs
+            INSERT INTO outbox (topic, aggregate_key, idempotency_key, payload)
+            VALUES ('sms.send', v_aggregate_key || ':sms',
+                    v_aggregate_key || ':sms:booked:' || p_doctor_id || ':' || v_slot_key,
+                    jsonb_build_object('to', p_phone, 'body', p_sms_body))
+            ON CONFLICT (idempotency_key) DO NOTHING;
+        END IF;
+
+        IF v_existing_id IS NOT NULL AND v_old_event_id IS NOT NULL THEN
+            -- Move the existing event (it stays on the original doctor's calendar)
+            v_event_id := v_old_event_id;
+            SELECT NULLIF(d.email, '') INTO v_calendar_id FROM doctors d WHERE d.id = v_old_doctor_id;
+            IF v_calendar_id IS NOT NULL THEN
+                INSERT INTO outbox (topic, aggregate_key, idempotency_key, payload)
+                VALUES ('calendar.update', v_aggregate_key,
+                        v_aggregate_key || ':calendar.update:' || p_doctor_id || ':' || v_slot_key,
+                        jsonb_build_object(
+                            'appointment_id', v_appointment_id,
+                            'patient_name', v_patient_name,
+                            'start', v_slot_key,
+                            'duration', p_duration,
+                            'calendar_id', v_calendar_id,
+                            'event_id', v_event_id))
+                ON CONFLICT (idempotency_key) DO NOTHING;
+            END IF;
+        ELSE
+            -- Deterministic event id (side_effects.calendar_event_id_for)
+            v_event_id := p_event_prefix || CASE
+                WHEN v_appointment_id < 100000000 THEN lpad(v_appointment_id::text, 8, '0')
+                ELSE v_appointment_id::text END;
+            UPDATE appointments a SET calendar_event_id = v_event_id WHERE a.id = v_appointment_id;
+            SELECT NULLIF(d.email, '') INTO v_calendar_id FROM doctors d WHERE d.id = p_doctor_id;
+            IF v_calendar_id IS NOT NULL THEN
+                INSERT INTO outbox (topic, aggregate_key, idempotency_key, payload)
+                VALUES ('calendar.create', v_aggregate_key,
+                        v_aggregate_key || ':calendar.create',
+                        jsonb_build_object(
+                            'appointment_id', v_appointment_id,
+                            'patient_name', v_patient_name,
+                            'start', v_slot_key,
+                            'duration', p_duration,
+                            'calendar_id', v_calendar_id))
+                ON CONFLICT (idempotency_key) DO NOTHING;
+            END IF;
+        END IF;
+
+        RETURN QUERY SELECT
+            CASE WHEN v_existing_id IS NOT NULL THEN 'rescheduled' ELSE 'booked' END,
+            v_appointment_id, v_old_doctor_id, v_old_time, v_event_id;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    UPDATE outbox
+       SET aggregate_key = aggregate_key || ':sms'
+     WHERE topic = 'sms.send'
+       AND status IN ('pending', 'processing')
+       AND aggregate_key LIKE 'appointment:%'
+       AND aggregate_key NOT LIKE '%:sms';
+    """,
+]
@@ -0,0 +1,29 @@
+"""
+Narrow the cache invalidation of patient writes (migration 0015).
+
+/appointments listed `patients` among its cache tags because it shows
+patient names, and every booking updates the patient row, so every
+booking dropped every cached appointment page, filtered or not. The
+appointment lists now carry a `patient_names` tag instead, and patient
+writes notify it only when a name changes:
+
+- name change: `patients patient_names`
+- any other write: `patients`
+"""
+
+DESCRIPTION = "Notify patient_names instead of appointments when a patient name changes"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_cache_patients() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.full_name IS DISTINCT FROM OLD.full_name THEN
+            PERFORM pg_notify('cache_invalidate', 'patients patient_names');
+        ELSE
+            PERFORM pg_notify('cache_invalidate', 'patients');
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
@@ -0,0 +1,55 @@
+"""
+Emit `cancelled` on the `appointment_events` channel when a scheduled
+appointment is deleted.
+
+Every cancellation path (Bland cancel, bulk cancel) deletes the row rather
+than setting status 'cancelled', so the feed from migration 0017 reported
+cancellations as `deleted` and never sent `cancelled`. Deleting a
+scheduled appointment now publishes `cancelled`; deleting one in any other
+status stays `deleted`. A status update to 'cancelled' still publishes
+`cancelled` too.
+"""
+
+DESCRIPTION = "Publish appointment_events 'cancelled' when a scheduled appointment is deleted"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_appointment_events() RETURNS trigger AS $$
+    DECLARE
+        event_type TEXT;
+        row_data appointments;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            event_type := 'created';
+            row_data := NEW;
+        ELSIF TG_OP = 'DELETE' THEN
+            -- Cancelling an appointment deletes its row
+            event_type := CASE WHEN OLD.status = 'scheduled' THEN 'cancelled' ELSE 'deleted' END;
+            row_data := OLD;
+        ELSIF NEW.status = 'cancelled' AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+            event_type := 'cancelled';
+            row_data := NEW;
+        ELSIF NEW.appointment_time IS DISTINCT FROM OLD.appointment_time
+              OR NEW.doctor_id IS DISTINCT FROM OLD.doctor_id THEN
+            event_type := 'rescheduled';
+            row_data := NEW;
+        ELSE
+            event_type := 'updated';
+            row_data := NEW;
+        END IF;
+
+        PERFORM pg_notify('appointment_events', json_build_object(
+            'type', event_type,
+            'appointment_id', row_data.id,
+            'patient_id', row_data.patient_id,
+            'doctor_id', row_data.doctor_id,
+            'appointment_time', row_data.appointment_time,
+            'status', row_data.status,
+            'old_doctor_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.doctor_id END,
+            'old_appointment_time', CASE WHEN TG_OP = 'UPDATE' THEN OLD.appointment_time END
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
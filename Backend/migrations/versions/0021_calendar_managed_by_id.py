@@ -0,0 +1,21 @@
+"""
+Stop treating mirrored calendar events as managed because of their title.
+
+calendar_sync used to flag any event whose summary starts with
+"Appointment with " as created by this service, so a doctor's personal
+event with that title could be deleted as an orphan. Ownership is now
+decided by the event id prefix (or a private extended property set on
+insert); mirror rows flagged by title alone are cleared here and re-flagged
+from the property on the next change of the event.
+"""
+
+DESCRIPTION = "Clear calendar_events.managed for events not created with a service event id"
+
+UP = [
+    """
+    UPDATE calendar_events
+       SET managed = false
+     WHERE managed
+       AND event_id NOT LIKE 'mdappt%';
+    """,
+]
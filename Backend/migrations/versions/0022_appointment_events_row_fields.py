@@ -0,0 +1,79 @@
+"""
+Carry the listed fields on `appointment_events` so dashboards can apply a
+change in place instead of refetching /appointments.
+
+The payload from migrations 0017 and 0020 gains the columns a row of
+/appointments shows that the appointments table does not hold:
+    "patient_name", "doctor_name", "department", "duration",
+    "calendar_event_id", "old_department"
+
+`old_department` is set on updates like the other `old_*` fields, so a
+department view sees an appointment moved to another department leave.
+Names are looked up by primary key, one row each, inside the writing
+transaction.
+"""
+
+DESCRIPTION = "Add patient, doctor and department fields to appointment_events payloads"
+
+UP = [
+    """
+    CREATE OR REPLACE FUNCTION notify_appointment_events() RETURNS trigger AS $$
+    DECLARE
+        event_type TEXT;
+        row_data appointments;
+        patient_name TEXT;
+        doctor_name TEXT;
+        doctor_department TEXT;
+        old_department TEXT;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            event_type := 'created';
+            row_data := NEW;
+        ELSIF TG_OP = 'DELETE' THEN
+            -- Cancelling an appointment deletes its row
+            event_type := CASE WHEN OLD.status = 'scheduled' THEN 'cancelled' ELSE 'deleted' END;
+            row_data := OLD;
+        ELSIF NEW.status = 'cancelled' AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+            event_type := 'cancelled';
+            row_data := NEW;
+        ELSIF NEW.appointment_time IS DISTINCT FROM OLD.appointment_time
+              OR NEW.doctor_id IS DISTINCT FROM OLD.doctor_id THEN
+            event_type := 'rescheduled';
+            row_data := NEW;
+        ELSE
+            event_type := 'updated';
+            row_data := NEW;
+        END IF;
+
+        SELECT p.full_name INTO patient_name FROM patients p WHERE p.id = row_data.patient_id;
+        SELECT d.name, d.department INTO doctor_name, doctor_department
+          FROM doctors d WHERE d.id = row_data.doctor_id;
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.doctor_id IS DISTINCT FROM NEW.doctor_id THEN
+                SELECT d.department INTO old_department FROM doctors d WHERE d.id = OLD.doctor_id;
+            ELSE
+                old_department := doctor_department;
+            END IF;
+        END IF;
+
+        PERFORM pg_notify('appointment_events', json_build_object(
+            'type', event_type,
+            'appointment_id', row_data.id,
+            'patient_id', row_data.patient_id,
+            'patient_name', patient_name,
+            'doctor_id', row_data.doctor_id,
+            'doctor_name', doctor_name,
+            'department', doctor_department,
+            'appointment_time', row_data.appointment_time,
+            'status', row_data.status,
+            'duration', row_data.duration,
+            'calendar_event_id', row_data.calendar_event_id,
+            'old_doctor_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.doctor_id END,
+            'old_appointment_time', CASE WHEN TG_OP = 'UPDATE' THEN OLD.appointment_time END,
+            'old_department', old_department
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
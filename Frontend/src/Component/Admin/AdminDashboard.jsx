@@ -31,6 +31,13 @@ import {
 import Calendar from 'react-calendar';
 import { format } from 'date-fns';
 import 'react-calendar/dist/Calendar.css';
+import {
+  applyAppointmentEvent,
+  eventCountChange,
+  eventInRange,
+  sameId,
+  subscribeAppointmentFeed,
+} from '../appointmentFeed';
 import './Admin.css';
 
 ChartJS.register(
@@ -69,6 +76,32 @@ const fetchWithRetry = async (url, retries = MAX_RETRIES) => {
   }
 };
 
+// /patients and /appointments are keyset-paginated: one page per request
+const fetchPage = (url, cursor = null, limit = 100) => {
+  const separator = url.includes('?') ? '&' : '?';
+  return fetchWithRetry(`${url}${separator}limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`);
+};
+
+// Every row of a date range (inclusive 'YYYY-MM-DD' bounds); only the range
+// on screen is requested, so a busy range takes a few pages at most
+const fetchRange = async (url, key, dateFrom, dateTo) => {
+  const separator = url.includes('?') ? '&' : '?';
+  const rangeUrl = `${url}${separator}date_from=${dateFrom}&date_to=${dateTo}&order=asc`;
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(rangeUrl, cursor, 500);
+    items.push(...(page[key] || []));
+    cursor = page.next_cursor;
+  } while (cursor);
+  return items;
+};
+
+const monthBounds = (year, month) => [
+  new Date(year, month, 1).toLocaleDateString('en-CA'),
+  new Date(year, month + 1, 0).toLocaleDateString('en-CA'),
+];
+
 // Update department icons mapping
 const departmentIcons = {
   'Cardiology': <Heart size={24} />,
@@ -105,6 +138,9 @@ export const AdminDashboard = () =>{
   const [loadingStats, setLoadingStats] = useState(false);
 
   const [patients, setPatients] = useState([]);
+  const [patientsCursor, setPatientsCursor] = useState(null);
+  const [patientsTotal, setPatientsTotal] = useState(null);
+  const [loadingMorePatients, setLoadingMorePatients] = useState(false);
 
   // Add error handling state
   const [errors, setErrors] = useState({
@@ -142,8 +178,10 @@ export const AdminDashboard = () =>{
   const [departments, setDepartments] = useState([]);
   const [loadingDepartments, setLoadingDepartments] = useState(false);
 
-  const [allAppointments, setAllAppointments] = useState([]);
-  const [loadingAllAppointments, setLoadingAllAppointments] = useState(false);
+  const [departmentCounts, setDepartmentCounts] = useState({});
+  const [monthAppointments, setMonthAppointments] = useState([]);
+  const [loadingMonthAppointments, setLoadingMonthAppointments] = useState(false);
+  const [appointmentsReloadKey, setAppointmentsReloadKey] = useState(0);
 
   const [selectedDepartmentDoctor, setSelectedDepartmentDoctor] = useState('');
 
@@ -489,6 +527,12 @@ export const AdminDashboard = () =>{
     }
   }, [view]);
 
+  const patientsUrl = () => (
+    selectedDepartmentFilter
+      ? `https://medical-assistant1.onrender.com/patients?department=${encodeURIComponent(selectedDepartmentFilter)}`
+      : 'https://medical-assistant1.onrender.com/patients'
+  );
+
   useEffect(() => {
     if (view === 'patients') {
       const fetchPatients = async () => {
@@ -496,8 +540,12 @@ export const AdminDashboard = () =>{
         setErrors(prev => ({ ...prev, patients: null }));
 
         try {
-          const data = await fetchWithRetry('https://medical-assistant1.onrender.com/patients');
-          setPatients(data.patients || []);
+          // First page only; the department filter runs server-side and
+          // further pages load on demand
+          const page = await fetchPage(patientsUrl());
+          setPatients(page.patients || []);
+          setPatientsCursor(page.next_cursor);
+          setPatientsTotal(page.total_is_estimate ? `~${page.total}` : page.total);
         } catch (error) {
           console.error('Error loading patients:', error);
           setErrors(prev => ({ ...prev, patients: error.message }));
@@ -508,7 +556,22 @@ export const AdminDashboard = () =>{
 
       fetchPatients();
     }
-  }, [view]);
+  }, [view, selectedDepartmentFilter]);
+
+  const loadMorePatients = async () => {
+    if (!patientsCursor || loadingMorePatients) return;
+    setLoadingMorePatients(true);
+    try {
+      const page = await fetchPage(patientsUrl(), patientsCursor);
+      setPatients(prev => [...prev, ...(page.patients || [])]);
+      setPatientsCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error loading patients:', error);
+      setErrors(prev => ({ ...prev, patients: error.message }));
+    } finally {
+      setLoadingMorePatients(false);
+    }
+  };
 
   useEffect(() => {
     if (!selectedDoctor) {
@@ -516,13 +579,13 @@ export const AdminDashboard = () =>{
       return;
     }
 
+    const [dateFrom, dateTo] = monthBounds(displayYear, displayMonth);
     setLoading(prev => ({ ...prev, appointments: true }));
-    fetch(`https://medical-assistant1.onrender.com/appointments?doctor_id=${selectedDoctor}`)
-      .then(res => res.json())
-      .then(data => setAppointments(data.appointments))
+    fetchRange(`https://medical-assistant1.onrender.com/appointments?doctor_id=${selectedDoctor}`, 'appointments', dateFrom, dateTo)
+      .then(appointments => setAppointments(appointments))
       .catch(() => setError('Failed to load appointments.'))
       .finally(() => setLoading(prev => ({ ...prev, appointments: false })));
-  }, [selectedDoctor]);
+  }, [selectedDoctor, displayYear, displayMonth, appointmentsReloadKey]);
 
   useEffect(() => {
     if (showLogin) return;
@@ -648,44 +711,103 @@ export const AdminDashboard = () =>{
     if (patients.length > 0) {
       let filtered = [...patients];
 
-      // Filter by search term
+      // Filter the loaded pages by search term; the department is filtered server-side
       if (patientSearch) {
         filtered = filtered.filter(patient =>
           patient.full_name.toLowerCase().includes(patientSearch.toLowerCase())
         );
       }
 
-      // Filter by department
-      if (selectedDepartmentFilter) {
-        filtered = filtered.filter(patient =>
-          patient.department === selectedDepartmentFilter
-        );
-      }
-
       setFilteredPatients(filtered);
     } else {
       setFilteredPatients([]);
     }
-  }, [patients, patientSearch, selectedDepartmentFilter]);
+  }, [patients, patientSearch]);
+
+  // Department cards only need counts, not the rows behind them
+  useEffect(() => {
+    const fetchDepartmentCounts = async () => {
+      try {
+        const counts = await fetchWithRetry('https://medical-assistant1.onrender.com/dashboard/appointments-by-department');
+        setDepartmentCounts(Object.fromEntries(
+          (counts.data || []).map(item => [item.department, item])
+        ));
+      } catch (error) {
+        console.error('Error fetching department counts:', error);
+        setError('Failed to load appointments.');
+      }
+    };
+
+    if (view === 'appointments') {
+      fetchDepartmentCounts();
+    }
+  }, [view, appointmentsReloadKey]);
 
+  // A department's appointments for the month on screen
   useEffect(() => {
-    const fetchAllAppointments = async () => {
-      setLoadingAllAppointments(true);
+    const fetchMonthAppointments = async () => {
+      setLoadingMonthAppointments(true);
       try {
-        const response = await fetchWithRetry('https://medical-assistant1.onrender.com/appointments');
-        setAllAppointments(response.appointments || []);
+        const [dateFrom, dateTo] = monthBounds(displayYear, displayMonth);
+        const appointments = await fetchRange(
+          `https://medical-assistant1.onrender.com/appointments?department=${encodeURIComponent(selectedDepartment)}`,
+          'appointments', dateFrom, dateTo
+        );
+        setMonthAppointments(appointments);
       } catch (error) {
         console.error('Error fetching appointments:', error);
         setError('Failed to load appointments.');
       } finally {
-        setLoadingAllAppointments(false);
+        setLoadingMonthAppointments(false);
       }
     };
 
-    if (view === 'appointments') {
-      fetchAllAppointments();
+    if (view === 'appointments' && selectedDepartment) {
+      fetchMonthAppointments();
+    } else {
+      setMonthAppointments([]);
     }
-  }, [view]);
+  }, [view, selectedDepartment, displayYear, displayMonth, appointmentsReloadKey]);
+
+  // Read by the feed handler, so changing month or department keeps the same connection
+  const appointmentsScopeRef = useRef(null);
+  useEffect(() => {
+    appointmentsScopeRef.current = { selectedDepartment, selectedDoctor, displayYear, displayMonth };
+  }, [selectedDepartment, selectedDoctor, displayYear, displayMonth]);
+
+  // Live feed: apply every change to the counts and the lists on screen,
+  // refetch only on resync
+  useEffect(() => {
+    if (showLogin) return;
+    return subscribeAppointmentFeed(
+      'https://medical-assistant1.onrender.com/appointments/events',
+      (type, event) => {
+        const scope = appointmentsScopeRef.current;
+        const [dateFrom, dateTo] = monthBounds(scope.displayYear, scope.displayMonth);
+
+        setDepartmentCounts(prev => {
+          const next = { ...prev };
+          new Set([event.department, event.old_department].filter(Boolean)).forEach(department => {
+            const current = next[department] || { department, count: 0, doctors: 0 };
+            next[department] = {
+              ...current,
+              count: current.count + eventCountChange(type, event, 'department', department),
+            };
+          });
+          return next;
+        });
+        if (scope.selectedDepartment) {
+          setMonthAppointments(prev => applyAppointmentEvent(prev, type, event,
+            e => sameId(e.department, scope.selectedDepartment) && eventInRange(e, dateFrom, dateTo)));
+        }
+        if (scope.selectedDoctor) {
+          setAppointments(prev => applyAppointmentEvent(prev, type, event,
+            e => sameId(e.doctor_id, scope.selectedDoctor) && eventInRange(e, dateFrom, dateTo)));
+        }
+      },
+      () => setAppointmentsReloadKey(key => key + 1),
+    );
+  }, [showLogin]);
 
   useEffect(() => {
     // Update useEffect for session check
@@ -1032,9 +1154,8 @@ export const AdminDashboard = () =>{
 
   const renderAppointments = () => {
     if (!showLogin && view === 'appointments') {
-      const departmentAppointments = selectedDepartment 
-        ? allAppointments.filter(apt => apt.department === selectedDepartment)
-        : [];
+      // Already narrowed to the selected department and displayed month
+      const departmentAppointments = selectedDepartment ? monthAppointments : [];
 
       // Get unique doctors who have appointments in this department
       const doctorsWithAppointments = [...new Set(departmentAppointments.map(apt => apt.doctor_name))];
@@ -1093,15 +1214,12 @@ export const AdminDashboard = () =>{
 
           {error && <div className="error-alert">{error}</div>}
           
-          {loadingAllAppointments ? (
-            <div className="loading-state">Loading appointments...</div>
-          ) : !selectedDepartment ? (
+          {!selectedDepartment ? (
             <div className="departments-grid">
               {departments
                 .filter(dept => !dept.toLowerCase().includes('temp'))
                 .map((department) => {
-                  const deptAppointments = allAppointments.filter(apt => apt.department === department);
-                  const uniqueDoctors = [...new Set(deptAppointments.map(apt => apt.doctor_name))];
+                  const deptCounts = departmentCounts[department] || { count: 0, doctors: 0 };
                   return (
                     <div
                       key={department}
@@ -1113,7 +1231,7 @@ export const AdminDashboard = () =>{
                       </div>
                       <h3 className="department-name">{department}</h3>
                       <div className="appointment-count">
-                        {deptAppointments.length} Appointments ({uniqueDoctors.length} Doctors)
+                        {deptCounts.count} Appointments ({deptCounts.doctors} Doctors)
                       </div>
                     </div>
                   );
@@ -1130,7 +1248,9 @@ export const AdminDashboard = () =>{
                 </div>
               </div>
 
-              {doctorsWithAppointments.length > 0 ? (
+              {loadingMonthAppointments ? (
+                <div className="loading-state">Loading appointments...</div>
+              ) : doctorsWithAppointments.length > 0 ? (
                 <div className="doctors-appointments">
                   {Object.entries(appointmentsByDoctor).map(([doctorName, dateAppointments]) => (
                     <div key={doctorName} className="doctor-calendar-section">
@@ -1197,7 +1317,16 @@ export const AdminDashboard = () =>{
                 </div>
               ) : (
                 <div className="no-appointments">
-                  No appointments found for {selectedDepartment}
+                  <div className="calendar-header">
+                    <button className="month-nav-btn" onClick={handlePrevMonth}>
+                      <ArrowLeft size={16} />
+                    </button>
+                    <h3>{monthName} {displayYear}</h3>
+                    <button className="month-nav-btn" onClick={handleNextMonth}>
+                      <ArrowLeft size={16} style={{ transform: 'rotate(180deg)' }} />
+                    </button>
+                  </div>
+                  No appointments found for {selectedDepartment} in {monthName} {displayYear}
                 </div>
               )}
 
@@ -1407,6 +1536,17 @@ export const AdminDashboard = () =>{
                   No patients found matching your search criteria
                 </div>
                   )}
+              {patientsCursor && (
+                <button
+                  className="load-more-btn"
+                  onClick={loadMorePatients}
+                  disabled={loadingMorePatients}
+                >
+                  {loadingMorePatients
+                    ? 'Loading...'
+                    : `Load more (${patients.length} of ${patientsTotal ?? '?'})`}
+                </button>
+              )}
                 </div>
               )}
       </div>
@@ -1,7 +1,14 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import { CalendarDays, Clock } from 'lucide-react';
 import Calendar from 'react-calendar';
+import {
+  applyAppointmentEvent,
+  eventCountChange,
+  eventInRange,
+  sameId,
+  subscribeAppointmentFeed,
+} from '../appointmentFeed';
 import './Doctor.css'
 
 const formatTimeSlot = (timeStr) => {
@@ -35,6 +42,43 @@ const formatTimeSlot = (timeStr) => {
   }
 };
 
+const API_BASE = 'https://medical-assistant1.onrender.com';
+
+// YYYY-MM-DD in local time, as /appointments date_from / date_to expect
+const localDate = (d) => d.toLocaleDateString('en-CA');
+
+const monthBounds = (d) => [
+  localDate(new Date(d.getFullYear(), d.getMonth(), 1)),
+  localDate(new Date(d.getFullYear(), d.getMonth() + 1, 0)),
+];
+
+// Appointments of one doctor in a bounded range (a day or the month on screen);
+// /appointments is keyset-paginated, so a busy month may take a few pages
+const fetchAppointmentRange = async (doctorId, dateFrom, dateTo) => {
+  const appointments = [];
+  let cursor = null;
+  do {
+    const res = await fetch(
+      `${API_BASE}/appointments?doctor_id=${doctorId}&date_from=${dateFrom}&date_to=${dateTo}&order=asc&limit=500${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`
+    );
+    if (!res.ok) throw new Error(res.statusText);
+    const { appointments: page, next_cursor, error: apiErr } = await res.json();
+    if (apiErr) throw new Error(apiErr);
+    appointments.push(...(page || []));
+    cursor = next_cursor;
+  } while (cursor);
+  return appointments;
+};
+
+// The count alone: one row is fetched, `total` comes with the page
+const fetchAppointmentTotal = async (doctorId) => {
+  const res = await fetch(`${API_BASE}/appointments?doctor_id=${doctorId}&limit=1`);
+  if (!res.ok) throw new Error(res.statusText);
+  const { total, error: apiErr } = await res.json();
+  if (apiErr) throw new Error(apiErr);
+  return total || 0;
+};
+
 export const DoctorDashboard = () => {
   const location = useLocation();
   const navigate = useNavigate();
@@ -80,42 +124,28 @@ export const DoctorDashboard = () => {
   const doctorName = doctorInfo?.name;
   const doctorId = doctorInfo?.id;
 
-  const [dashboardData, setDashboardData] = useState({ totalAppointments: 0, todayAppointments: [] });
+  const [totalAppointments, setTotalAppointments] = useState(0);
+  const [todayAppointments, setTodayAppointments] = useState([]);
+  const [monthAppointments, setMonthAppointments] = useState([]);
+  const [activeMonth, setActiveMonth] = useState(new Date());
   const [loading, setLoading] = useState({ appointments: true, slots: false });
-  const [appointmentsCache, setAppointmentsCache] = useState({});
   const [timeSlots, setTimeSlots] = useState([]);
   const [selectedDate, setSelectedDate] = useState(new Date());
   const [error, setError] = useState(null);
 
-  const fetchAppointments = useCallback(async () => {
+  // Stats: the doctor's total and today's appointments
+  const fetchSummary = useCallback(async () => {
     if (!doctorId) return;
     setLoading(prev => ({ ...prev, appointments: true }));
     setError(null);
     try {
-      const res = await fetch(`https://medical-assistant1.onrender.com/appointments?doctor_id=${doctorId}`);
-      if (!res.ok) throw new Error(res.statusText);
-      const { appointments, error: apiErr } = await res.json();
-      if (apiErr) throw new Error(apiErr);
-
-      const byDate = {};
-      appointments.forEach(apt => {
-        const dt = new Date(apt.appointment_time);
-        const dateStr = dt.toISOString().split('T')[0];
-        const hh = dt.getHours().toString().padStart(2,'0');
-        const mm = dt.getMinutes().toString().padStart(2,'0');
-        const timeStr = `${hh}:${mm}`;
-        const period = dt.getHours() >= 12 ? 'PM' : 'AM';
-        const h12 = dt.getHours() % 12 || 12;
-        const formatted = `${h12}:${mm} ${period}`;
-
-        const obj = { ...apt, appointment_date: dateStr, formatted_time: formatted, time_for_comparison: timeStr, patient_name: apt.patient_name || 'Patient' };
-        byDate[dateStr] = byDate[dateStr] || [];
-        byDate[dateStr].push(obj);
-      });
-      setAppointmentsCache(byDate);
-
-      const today = new Date().toISOString().split('T')[0];
-      setDashboardData({ totalAppointments: appointments.length, todayAppointments: byDate[today] || [] });
+      const today = localDate(new Date());
+      const [total, todays] = await Promise.all([
+        fetchAppointmentTotal(doctorId),
+        fetchAppointmentRange(doctorId, today, today),
+      ]);
+      setTotalAppointments(total);
+      setTodayAppointments(todays);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -123,6 +153,36 @@ export const DoctorDashboard = () => {
     }
   }, [doctorId]);
 
+  // Calendar: only the month on screen
+  const fetchMonth = useCallback(async () => {
+    if (!doctorId) return;
+    try {
+      const [dateFrom, dateTo] = monthBounds(activeMonth);
+      setMonthAppointments(await fetchAppointmentRange(doctorId, dateFrom, dateTo));
+    } catch (err) {
+      setError(err.message);
+    }
+  }, [doctorId, activeMonth]);
+
+  const appointmentsCache = useMemo(() => {
+    const byDate = {};
+    monthAppointments.forEach(apt => {
+      const dt = new Date(apt.appointment_time);
+      const dateStr = dt.toISOString().split('T')[0];
+      const hh = dt.getHours().toString().padStart(2,'0');
+      const mm = dt.getMinutes().toString().padStart(2,'0');
+      const timeStr = `${hh}:${mm}`;
+      const period = dt.getHours() >= 12 ? 'PM' : 'AM';
+      const h12 = dt.getHours() % 12 || 12;
+      const formatted = `${h12}:${mm} ${period}`;
+
+      const obj = { ...apt, appointment_date: dateStr, formatted_time: formatted, time_for_comparison: timeStr, patient_name: apt.patient_name || 'Patient' };
+      byDate[dateStr] = byDate[dateStr] || [];
+      byDate[dateStr].push(obj);
+    });
+    return byDate;
+  }, [monthAppointments]);
+
   const fetchSlots = useCallback(async date => {
     if (!doctorId || !doctorName) return;
     if (date.getDay() === 0) {
@@ -149,9 +209,42 @@ export const DoctorDashboard = () => {
 
   useEffect(() => { 
     if (doctorId) {
-      fetchAppointments(); 
+      fetchSummary(); 
+    }
+  }, [fetchSummary, doctorId]);
+
+  useEffect(() => {
+    if (doctorId) {
+      fetchMonth();
     }
-  }, [fetchAppointments, doctorId]);
+  }, [fetchMonth, doctorId]);
+
+  // Read by the feed handlers, so paging the calendar keeps the same connection
+  const activeMonthRef = useRef(activeMonth);
+  const refetchRef = useRef(null);
+  useEffect(() => {
+    activeMonthRef.current = activeMonth;
+    refetchRef.current = () => { fetchSummary(); fetchMonth(); };
+  }, [activeMonth, fetchSummary, fetchMonth]);
+
+  // Live feed: apply this doctor's changes in place, refetch only on resync
+  useEffect(() => {
+    if (!doctorId) return;
+    const isMine = event => sameId(event.doctor_id, doctorId);
+    return subscribeAppointmentFeed(
+      `${API_BASE}/appointments/events?doctor_id=${doctorId}`,
+      (type, event) => {
+        const today = localDate(new Date());
+        const [monthFrom, monthTo] = monthBounds(activeMonthRef.current);
+        setTotalAppointments(prev => prev + eventCountChange(type, event, 'doctor_id', doctorId));
+        setTodayAppointments(prev => applyAppointmentEvent(prev, type, event,
+          e => isMine(e) && eventInRange(e, today, today)));
+        setMonthAppointments(prev => applyAppointmentEvent(prev, type, event,
+          e => isMine(e) && eventInRange(e, monthFrom, monthTo)));
+      },
+      () => refetchRef.current(),
+    );
+  }, [doctorId]);
 
   useEffect(() => { 
     if (doctorId && doctorName) {
@@ -175,11 +268,11 @@ export const DoctorDashboard = () => {
           <>
             <div className="stat-card">
               <CalendarDays size={24} />
-              <div><h3>Total Appointments</h3><p className="stat-number">{dashboardData.totalAppointments}</p></div>
+              <div><h3>Total Appointments</h3><p className="stat-number">{totalAppointments}</p></div>
             </div>
             <div className="stat-card">
               <Clock size={24} />
-              <div><h3>Today's Appointments</h3><p className="stat-number">{dashboardData.todayAppointments.length}</p></div>
+              <div><h3>Today's Appointments</h3><p className="stat-number">{todayAppointments.length}</p></div>
             </div>
           </>
         )}
@@ -190,6 +283,7 @@ export const DoctorDashboard = () => {
           <Calendar
             onChange={setSelectedDate}
             value={selectedDate}
+            onActiveStartDateChange={({ activeStartDate }) => setActiveMonth(activeStartDate)}
             tileDisabled={({ date }) => date.getDay() === 0}
             tileContent={({ date }) => appointmentsCache[date.toISOString().split('T')[0]]?.length > 0 && <div className="calendar-dot" />}
           />
@@ -1,5 +1,12 @@
 import React, { useState, useEffect } from 'react';
 import { CalendarDays, Clock } from 'lucide-react';
+import {
+  applyAppointmentEvent,
+  eventCountChange,
+  eventInRange,
+  sameId,
+  subscribeAppointmentFeed,
+} from '../../appointmentFeed';
 import './DoctorDashboard.css';
 
 const DoctorDashboard = ({ doctor }) => {
@@ -9,6 +16,7 @@ const DoctorDashboard = ({ doctor }) => {
   });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [reloadKey, setReloadKey] = useState(0);
 
   useEffect(() => {
     const fetchAppointments = async () => {
@@ -20,24 +28,27 @@ const DoctorDashboard = ({ doctor }) => {
           throw new Error('Doctor ID is not available');
         }
 
-        const response = await fetch(`http://localhost:8000/appointments?doctor_id=${doctor.id}`);
-        if (!response.ok) {
-          throw new Error(`Failed to fetch appointments: ${response.statusText}`);
-        }
-        
-        const data = await response.json();
-        if (data.error) {
-          throw new Error(data.error);
-        }
-
-        // Process the data for dashboard
-        const today = new Date().toISOString().split('T')[0];
-        const todayAppts = (data.appointments || [])
-          .filter(apt => apt.appointment_time.startsWith(today));
+        // Only what the cards show: the total (sent with any page, so one
+        // row is enough) and today's appointments
+        const today = new Date().toLocaleDateString('en-CA');
+        const [totalPage, todayPage] = await Promise.all([
+          `http://localhost:8000/appointments?doctor_id=${doctor.id}&limit=1`,
+          `http://localhost:8000/appointments?doctor_id=${doctor.id}&date_from=${today}&date_to=${today}&order=asc&limit=500`,
+        ].map(async (url) => {
+          const response = await fetch(url);
+          if (!response.ok) {
+            throw new Error(`Failed to fetch appointments: ${response.statusText}`);
+          }
+          const page = await response.json();
+          if (page.error) {
+            throw new Error(page.error);
+          }
+          return page;
+        }));
 
         setDashboardData({
-          totalAppointments: data.appointments?.length || 0,
-          todayAppointments: todayAppts
+          totalAppointments: totalPage.total || 0,
+          todayAppointments: todayPage.appointments || []
         });
       } catch (err) {
         console.error('Error fetching appointments:', err);
@@ -50,6 +61,23 @@ const DoctorDashboard = ({ doctor }) => {
     if (doctor?.id) {
       fetchAppointments();
     }
+  }, [doctor?.id, reloadKey]);
+
+  // Live feed: apply this doctor's changes in place, reload only on resync
+  useEffect(() => {
+    if (!doctor?.id) return;
+    return subscribeAppointmentFeed(
+      `http://localhost:8000/appointments/events?doctor_id=${doctor.id}`,
+      (type, event) => {
+        const today = new Date().toLocaleDateString('en-CA');
+        setDashboardData(prev => ({
+          totalAppointments: prev.totalAppointments + eventCountChange(type, event, 'doctor_id', doctor.id),
+          todayAppointments: applyAppointmentEvent(prev.todayAppointments, type, event,
+            e => sameId(e.doctor_id, doctor.id) && eventInRange(e, today, today)),
+        }));
+      },
+      () => setReloadKey(key => key + 1),
+    );
   }, [doctor?.id]);
 
   if (!doctor?.id) {
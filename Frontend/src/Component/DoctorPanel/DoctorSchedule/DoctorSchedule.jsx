@@ -1,33 +1,87 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import Calendar from 'react-calendar';
 import { Clock, User2 } from 'lucide-react';
+import {
+  applyAppointmentEvent,
+  eventInRange,
+  sameId,
+  subscribeAppointmentFeed,
+} from '../../appointmentFeed';
 import './DoctorSchedule.css';
 
 const DoctorSchedule = ({ doctor }) => {
   const [selectedDate, setSelectedDate] = useState(new Date());
-  const [appointments, setAppointments] = useState({});
+  const [activeMonth, setActiveMonth] = useState(new Date());
+  const [monthAppointments, setMonthAppointments] = useState([]);
   const [availableSlots, setAvailableSlots] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [reloadKey, setReloadKey] = useState(0);
 
+  // Booked appointments of the month on screen only; the list endpoint is
+  // keyset-paginated, so a busy month may take a few pages
   useEffect(() => {
-    const fetchAppointmentsAndSlots = async () => {
+    const fetchMonthAppointments = async () => {
+      try {
+        const dateFrom = new Date(activeMonth.getFullYear(), activeMonth.getMonth(), 1).toLocaleDateString('en-CA');
+        const dateTo = new Date(activeMonth.getFullYear(), activeMonth.getMonth() + 1, 0).toLocaleDateString('en-CA');
+        const monthAppointments = [];
+        let cursor = null;
+        do {
+          const appointmentsResponse = await fetch(
+            `http://localhost:8000/appointments?doctor_id=${doctor.id}&date_from=${dateFrom}&date_to=${dateTo}&order=asc&limit=500${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`
+          );
+
+          if (!appointmentsResponse.ok) {
+            throw new Error(`Failed to fetch appointments: ${appointmentsResponse.statusText}`);
+          }
+
+          const page = await appointmentsResponse.json();
+          if (page.error) {
+            throw new Error(page.error);
+          }
+          monthAppointments.push(...(page.appointments || []));
+          cursor = page.next_cursor;
+        } while (cursor);
+
+        setMonthAppointments(monthAppointments);
+      } catch (err) {
+        console.error('Error fetching appointments:', err);
+        setError(err.message);
+      }
+    };
+
+    if (doctor?.id) {
+      fetchMonthAppointments();
+    }
+  }, [doctor, activeMonth, reloadKey]);
+
+  // Read by the feed handler, so paging the calendar keeps the same connection
+  const activeMonthRef = useRef(activeMonth);
+  useEffect(() => {
+    activeMonthRef.current = activeMonth;
+  }, [activeMonth]);
+
+  // Live feed: apply this doctor's changes in place, refetch only on resync
+  useEffect(() => {
+    if (!doctor?.id) return;
+    return subscribeAppointmentFeed(
+      `http://localhost:8000/appointments/events?doctor_id=${doctor.id}`,
+      (type, event) => {
+        const month = activeMonthRef.current;
+        const dateFrom = new Date(month.getFullYear(), month.getMonth(), 1).toLocaleDateString('en-CA');
+        const dateTo = new Date(month.getFullYear(), month.getMonth() + 1, 0).toLocaleDateString('en-CA');
+        setMonthAppointments(prev => applyAppointmentEvent(prev, type, event,
+          e => sameId(e.doctor_id, doctor.id) && eventInRange(e, dateFrom, dateTo)));
+      },
+      () => setReloadKey(key => key + 1),
+    );
+  }, [doctor?.id]);
+
+  useEffect(() => {
+    const fetchSlots = async () => {
       try {
         setLoading(true);
-        
-        // Fetch booked appointments
-        const appointmentsResponse = await fetch(
-          `http://localhost:8000/appointments?doctor_id=${doctor.id}`
-        );
-        
-        if (!appointmentsResponse.ok) {
-          throw new Error(`Failed to fetch appointments: ${appointmentsResponse.statusText}`);
-        }
-        
-        const appointmentsData = await appointmentsResponse.json();
-        if (appointmentsData.error) {
-          throw new Error(appointmentsData.error);
-        }
 
         // Fetch available time slots
         const timeSlotsResponse = await fetch('http://localhost:8000/time-slot', {
@@ -45,32 +99,6 @@ const DoctorSchedule = ({ doctor }) => {
         }
 
         const timeSlotsData = await timeSlotsResponse.json();
-
-        // Group appointments by date
-        const appointmentsByDate = {};
-        (appointmentsData.appointments || []).forEach(apt => {
-          const appointmentDate = new Date(apt.appointment_time);
-          const dateStr = appointmentDate.toLocaleDateString('en-CA');
-          
-          if (!appointmentsByDate[dateStr]) {
-            appointmentsByDate[dateStr] = [];
-          }
-          
-          appointmentsByDate[dateStr].push({
-            ...apt,
-            status: apt.status || 'scheduled',
-            patient_name: apt.patient_name || 'Patient',
-            appointment_time: apt.appointment_time,
-            formatted_time: appointmentDate.toLocaleTimeString([], {
-              hour: '2-digit',
-              minute: '2-digit',
-              hour12: true
-            })
-          });
-        });
-
-        console.log('Appointments by date:', appointmentsByDate); // Debug log
-        setAppointments(appointmentsByDate);
         setAvailableSlots(timeSlotsData.response || []);
       } catch (err) {
         console.error('Error fetching data:', err);
@@ -81,10 +109,36 @@ const DoctorSchedule = ({ doctor }) => {
     };
 
     if (doctor?.id) {
-      fetchAppointmentsAndSlots();
+      fetchSlots();
     }
   }, [doctor]);
 
+  // Group appointments by date
+  const appointments = useMemo(() => {
+    const appointmentsByDate = {};
+    monthAppointments.forEach(apt => {
+      const appointmentDate = new Date(apt.appointment_time);
+      const dateStr = appointmentDate.toLocaleDateString('en-CA');
+      
+      if (!appointmentsByDate[dateStr]) {
+        appointmentsByDate[dateStr] = [];
+      }
+      
+      appointmentsByDate[dateStr].push({
+        ...apt,
+        status: apt.status || 'scheduled',
+        patient_name: apt.patient_name || 'Patient',
+        appointment_time: apt.appointment_time,
+        formatted_time: appointmentDate.toLocaleTimeString([], {
+          hour: '2-digit',
+          minute: '2-digit',
+          hour12: true
+        })
+      });
+    });
+    return appointmentsByDate;
+  }, [monthAppointments]);
+
   const handleDateChange = (date) => {
     setSelectedDate(date);
   };
@@ -141,6 +195,7 @@ const DoctorSchedule = ({ doctor }) => {
           <Calendar
             onChange={handleDateChange}
             value={selectedDate}
+            onActiveStartDateChange={({ activeStartDate }) => setActiveMonth(activeStartDate)}
             className="doctor-calendar"
             tileClassName={({ date }) => {
               const dateStr = date.toLocaleDateString('en-CA');
@@ -0,0 +1,71 @@
+import { format } from 'date-fns';
+
+// Live appointment changes from /appointments/events. Each event carries the
+// appointment as an /appointments row shows it, so lists are updated in place;
+// only `resync` (a missed event, a reconnect) calls for a refetch.
+
+const EVENT_TYPES = ['created', 'rescheduled', 'cancelled', 'updated', 'deleted'];
+
+// The event as a row of /appointments ('2025-06-02 09:30 AM' times)
+export const eventToRow = (event) => ({
+  appointment_id: event.appointment_id,
+  appointment_time: format(new Date(event.appointment_time), 'yyyy-MM-dd hh:mm a'),
+  patient_id: event.patient_id,
+  patient_name: event.patient_name,
+  doctor_name: event.doctor_name,
+  department: event.department,
+  status: event.status,
+  duration: event.duration,
+  calendar_event_id: event.calendar_event_id,
+});
+
+// A deleted row leaves every list; a status update to 'cancelled' keeps it
+const isRemoval = (type, event) => (
+  type === 'deleted' || (type === 'cancelled' && event.status !== 'cancelled')
+);
+
+// Local 'YYYY-MM-DD' day of the event, compared with date_from / date_to
+export const eventInRange = (event, dateFrom, dateTo) => {
+  const day = new Date(event.appointment_time).toLocaleDateString('en-CA');
+  return day >= dateFrom && day <= dateTo;
+};
+
+// `rows` with one event applied. `belongs(event)` tells whether the
+// appointment, as it is now, falls in the list (its doctor, department, range)
+export const applyAppointmentEvent = (rows, type, event, belongs) => {
+  const others = rows.filter(row => row.appointment_id !== event.appointment_id);
+  if (isRemoval(type, event) || !belongs(event)) return others;
+  return [...others, eventToRow(event)]
+    .sort((a, b) => new Date(a.appointment_time) - new Date(b.appointment_time));
+};
+
+// Ids come from the router or localStorage as strings, from the feed as numbers
+export const sameId = (a, b) => a != null && b != null && String(a) === String(b);
+
+// How the count of appointments whose `field` ('doctor_id', 'department')
+// equals `value` changes with this event
+export const eventCountChange = (type, event, field, value) => {
+  const previous = event[`old_${field}`] ?? event[field];
+  const before = type !== 'created' && sameId(previous, value);
+  const after = !isRemoval(type, event) && sameId(event[field], value);
+  return (after ? 1 : 0) - (before ? 1 : 0);
+};
+
+// Open the feed (pass ?doctor_id= in the url to filter it); returns the close function
+export const subscribeAppointmentFeed = (url, onEvent, onResync) => {
+  const source = new EventSource(url);
+  EVENT_TYPES.forEach(type => source.addEventListener(type, (message) => {
+    try {
+      onEvent(type, JSON.parse(message.data));
+    } catch (err) {
+      console.error('Ignoring malformed appointment event:', err);
+    }
+  }));
+  // Sent on (re)connect; the initial load already covers the first one
+  let connected = false;
+  source.addEventListener('resync', () => {
+    if (connected) onResync();
+    connected = true;
+  });
+  return () => source.close();
+};